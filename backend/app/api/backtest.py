@@ -1,7 +1,6 @@
 # app/api/backtest.py
 from fastapi import HTTPException
 import logging
-import time
 import traceback
 import json
 from typing import Dict
@@ -12,6 +11,7 @@ from app.services.strategy_service.strategy import StrategyService
 from app.services.backtest.metrics_calculator import PortfolioMetricsCalculator
 from app.services.backtest.trade_analysis import analyze_all_trades
 from app.utils.utils import numpy_to_python, nan_to_null
+from app.utils.tracing import span, trace_request
 
 logger = logging.getLogger(__name__)
 
@@ -22,39 +22,46 @@ async def backtest(input: BacktestInput):
     """
     try:
         logger.info(f"Starting backtest for symbol: {input.symbol}")
-        total_start_time = time.time()
-
-        # 1. Fetch required data
-        data_dict = await DataService.fetch_data(
-            symbol=input.symbol,
-            start=input.start,
-            end=input.end,
-            data_source=input.data_source,
-            strategies=input.strategies
-        )
-
-        # 2. Process strategies
-        strategy_service = StrategyService(input.strategies, input.fees, input.slippage)
-        strategies_results, strategies_info, strategies_df_results = await strategy_service.process_strategies(data_dict)
-
-        # 3. Combine results and calculate portfolio metrics
-        combined_df = await _combine_strategy_results(strategies_results, strategies_info)
-        
-        # 4. Calculate portfolio metrics
-        metrics_calculator = PortfolioMetricsCalculator(combined_df, strategies_info)
-        combined_df = metrics_calculator.calculate_all_metrics()
-
-        # 5. Prepare final results
-        result = await _prepare_final_results(
-            combined_df=combined_df,
-            strategies_info=strategies_info,
-            strategies_df_results=strategies_df_results
-        )
-
-        total_time = time.time() - total_start_time
-        logger.info(f"Backtest completed in {total_time:.2f} seconds")
-        
-        return result
+        with trace_request('backtest') as trace:
+            # 1. Fetch required data
+            with span('data_fetch'):
+                data_dict = await DataService.fetch_data(
+                    symbol=input.symbol,
+                    start=input.start,
+                    end=input.end,
+                    data_source=input.data_source,
+                    strategies=input.strategies
+                )
+
+            # 2. Process strategies
+            strategy_service = StrategyService(input.strategies, input.fees, input.slippage, profile=input.profile)
+            strategies_results, strategies_info, strategies_df_results = await strategy_service.process_strategies(data_dict)
+
+            # 3. Combine results and calculate portfolio metrics
+            with span('aggregation'):
+                combined_df = await _combine_strategy_results(strategies_results, strategies_info)
+
+            # 4. Calculate portfolio metrics
+            with span('metrics'):
+                metrics_calculator = PortfolioMetricsCalculator(combined_df, strategies_info)
+                combined_df = metrics_calculator.calculate_all_metrics()
+
+            # 5. Prepare final results
+            result = await _prepare_final_results(
+                combined_df=combined_df,
+                strategies_info=strategies_info,
+                strategies_df_results=strategies_df_results,
+                compact_signals=input.compact_signals
+            )
+            if input.profile:
+                result['profile'] = {name: profile.to_dict() for name, profile in strategy_service.profiles.items()}
+
+            timings = trace.to_dict()
+            if input.timings:
+                result['timings'] = timings
+            logger.info(f"Backtest completed in {timings['total_time']:.2f} seconds")
+
+            return result
 
     except Exception as e:
         logger.error(f"Error in backtest: {str(e)}\n{traceback.format_exc()}")
@@ -67,7 +74,7 @@ async def _combine_strategy_results(strategies_results: list, strategies_info: l
     try:
         combined_df = None
         
-        for idx, df_result in enumerate(strategies_results):
+        for idx, result in enumerate(strategies_results):
             strategy = strategies_info[idx]
             
             # Define aggregation rules
@@ -83,7 +90,8 @@ async def _combine_strategy_results(strategies_results: list, strategies_info: l
                 'Close': 'last',
             }
 
-            # Filter for existing columns
+            # Only the aggregated columns of the result are built
+            df_result = result.to_frame(columns=agg_dict)
             agg_dict = {k: v for k, v in agg_dict.items() if k in df_result.columns}
             df_resampled = df_result.resample('D').agg(agg_dict)
 
@@ -109,7 +117,7 @@ async def _combine_strategy_results(strategies_results: list, strategies_info: l
         logger.error(f"Error combining strategy results: {str(e)}")
         raise
 
-async def _prepare_final_results(combined_df, strategies_info, strategies_df_results):
+async def _prepare_final_results(combined_df, strategies_info, strategies_df_results, compact_signals: bool = False):
     """
     Prepares the final results including metrics and trade analysis.
     """
@@ -117,15 +125,19 @@ async def _prepare_final_results(combined_df, strategies_info, strategies_df_res
         from app.services.backtest.metrics import metrics_table
         
         # Calculate metrics
-        result = metrics_table(combined_df, strategies_info)
-        result = json.loads(json.dumps(result, default=numpy_to_python))
+        with span('metrics'):
+            result = metrics_table(combined_df, strategies_info, compact_signals=compact_signals)
+        with span('serialization'):
+            result = json.loads(json.dumps(result, default=numpy_to_python))
 
         # Analyze trades
-        trades_df = analyze_all_trades(strategies_df_results, strategies_info).fillna(0)
-        result['trades'] = trades_df.to_dict('records')
+        with span('trade_analysis'):
+            trades_df = analyze_all_trades(strategies_df_results, strategies_info).fillna(0)
+            result['trades'] = trades_df.to_dict('records')
 
         # Convert NaN values to None for JSON compatibility
-        result = nan_to_null(result)
+        with span('serialization'):
+            result = nan_to_null(result)
 
         #logging.info(f'RESULTS: {result}')
 
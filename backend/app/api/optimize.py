@@ -0,0 +1,135 @@
+# app/api/optimize.py
+from fastapi import HTTPException
+import logging
+import traceback
+import json
+
+from app.models.backtest import OptimizationInput, WalkForwardInput
+from app.services.data.data_service import DataService
+from app.services.optimization.optimizer import ParameterOptimizer, candidate_strategies, parameter_sets
+from app.services.optimization.walk_forward import walk_forward
+from app.utils.utils import numpy_to_python, nan_to_null
+from app.utils.tracing import span, trace_request
+
+logger = logging.getLogger(__name__)
+
+async def optimize(input: OptimizationInput):
+    """
+    Search the parameters of a strategy: fetch the data once, backtest every parameter set
+    on a process pool and return them ranked by the chosen calculate_metrics metric.
+    """
+    try:
+        logger.info(f"Starting optimization of {input.strategy.name} for symbol: {input.symbol}")
+        with trace_request('optimize') as trace:
+            # 1. Build the candidate strategies; invalid parameters fail before any data is fetched
+            sets = parameter_sets(input.parameters, input.method, input.n_samples, input.seed)
+            candidates = candidate_strategies(input.strategy, sets)
+
+            # 2. Fetch the data of every frequency and regime asset the candidates use, once
+            with span('data_fetch'):
+                data_dict = await DataService.fetch_data(
+                    symbol=input.symbol,
+                    start=input.start,
+                    end=input.end,
+                    data_source=input.data_source,
+                    strategies=candidates
+                )
+
+            # 3. Evaluate the candidates
+            optimizer = ParameterOptimizer(data_dict, input.fees, input.slippage, max_workers=input.max_workers)
+            with span('search'):
+                evaluations = await optimizer.optimize(
+                    candidates, sets,
+                    metric=input.metric,
+                    maximize=input.maximize,
+                    successive_halving=input.successive_halving,
+                    halving_factor=input.halving_factor,
+                    min_fraction=input.min_fraction,
+                )
+
+            # 4. Ranked table, best first
+            rows = [{
+                'rank': rank,
+                'parameters': evaluation.params,
+                'score': evaluation.metrics.get(input.metric),
+                'history_fraction': evaluation.fraction,
+                'metrics': evaluation.metrics,
+                'error': evaluation.error,
+            } for rank, evaluation in enumerate(evaluations[:input.top_n], start=1)]
+            result = {'metric': input.metric, 'evaluated': len(evaluations), 'results': rows}
+            result = nan_to_null(json.loads(json.dumps(result, default=numpy_to_python)))
+
+            total_time = trace.elapsed
+            logger.info(f"Optimization of {len(evaluations)} parameter sets completed in {total_time:.2f} seconds")
+
+            return result
+
+    except Exception as e:
+        logger.error(f"Error in optimization: {str(e)}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def walk_forward_analysis(input: WalkForwardInput):
+    """
+    Walk-forward analysis of a strategy: pick the best parameter set on each in-sample window
+    and return the stitched out-of-sample equity curve, its metrics and the folds.
+    """
+    try:
+        logger.info(f"Starting walk-forward analysis of {input.strategy.name} for symbol: {input.symbol}")
+        with trace_request('walk_forward') as trace:
+            # 1. Build the candidate strategies
+            sets = parameter_sets(input.parameters, input.method, input.n_samples, input.seed)
+            candidates = candidate_strategies(input.strategy, sets)
+
+            # 2. Fetch the data once
+            with span('data_fetch'):
+                data_dict = await DataService.fetch_data(
+                    symbol=input.symbol,
+                    start=input.start,
+                    end=input.end,
+                    data_source=input.data_source,
+                    strategies=candidates
+                )
+
+            # 3. Optimize on each fold and trade the out-of-sample windows
+            optimizer = ParameterOptimizer(data_dict, input.fees, input.slippage, max_workers=input.max_workers)
+            with span('search'):
+                analysis = await walk_forward(
+                    optimizer, candidates, sets,
+                    n_folds=input.n_folds,
+                    train_fraction=input.train_fraction,
+                    anchored=input.anchored,
+                    metric=input.metric,
+                    maximize=input.maximize,
+                )
+
+            # 4. Folds, stitched curves and metrics
+            name = analysis.result.name
+            curves = analysis.result.to_frame(columns=[f'{name}_cumulative_equity', f'{name}_drawdown'])
+            curves = curves.reset_index().rename(columns={'index': 'Date'})
+            result = {
+                'metric': input.metric,
+                'folds': [{
+                    'train_start': fold.train_start,
+                    'train_end': fold.train_end,
+                    'test_start': fold.test_start,
+                    'test_end': fold.test_end,
+                    'parameters': fold.params,
+                    'train_score': fold.train_metrics.get(input.metric),
+                    'test_score': fold.test_metrics.get(input.metric),
+                    'test_metrics': fold.test_metrics,
+                } for fold in analysis.folds],
+                'metrics': analysis.metrics,
+                'equityCurve': curves[['Date', f'{name}_cumulative_equity']].to_dict('records'),
+                'drawdown': curves[['Date', f'{name}_drawdown']].to_dict('records'),
+            }
+            result = nan_to_null(json.loads(json.dumps(result, default=numpy_to_python)))
+
+            total_time = trace.elapsed
+            logger.info(f"Walk-forward analysis of {len(sets)} parameter sets over {input.n_folds} folds "
+                        f"completed in {total_time:.2f} seconds")
+
+            return result
+
+    except Exception as e:
+        logger.error(f"Error in walk-forward analysis: {str(e)}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=400, detail=str(e))
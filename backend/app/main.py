@@ -4,11 +4,13 @@ import socket
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.backtest import backtest, BacktestInput
+from app.api.optimize import optimize, walk_forward_analysis, OptimizationInput, WalkForwardInput
 from fastapi import HTTPException, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.api.auth import router as auth_router, get_current_user, User
 from app.api.saved_backtest import router as saved_backtest_router
+from app.utils.tracing import METRICS
 from fastapi import Depends
 import logging
 import sys
@@ -79,6 +81,11 @@ async def root():
 async def test():
     return {"message": "Backend is connected"}
 
+# Stage latency histograms and cache counters since the process started, in the Prometheus text format
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return METRICS.render()
+
 @app.post("/api/backtest")
 async def backtest_endpoint(
     request: Request, 
@@ -94,6 +101,36 @@ async def backtest_endpoint(
         logger.error(f"Backtest error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/optimize")
+async def optimize_endpoint(
+    request: Request,
+    input: OptimizationInput,
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        body = await request.json()
+        logger.info(f"Optimization request body: {body}")
+        response = await optimize(input)
+        return response
+    except Exception as e:
+        logger.error(f"Optimization error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/walk-forward")
+async def walk_forward_endpoint(
+    request: Request,
+    input: WalkForwardInput,
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        body = await request.json()
+        logger.info(f"Walk-forward request body: {body}")
+        response = await walk_forward_analysis(input)
+        return response
+    except Exception as e:
+        logger.error(f"Walk-forward error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 def start_server():
     import uvicorn
     host = "0.0.0.0"
@@ -81,4 +81,49 @@ class BacktestInput(BaseModel):
     end: str
     fees: float
     slippage: float
-    strategies: List[StrategyInput]
\ No newline at end of file
+    strategies: List[StrategyInput]
+    profile: bool = False  # Return a per-node rule evaluation profile with the results
+    compact_signals: bool = False  # Return signals as one record per signal change instead of one per bar
+    timings: bool = False  # Return the time spent in each stage of the request with the results
+
+# Fields shared by the parameter search requests
+class SearchInput(BaseModel):
+    symbol: str
+    data_source: str
+    start: str
+    end: str
+    fees: float
+    slippage: float
+    strategy: StrategyInput  # Template; the searched parameters are set on a copy of it per candidate
+    # Candidate values per parameter, addressed by path in the strategy, e.g.
+    # 'entryRules.0.leftIndicator.params.window' or 'volatility_target'
+    parameters: Dict[str, List[Any]]
+    method: Literal['grid', 'random'] = 'grid'
+    n_samples: Optional[int] = None  # Parameter sets drawn by random search (default: all)
+    seed: Optional[int] = None
+    metric: str = 'Sharpe Ratio'  # Any metric of calculate_metrics
+    maximize: Optional[bool] = None  # Default: minimize drawdowns, volatility and losses, maximize the rest
+    max_workers: Optional[int] = None  # Worker processes (default: one per core)
+
+    @validator('parameters')
+    def validate_parameters(cls, v):
+        if not v or any(not values for values in v.values()):
+            raise ValueError('parameters must give at least one value for each parameter')
+        return v
+
+class OptimizationInput(SearchInput):
+    successive_halving: bool = False  # Evaluate on growing fractions of the history, keeping the best 1/halving_factor
+    halving_factor: int = Field(3, ge=2)
+    min_fraction: float = Field(0.25, gt=0, le=1)  # History fraction of the first successive-halving round
+    top_n: Optional[int] = None  # Rows returned (default: all)
+
+class WalkForwardInput(SearchInput):
+    n_folds: int = Field(5, ge=1)  # Out-of-sample windows, of equal length, at the end of the history
+    train_fraction: float = Field(0.5, gt=0, lt=1)  # History fraction of the first in-sample window
+    anchored: bool = False  # In-sample windows start at the first bar instead of rolling with the folds
+
+    @validator('parameters')
+    def validate_frequency(cls, v):
+        if 'frequency' in v:
+            raise ValueError('frequency cannot be searched in a walk-forward analysis, whose folds are stitched on one time index')
+        return v
@@ -0,0 +1,9 @@
+# app/services/__init__.py
+
+import pandas as pd
+
+# Strategies read the same price frames; with copy-on-write, selections of them are views
+# and a write to a derived frame copies instead of reaching the shared data. Set here, on
+# the first import of any service, so the API, the optimizer's worker processes and
+# scripts all run the pipeline with the same pandas semantics.
+pd.set_option('mode.copy_on_write', True)
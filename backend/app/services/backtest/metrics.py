@@ -1,8 +1,9 @@
 #backend.app.services.backtest.metrics.py
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 from app.utils.utils import numpy_to_python
+from app.services.strategy_module.transitions import Transitions
 
 
 def calculate_cumulative_returns(returns: pd.Series) -> pd.Series:
@@ -128,7 +129,7 @@ def rolling_sharpe_ratio(returns: pd.Series, window: int, periods_per_year: int
 
 def calculate_metrics(
     returns: pd.Series,
-    positions: pd.Series,
+    positions: Union[pd.Series, Transitions],
     initial_value: float = 10000,
     periods_per_year: int = 365
 ) -> Dict[str, Any]:
@@ -137,7 +138,7 @@ def calculate_metrics(
 
     Args:
         returns (pd.Series): Series of periodic returns.
-        positions (pd.Series): Series indicating positions held (e.g., 0 or 1).
+        positions (pd.Series | Transitions): Positions held (e.g., 0 or 1), dense or run-length encoded.
         initial_value (float): Initial portfolio value.
         periods_per_year (int): Number of periods in a year.
 
@@ -190,20 +191,21 @@ def calculate_metrics(
     max_value = initial_value * cum_returns.max()
     min_value = initial_value * cum_returns.min()
 
+    # Position statistics come from the runs of constant position
+    transitions = positions if isinstance(positions, Transitions) else Transitions.from_dense(positions)
+
     # Number of trades
-    trades = positions.diff().abs()
-    nb_trades = trades[trades != 0].count()
+    nb_trades = transitions.changes()
 
     # Exposure as a percentage
-    exposure = (positions != 0).mean() * 100
+    exposure = transitions.exposure() * 100
 
     # Max consecutive wins and losses
     max_consecutive_wins = (returns > 0).astype(int).groupby((returns <= 0).cumsum()).cumsum().max()
     max_consecutive_losses = (returns < 0).astype(int).groupby((returns >= 0).cumsum()).cumsum().max()
 
     # Average trade duration
-    trade_durations = positions.groupby((positions != positions.shift()).cumsum()).size()
-    avg_trade_duration = trade_durations.mean()
+    avg_trade_duration = len(transitions) / transitions.run_count()
 
     # Compile all metrics into a dictionary
     metrics = {
@@ -238,13 +240,31 @@ def calculate_metrics(
     # Convert any numpy data types to native Python types
     return {k: numpy_to_python(v) for k, v in metrics.items()}
 
-def metrics_table(df_result: pd.DataFrame, strategies: List[Any]) -> Dict[str, Any]:
+def daily_strategy_metrics(returns: pd.Series, signal: pd.Series) -> Dict[str, Any]:
+    """
+    Metrics of a strategy as the backtest endpoint reports them: its bar returns compounded
+    per calendar day and its last signal of each day, through calculate_metrics.
+
+    Args:
+        returns (pd.Series): Bar returns of the strategy on a DatetimeIndex.
+        signal (pd.Series): Bar signals of the strategy on the same index.
+
+    Returns:
+        Dict[str, Any]: The calculate_metrics dictionary of the daily series.
+    """
+    # Same as aggregating each day with (x + 1).prod() - 1: missing returns are skipped
+    daily_returns = (1 + returns).resample('D').prod() - 1
+    return calculate_metrics(daily_returns, Transitions.from_dense(signal.resample('D').last()))
+
+def metrics_table(df_result: pd.DataFrame, strategies: List[Any], compact_signals: bool = False) -> Dict[str, Any]:
     """
     Generate a metrics table from backtest results.
 
     Args:
         df_result (pd.DataFrame): DataFrame containing backtest results.
         strategies (List[Any]): List of strategy objects.
+        compact_signals (bool): Report each strategy's signals as one record per signal change
+            instead of one record per bar with its close.
 
     Returns:
         Dict[str, Any]: Dictionary containing equity curves, drawdowns, rolling Sharpe ratios, and metrics.
@@ -283,9 +303,14 @@ def metrics_table(df_result: pd.DataFrame, strategies: List[Any]) -> Dict[str, A
     for strategy in strategies:
         if strategy.active:
             strategy_returns = df_result[f'{strategy.name}_returns']
-            strategy_positions = df_result[f'{strategy.name}_signal']
+            # Encoded here from the daily signal column: the backtest still materializes every series per bar
+            strategy_positions = Transitions.from_dense(df_result[f'{strategy.name}_signal'])
             metrics[strategy.name] = calculate_metrics(strategy_returns, strategy_positions)
-            signals[strategy.name] = df_result[[f'{strategy.name}_signal', 'Close']].reset_index().rename(columns={'index': 'Date'}).to_dict('records')
+            if compact_signals:
+                # The price at each change, which the dense records carry on every bar
+                signals[strategy.name] = strategy_positions.to_records(f'{strategy.name}_signal', Close=df_result['Close'])
+            else:
+                signals[strategy.name] = df_result[[f'{strategy.name}_signal', 'Close']].reset_index().rename(columns={'index': 'Date'}).to_dict('records')
 
     # Compile the final result
     result = {
@@ -0,0 +1,144 @@
+# monte_carlo.py
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, Optional, Sequence, Union
+import pandas as pd
+import numpy as np
+
+# Elements of the (path x bar) array simulated at a time; bounds memory whatever the number of paths
+MAX_CHUNK_ELEMENTS = 2**22
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class MonteCarloResult:
+    """
+    Percentile bands of resampled paths. equity is (percentile x point): the equity (starting
+    at 1) of the paths after each of the sampled bars, or trades, in points.
+    """
+    percentiles: np.ndarray
+    points: pd.Index  # labels of the sampled bars, or trade numbers
+    equity: np.ndarray
+    max_drawdown: np.ndarray  # one value per percentile
+    sharpe_ratio: np.ndarray
+    total_return: np.ndarray
+    n_paths: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Bands as records, one per sampled point, and the metric percentiles by name."""
+        labels = [f'p{percentile:g}' for percentile in self.percentiles]
+        equity = pd.DataFrame(self.equity.T, columns=labels)
+        equity.insert(0, 'Date', self.points)
+        return {
+            'n_paths': self.n_paths,
+            'equity': equity.to_dict('records'),
+            'max_drawdown': dict(zip(labels, self.max_drawdown.tolist())),
+            'sharpe_ratio': dict(zip(labels, self.sharpe_ratio.tolist())),
+            'total_return': dict(zip(labels, self.total_return.tolist())),
+        }
+
+
+def block_bootstrap(returns: np.ndarray, n_paths: int, block_size: int, rng: np.random.Generator) -> np.ndarray:
+    """(n_paths x len(returns)) paths of consecutive blocks of returns drawn with replacement."""
+    n_bars = len(returns)
+    block_size = min(block_size, n_bars)
+    n_blocks = -(-n_bars // block_size)
+    starts = rng.integers(0, n_bars - block_size + 1, size=(n_paths, n_blocks))
+    positions = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :n_bars]
+    return returns[positions]
+
+
+def shuffle_trades(trade_returns: np.ndarray, n_paths: int, rng: np.random.Generator, replace: bool = False) -> np.ndarray:
+    """(n_paths x len(trade_returns)) paths of the trades in random order, or drawn with replacement."""
+    if replace:
+        return trade_returns[rng.integers(0, len(trade_returns), size=(n_paths, len(trade_returns)))]
+    return rng.permuted(np.broadcast_to(trade_returns, (n_paths, len(trade_returns))), axis=1)
+
+
+def simulate(sample: Callable[[int], np.ndarray], length: int, n_paths: int, periods_per_year: float,
+             percentiles: Sequence[float] = DEFAULT_PERCENTILES, n_points: int = 500,
+             max_chunk_elements: int = MAX_CHUNK_ELEMENTS, points: Optional[pd.Index] = None) -> MonteCarloResult:
+    """
+    Reduce n_paths paths of length returns to percentile bands. sample(n) returns n new
+    paths as an (n x length) array. Paths are generated and reduced in chunks of at most
+    max_chunk_elements returns; only each path's equity at n_points evenly spaced points,
+    its max drawdown, Sharpe ratio and total return are kept, as calculate_metrics defines them.
+    """
+    sampled = np.unique(np.linspace(0, length - 1, min(n_points, length)).round().astype(np.int64))
+    equity_points = np.empty((n_paths, len(sampled)))
+    max_drawdown = np.empty(n_paths)
+    sharpe_ratio = np.empty(n_paths)
+    total_return = np.empty(n_paths)
+
+    chunk_size = max(1, max_chunk_elements // length)
+    for start in range(0, n_paths, chunk_size):
+        paths = slice(start, min(start + chunk_size, n_paths))
+        returns = sample(paths.stop - paths.start)
+        volatility = returns.std(axis=1, ddof=1) * np.sqrt(periods_per_year)
+        # The returns become the equity in place, and then the running peak of equity
+        equity = np.add(returns, 1, out=returns)
+        np.multiply.accumulate(equity, axis=1, out=equity)
+        equity_points[paths] = equity[:, sampled]
+        total_return[paths] = equity[:, -1] - 1
+        final_equity = equity[:, -1].copy()
+        drawdown = np.divide(equity, np.maximum.accumulate(equity, axis=1), out=equity)
+        max_drawdown[paths] = 1 - drawdown.min(axis=1)
+        annualized_return = final_equity ** (periods_per_year / length) - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe_ratio[paths] = np.where(volatility != 0, annualized_return / volatility, 0)
+
+    percentiles = np.asarray(percentiles, dtype=float)
+    return MonteCarloResult(
+        percentiles=percentiles,
+        points=pd.Index(sampled) if points is None else points[sampled],
+        equity=np.percentile(equity_points, percentiles, axis=0),
+        max_drawdown=np.percentile(max_drawdown, percentiles),
+        sharpe_ratio=np.percentile(sharpe_ratio, percentiles),
+        total_return=np.percentile(total_return, percentiles),
+        n_paths=n_paths,
+    )
+
+
+def monte_carlo_returns(returns: Union[pd.Series, np.ndarray], n_paths: int = 10_000, block_size: int = 20,
+                        periods_per_year: float = 365, seed: Optional[int] = None, **kwargs) -> MonteCarloResult:
+    """
+    Block bootstrap of a strategy's per-bar returns: each path is a sequence of blocks of
+    block_size consecutive returns, which keeps short-range autocorrelation and volatility
+    clustering. Missing returns count as 0, as in the metrics. See simulate for kwargs.
+    """
+    points = returns.index if isinstance(returns, pd.Series) else None
+    returns = np.nan_to_num(np.asarray(returns, dtype=float))
+    if len(returns) < 2:
+        raise ValueError("At least two returns are needed for a bootstrap")
+    rng = np.random.default_rng(seed)
+    return simulate(lambda n: block_bootstrap(returns, n, block_size, rng), len(returns), n_paths, periods_per_year,
+                    points=points, **kwargs)
+
+
+def monte_carlo_trades(trades: Union[pd.DataFrame, pd.Series, np.ndarray], n_paths: int = 10_000, replace: bool = False,
+                       periods_per_year: Optional[float] = None, seed: Optional[int] = None, **kwargs) -> MonteCarloResult:
+    """
+    Trade shuffle: each path takes the trades (a trade_analysis table or trade returns) in a
+    random order, or draws them with replacement. Shuffled paths all end at the same equity
+    with the same Sharpe ratio; their drawdowns show how much the order of trades mattered.
+
+    periods_per_year is the number of trades per year, by default estimated from the entry
+    dates of a trade table (and 1 otherwise). Trades are numbered from 1 in points.
+    """
+    trade_returns = trades
+    if isinstance(trades, pd.DataFrame):
+        column = 'Trade Return' if 'Trade Return' in trades else 'trade_return'
+        trade_returns = trades[column]
+        if periods_per_year is None and len(trades) > 1:
+            dates = pd.to_datetime(trades['Entry Date' if 'Entry Date' in trades else 'entry_date'])
+            years = (dates.max() - dates.min()) / pd.Timedelta(days=365)
+            periods_per_year = len(trades) / years if years > 0 else None
+    trade_returns = np.asarray(trade_returns, dtype=float)
+    trade_returns = trade_returns[~np.isnan(trade_returns)]
+    if len(trade_returns) < 2:
+        raise ValueError("At least two trades are needed for a trade shuffle")
+    rng = np.random.default_rng(seed)
+    return simulate(lambda n: shuffle_trades(trade_returns, n, rng, replace), len(trade_returns), n_paths,
+                    periods_per_year or 1, points=pd.RangeIndex(1, len(trade_returns) + 1), **kwargs)
+
@@ -0,0 +1,145 @@
+# result.py
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, Iterable, Optional
+import pandas as pd
+import numpy as np
+from app.services.backtest.metrics import rolling_sharpe_ratio
+
+
+@dataclass(eq=False)
+class MarketSeries:
+    """Buy-and-hold series of a price, derived on first access and shared by every strategy backtested on it."""
+    index: pd.Index
+    close: np.ndarray
+    window: int = 90  # rolling Sharpe window, in bars
+
+    def _series(self, values: np.ndarray) -> pd.Series:
+        return pd.Series(values, index=self.index, copy=False)
+
+    @cached_property
+    def returns(self) -> np.ndarray:
+        return self._series(self.close).pct_change().to_numpy()
+
+    @cached_property
+    def log_returns(self) -> np.ndarray:
+        close = self._series(self.close)
+        return np.log(close / close.shift()).to_numpy()
+
+    @cached_property
+    def cumulative_equity(self) -> np.ndarray:
+        return (1 + self._series(self.returns)).cumprod().to_numpy()
+
+    @cached_property
+    def cumulative_log_equity(self) -> np.ndarray:
+        return self._series(self.log_returns).cumsum().to_numpy()
+
+    @cached_property
+    def drawdown(self) -> np.ndarray:
+        equity = self._series(self.cumulative_equity)
+        return (1 - equity / equity.cummax()).to_numpy()
+
+    @cached_property
+    def rolling_sharpe(self) -> np.ndarray:
+        return rolling_sharpe_ratio(self._series(self.returns), self.window).to_numpy()
+
+
+@dataclass(eq=False)
+class BacktestResult:
+    """
+    Backtest of one strategy as NumPy arrays on a shared time index.
+
+    signal, position_size, position, returns and log_returns are computed by the
+    backtest; equity, drawdown and rolling Sharpe are derived on first access (or
+    filled in by backtest_positions), and the market series come from market, which
+    results on the same prices can share. to_frame() builds the DataFrame columns
+    run_backtest used to add ('{name}_returns', 'cumulative_market_equity', ...)
+    only when they are needed.
+    """
+    name: str
+    index: pd.Index
+    close: np.ndarray
+    signal: np.ndarray
+    position_size: np.ndarray
+    position: np.ndarray
+    returns: np.ndarray
+    log_returns: np.ndarray
+    window: int = 90  # rolling Sharpe window, in bars
+    market: Optional[MarketSeries] = None  # shared with other results on the same prices
+
+    def __post_init__(self):
+        if self.market is None:
+            self.market = MarketSeries(self.index, self.close, self.window)
+
+    def _series(self, values: np.ndarray) -> pd.Series:
+        return pd.Series(values, index=self.index, copy=False)
+
+    @cached_property
+    def cumulative_equity(self) -> np.ndarray:
+        return (1 + self._series(self.returns)).cumprod().to_numpy()
+
+    @cached_property
+    def cumulative_returns(self) -> np.ndarray:
+        return self.cumulative_equity - 1
+
+    @cached_property
+    def cumulative_log_equity(self) -> np.ndarray:
+        return self._series(self.log_returns).cumsum().to_numpy()
+
+    @cached_property
+    def drawdown(self) -> np.ndarray:
+        equity = self._series(self.cumulative_equity)
+        return (1 - equity / equity.cummax()).to_numpy()
+
+    @cached_property
+    def rolling_sharpe(self) -> np.ndarray:
+        return rolling_sharpe_ratio(self._series(self.returns), self.window).to_numpy()
+
+    @property
+    def market_returns(self) -> np.ndarray:
+        return self.market.returns
+
+    @property
+    def market_log_returns(self) -> np.ndarray:
+        return self.market.log_returns
+
+    def columns(self) -> Dict[str, Callable[[], np.ndarray]]:
+        """Column names of the result, in run_backtest's order, with a function returning each one's values."""
+        name = self.name
+        return {
+            'Close': lambda: self.close,
+            f'{name}_signal': lambda: self.signal,
+            f'{name}_position_size': lambda: self.position_size,
+            f'{name}_position': lambda: self.position,
+            f'{name}_returns': lambda: self.returns,
+            f'{name}_log_returns': lambda: self.log_returns,
+            f'{name}_cumulative_equity': lambda: self.cumulative_equity,
+            f'{name}_cumulative_returns': lambda: self.cumulative_returns,
+            f'{name}_cumulative_log_equity': lambda: self.cumulative_log_equity,
+            f'{name}_drawdown': lambda: self.drawdown,
+            f'{name}_rolling_sharpe': lambda: self.rolling_sharpe,
+            'returns': lambda: self.market.returns,
+            'log_returns': lambda: self.market.log_returns,
+            'cumulative_market_equity': lambda: self.market.cumulative_equity,
+            'cumulative_market_returns': lambda: self.market.cumulative_equity - 1,
+            'cumulative_log_market_equity': lambda: self.market.cumulative_log_equity,
+            'market_drawdown': lambda: self.market.drawdown,
+            'market_rolling_sharpe': lambda: self.market.rolling_sharpe,
+        }
+
+    def to_frame(self, df: Optional[pd.DataFrame] = None, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        The given result columns (default: all but Close) as a DataFrame; unknown names
+        are skipped. With df, the columns are added to df in place and df is returned.
+        """
+        available = self.columns()
+        if columns is None:
+            columns = [column for column in available if column != 'Close']
+        columns = [column for column in columns if column in available]
+        data = {column: available[column]() for column in columns}
+        if df is None:
+            return pd.DataFrame(data, index=self.index)
+        for column, values in data.items():
+            df[column] = values
+        return df
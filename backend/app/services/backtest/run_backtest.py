@@ -5,92 +5,128 @@ import numpy as np
 from typing import List, Optional
 from app.services.strategy_module.strategy import Strategy
 from app.services.strategy_module.utils import add_indicators
+from app.services.strategy_module.profiling import EvaluationProfile
+from app.services.strategy_module.signals import RegimeAlignment
+from app.services.backtest.result import BacktestResult, MarketSeries
 from app.services.backtest.metrics import rolling_sharpe_ratio
-import time
-
-
-def run_backtest(df: pd.DataFrame, strategy: Strategy, fees: float, slippage: float, regime_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
-    """Run a backtest for a single strategy"""
+from app.utils.tracing import span
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def run_backtest(df: pd.DataFrame, strategy: Strategy, fees: float, slippage: float, regime_df: Optional[pd.DataFrame] = None,
+                 profile: Optional[EvaluationProfile] = None, signals: Optional[pd.Series] = None,
+                 regime_alignment: Optional[RegimeAlignment] = None) -> pd.DataFrame:
+    """
+    Run a backtest for a single strategy, returning df with the strategy's indicators and result
+    columns added. See backtest_strategy for the arguments; it returns the result without a DataFrame.
+    """
+    # Add indicators to the main DataFrame; regime indicators are evaluated with the regime rules
+    # and are not added to regime_df, which is shared by every strategy filtered on the same asset
+    df = add_indicators(df, [strategy], profile=profile, frequency=strategy.frequency)
+
+    result = backtest_strategy(df, strategy, fees, slippage, regime_df, profile=profile, signals=signals,
+                               regime_alignment=regime_alignment)
+    return result.to_frame(df)
+
+
+def _read_only(values: np.ndarray) -> np.ndarray:
+    # A view that cannot write through to the shared price data
+    values = values.view()
+    values.flags.writeable = False
+    return values
+
+
+def backtest_strategy(df: pd.DataFrame, strategy: Strategy, fees: float, slippage: float, regime_df: Optional[pd.DataFrame] = None,
+                      profile: Optional[EvaluationProfile] = None, signals: Optional[pd.Series] = None,
+                      regime_alignment: Optional[RegimeAlignment] = None) -> BacktestResult:
+    """
+    Backtest a single strategy on df, which is only read. Pass an EvaluationProfile to record per-node
+    rule evaluation costs, signals to use signals already generated for the strategy (see
+    utils.generate_batch_signals), and regime_alignment to reuse an alignment of regime_df on df.
+    """
     # Convert fees and slippage from percentages to decimals
     fees = fees / 100
     slippage = slippage / 100
-    print(f"Starting backtest for strategy {strategy.name}...")
-
-    # Start timing the total backtest
-    total_start_time = time.time()
-
-    # Add indicators to both main and regime DataFrames
-    indicators_start_time = time.time()
-    df = add_indicators(df, [strategy])
-    if regime_df is not None:
-        regime_df = add_indicators(regime_df, [strategy])
-    print("Indicators added to DataFrame")
-    indicators_end_time = time.time()
-    print(f"Indicators added to DataFrame (Time taken: {indicators_end_time - indicators_start_time:.4f} seconds)")
-
-    strategy_calc_start = time.time()
-
-    # Generate signals and calculate returns for the strategy
-    print(f"Generating signals for strategy: {strategy.name}")
-    signals_start_time = time.time()
-    df[f'{strategy.name}_signal'] = strategy.generate_signals(df, regime_df)
-    signals_end_time = time.time()
-    print(f"Signals generated (Time taken: {signals_end_time - signals_start_time:.4f} seconds)")
-    # Calculate position sizes
-    position_sizes_start_time = time.time()
-    df[f'{strategy.name}_position_size'] = strategy.calculate_position_sizes(df)
-    position_sizes_end_time = time.time()
-    print(f"Position sizes calculated (Time taken: {position_sizes_end_time - position_sizes_start_time:.4f} seconds)")
-
-    # Calculate positions
-    positions_start_time = time.time()
-    df[f'{strategy.name}_position'] = df[f'{strategy.name}_signal'].shift() * df[f'{strategy.name}_position_size']
-    positions_end_time = time.time()
-    print(f"Positions calculated (Time taken: {positions_end_time - positions_start_time:.4f} seconds)")
-
-    # Percentage change of Close prices
-    close_pct_change = df['Close'].pct_change() #need to reshape otherwise using this in a column calculation wont work
-    log_returns = np.log(df['Close'] / df['Close'].shift())
-
- 
-    # Calculate returns
-    df[f'{strategy.name}_returns'] = df[f'{strategy.name}_position'].shift() * close_pct_change - df[f'{strategy.name}_position'].diff().abs() * (fees + slippage)
-    df[f'{strategy.name}_log_returns'] = df[f'{strategy.name}_position'].shift() * log_returns - \
-                                            df[f'{strategy.name}_position'].diff().abs() * (fees + slippage)
-
-    # Calculate cumulative returns
-    df[f'{strategy.name}_cumulative_equity'] = (1 + df[f'{strategy.name}_returns']).cumprod()
-    df[f'{strategy.name}_cumulative_returns'] = df[f'{strategy.name}_cumulative_equity'] - 1
-    df[f'{strategy.name}_cumulative_log_equity'] = df[f'{strategy.name}_log_returns'].cumsum()
-
-    # Calculate drawdown
-    df[f'{strategy.name}_drawdown'] = 1 - df[f'{strategy.name}_cumulative_equity'] / df[f'{strategy.name}_cumulative_equity'].cummax()
-
-    # Calculate rolling Sharpe ratio
-    window = 90  # rolling window size in days
-    df[f'{strategy.name}_rolling_sharpe'] = rolling_sharpe_ratio(df[f'{strategy.name}_returns'], window)
-    
-    strategy_calc_end = time.time()
-    print(f"Strategy signals, positions and metrics calculations {strategy.name} completed in {strategy_calc_end - strategy_calc_start:.4f} seconds.")
-
-    # Calculate market returns and metrics
-    df['returns'] = close_pct_change
-    df['log_returns'] = log_returns
-    df['cumulative_market_equity'] = (1 + df['returns']).cumprod()
-    df['cumulative_market_returns'] = df['cumulative_market_equity'] - 1
-    df['cumulative_log_market_equity'] = df['log_returns'].cumsum()
-    df['market_drawdown'] = 1 - df['cumulative_market_equity'] / df['cumulative_market_equity'].cummax()
-    df['market_rolling_sharpe'] = rolling_sharpe_ratio(df['returns'], window)
-
-    print(f"Backtest for strategy {strategy.name} completed.")
-    # Optionally save to CSV for debugging
-    # df.to_csv(f'backtest_{strategy.name}.csv')
-    # End timing the total backtest
-    total_end_time = time.time()
-    print(f"Backtest for strategy {strategy.name} completed in {total_end_time - total_start_time:.4f} seconds.")
-
-    return df
-
+    logger.debug(f"Starting backtest for strategy {strategy.name}")
+
+    # Generate signals and calculate returns for the strategy; stage timings are recorded by the spans
+    with span('signals'):
+        if signals is None:
+            signals = strategy.generate_signals(df, regime_df, profile=profile, regime_alignment=regime_alignment)
+        signal = np.asarray(signals, dtype=float)
+    with span('sizing'):
+        position_size = strategy.calculate_position_sizes(df).to_numpy(dtype=float)
+
+    result, = backtest_positions(df.index, df['Close'].to_numpy(dtype=float), [strategy.name], signal[:, None],
+                                 position_size[:, None], fees, slippage)
+    return result
+
+
+def backtest_strategies(df: pd.DataFrame, strategies: List[Strategy], signals: pd.DataFrame, fees: float,
+                        slippage: float) -> List[BacktestResult]:
+    """
+    Backtest strategies trading the same prices together, from their signals as one column each
+    (see utils.generate_batch_signals). fees and slippage are percentages, as in backtest_strategy.
+    """
+    with span('sizing'):
+        position_sizes = np.empty((len(df), len(strategies)), order='F')
+        for j, strategy in enumerate(strategies):
+            position_sizes[:, j] = strategy.calculate_position_sizes(df).to_numpy(dtype=float)
+    return backtest_positions(df.index, df['Close'].to_numpy(dtype=float), [strategy.name for strategy in strategies],
+                              signals.to_numpy(dtype=float), position_sizes, fees / 100, slippage / 100)
+
+
+def _accumulate(ufunc: np.ufunc, values: np.ndarray, identity: float) -> np.ndarray:
+    # Running ufunc down each column skipping NaNs, which stay NaN: pandas' cumprod/cumsum/cummax on columns
+    missing = np.isnan(values)
+    result = ufunc.accumulate(np.where(missing, identity, values), axis=0)
+    result[missing] = np.nan
+    return result
+
+
+def backtest_positions(index: pd.Index, close: np.ndarray, names: List[str], signals: np.ndarray,
+                       position_sizes: np.ndarray, fees: float, slippage: float, window: int = 90) -> List[BacktestResult]:
+    """
+    Backtest kernel: one strategy per column of the (time x strategy) signals and position_sizes,
+    all trading close. fees and slippage are decimals. Returns, equity, drawdown and rolling Sharpe
+    of every column are computed with a few whole-matrix operations, and the market series once,
+    in a MarketSeries shared by every result. Each result's arrays are columns of the matrices.
+    """
+    with span('returns'):
+        market = MarketSeries(index, _read_only(close), window)
+        signals = np.asarray(signals, dtype=float)
+        cost_rate = fees + slippage
+
+        # Positions apply from the bar after the signal
+        positions = np.full(signals.shape, np.nan, order='F')
+        positions[1:] = signals[:-1] * position_sizes[1:]
+        previous_positions = np.full(signals.shape, np.nan, order='F')
+        previous_positions[1:] = positions[:-1]
+        costs = np.abs(positions - previous_positions) * cost_rate
+        returns = previous_positions * market.returns[:, None] - costs
+        log_returns = previous_positions * market.log_returns[:, None] - costs
+
+        # Accumulate down each column like the pandas Series methods BacktestResult uses one strategy at a time
+        equity = _accumulate(np.multiply, 1 + returns, 1.0)
+        cumulative_log_equity = _accumulate(np.add, log_returns, 0.0)
+        drawdown = 1 - equity / _accumulate(np.maximum, equity, -np.inf)
+        rolling_sharpe = rolling_sharpe_ratio(pd.DataFrame(returns, index=market.index, copy=False), window).to_numpy()
+
+    results = []
+    for j, name in enumerate(names):
+        result = BacktestResult(name=name, index=market.index, close=market.close, signal=signals[:, j],
+                                position_size=position_sizes[:, j], position=positions[:, j], returns=returns[:, j],
+                                log_returns=log_returns[:, j], window=window, market=market)
+        # Fill the derived series BacktestResult would otherwise compute on first access
+        result.cumulative_equity = equity[:, j]
+        result.cumulative_returns = equity[:, j] - 1
+        result.cumulative_log_equity = cumulative_log_equity[:, j]
+        result.drawdown = drawdown[:, j]
+        result.rolling_sharpe = rolling_sharpe[:, j]
+        results.append(result)
+    return results
 
 
 if __name__ == "__main__":
@@ -111,9 +111,7 @@ if __name__ == "__main__":
     from app.services.strategy_module.indicators import average_move_from_open
     intra_df = fetch_binance_data(symbol='BTCUSDT', start_date='2020-01-01', end_date='2020-03-01',
     interval='30m')
-    daily_df = fetch_binance_data(symbol='BTCUSDT', start_date='2020-01-01', end_date='2020-03-01',
-    interval='1d')
-    sigma = average_move_from_open(intra_df, daily_df, 14)
+    sigma = average_move_from_open(intra_df, 14)
     
     # Get key prices
     #today_open = open_data.open[0]
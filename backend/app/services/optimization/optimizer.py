@@ -0,0 +1,223 @@
+# app/services/optimization/optimizer.py
+
+import asyncio
+import copy
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.models.backtest import StrategyInput
+from app.services.backtest.metrics import daily_strategy_metrics
+from app.services.strategy_service.strategy import StrategyService
+
+logger = logging.getLogger(__name__)
+
+# Metrics of calculate_metrics where lower is better
+MINIMIZED_METRICS = {'Volatility', 'Max Drawdown', 'Average Drawdown', 'Loss Rate', 'Max Consecutive Losses'}
+
+# Chunks of candidates per worker and round, so that uneven chunks still keep every worker busy
+CHUNKS_PER_WORKER = 4
+
+
+def set_parameter(strategy: Dict[str, Any], path: str, value: Any):
+    """Set the value at a dotted path of a strategy dict, such as 'entryRules.0.leftIndicator.params.window'."""
+    *parents, last = path.split('.')
+    target = strategy
+    try:
+        for key in parents:
+            target = target[int(key)] if isinstance(target, list) else target[key]
+        if isinstance(target, list):
+            target[int(last)] = value
+        elif isinstance(target, dict) and (last in target or parents and parents[-1] == 'params'):
+            # Indicator params may be set even when the template leaves them at their default
+            target[last] = value
+        else:
+            raise KeyError(last)
+    except (KeyError, IndexError, ValueError, TypeError):
+        raise ValueError(f"Unknown strategy parameter: {path}")
+
+
+def parameter_sets(parameters: Dict[str, List[Any]], method: str = 'grid', n_samples: Optional[int] = None,
+                   seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Parameter sets to evaluate: every combination of the candidate values for 'grid', or
+    n_samples distinct combinations drawn uniformly for 'random' (without listing the grid).
+    """
+    names = list(parameters)
+    if method == 'grid':
+        return [dict(zip(names, values)) for values in product(*(parameters[name] for name in names))]
+    if method != 'random':
+        raise ValueError(f"Unknown search method: {method}")
+    shape = tuple(len(parameters[name]) for name in names)
+    total = math.prod(shape)
+    n_samples = total if n_samples is None else min(n_samples, total)
+    draws = np.random.default_rng(seed).choice(total, size=n_samples, replace=False)
+    positions = np.unravel_index(draws, shape)
+    return [{name: parameters[name][int(position[k])] for name, position in zip(names, positions)}
+            for k in range(n_samples)]
+
+
+def candidate_strategies(template: StrategyInput, sets: List[Dict[str, Any]]) -> List[StrategyInput]:
+    """The template with each parameter set applied, validated as strategy inputs."""
+    # Unset fields are left out so that validators see the same input as the template's
+    template_dict = template.dict(exclude_unset=True)
+    candidates = []
+    for params in sets:
+        strategy = copy.deepcopy(template_dict)
+        for path, value in params.items():
+            set_parameter(strategy, path, value)
+        candidates.append(StrategyInput(**strategy))
+    return candidates
+
+
+@dataclass
+class Evaluation:
+    """Metrics of one parameter set on the first fraction of the history."""
+    params: Dict[str, Any]
+    fraction: float = 0.0
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def score(self, metric: str, maximize: bool) -> float:
+        """The metric, signed so that higher is better; -inf if it is missing."""
+        value = self.metrics.get(metric)
+        if value is None or not np.isfinite(value):
+            return -np.inf
+        return value if maximize else -value
+
+
+# First and last date of a part of the history; None for its start or end
+Window = Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]
+
+# Price data and costs of a worker process, set once by _init_worker
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def _init_worker(data_dict: Dict[str, pd.DataFrame], fees: float, slippage: float):
+    _WORKER_STATE.update(data_dict=data_dict, fees=fees, slippage=slippage)
+    # Thousands of candidates would flood the log with each one's strategy input
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def _evaluate_chunk(strategies: List[Dict[str, Any]], cutoff: Optional[pd.Timestamp] = None,
+                    windows: Optional[List[Window]] = None) -> List[Tuple[Optional[List[Dict[str, Any]]], Optional[str]]]:
+    """
+    (metrics, error) of each strategy backtested on the worker's data up to cutoff, where
+    metrics holds the metrics of each (first, last) date window (default: the whole backtest).
+    """
+    data_dict = _WORKER_STATE['data_dict']
+    if cutoff is not None:
+        data_dict = {key: df.loc[:cutoff] for key, df in data_dict.items()}
+    windows = windows or [(None, None)]
+    try:
+        # Strategies of a chunk are backtested together, sharing indicators and the matrix kernel
+        return [(metrics, None) for metrics in _evaluate(strategies, data_dict, windows)]
+    except Exception:
+        # Find out which strategies fail
+        results = []
+        for strategy in strategies:
+            try:
+                results.append((_evaluate([strategy], data_dict, windows)[0], None))
+            except Exception as e:
+                results.append((None, str(e)))
+        return results
+
+
+def _evaluate(strategies: List[Dict[str, Any]], data_dict: Dict[str, pd.DataFrame], windows: List[Window]) -> List[List[Dict[str, Any]]]:
+    # Names are made unique within the chunk; results come back in input order
+    inputs = [StrategyInput(**{**strategy, 'name': f"{strategy['name']}_{k}"}) for k, strategy in enumerate(strategies)]
+    service = StrategyService(inputs, _WORKER_STATE['fees'], _WORKER_STATE['slippage'])
+    results, _, _ = asyncio.run(service.process_strategies(data_dict))
+    metrics = []
+    for result in results:
+        returns = pd.Series(result.returns, index=result.index)
+        signal = pd.Series(result.signal, index=result.index)
+        # Windows are slices of one backtest, so indicators are computed once over the whole history.
+        # Candidates are scored on daily returns, as /api/backtest reports the strategy they would be re-run as
+        metrics.append([daily_strategy_metrics(returns.loc[first:last], signal.loc[first:last]) for first, last in windows])
+    return metrics
+
+
+class ParameterOptimizer:
+    """
+    Evaluates parameter sets of a strategy on a pool of worker processes. Price data is
+    sent to each worker once, when it starts, and candidates are sent in chunks that each
+    worker backtests together through StrategyService.
+    """
+    def __init__(self, data_dict: Dict[str, pd.DataFrame], fees: float, slippage: float, max_workers: Optional[int] = None):
+        self.data_dict = data_dict
+        self.fees = fees
+        self.slippage = slippage
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def pool(self) -> ProcessPoolExecutor:
+        """A pool of worker processes, each holding the price data and costs."""
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                   initargs=(self.data_dict, self.fees, self.slippage))
+
+    async def evaluate(self, pool: ProcessPoolExecutor, candidates: List[StrategyInput], cutoff: Optional[pd.Timestamp] = None,
+                       windows: Optional[List[Window]] = None) -> List[Tuple[Optional[List[Dict[str, Any]]], Optional[str]]]:
+        """(metrics per window, error) of each candidate, evaluated in chunks on pool; see _evaluate_chunk."""
+        if not candidates:
+            return []
+        loop = asyncio.get_running_loop()
+        chunks = np.array_split(np.arange(len(candidates)), min(len(candidates), self.max_workers * CHUNKS_PER_WORKER))
+        outputs = await asyncio.gather(*(
+            loop.run_in_executor(pool, _evaluate_chunk, [candidates[i].dict(exclude_unset=True) for i in chunk], cutoff, windows)
+            for chunk in chunks))
+        return [output for chunk_outputs in outputs for output in chunk_outputs]
+
+    async def optimize(self, candidates: List[StrategyInput], sets: List[Dict[str, Any]], metric: str = 'Sharpe Ratio',
+                       maximize: Optional[bool] = None, successive_halving: bool = False, halving_factor: int = 3,
+                       min_fraction: float = 0.25) -> List[Evaluation]:
+        """
+        Evaluate each candidate strategy (built from the parameter set at the same position)
+        and return the evaluations ranked by metric, best first.
+
+        With successive_halving, all candidates are first evaluated on the first min_fraction
+        of the history; the best 1/halving_factor of them go on to a halving_factor times
+        longer history, until the full history. Candidates stopped early rank after those
+        evaluated on more history.
+        """
+        if maximize is None:
+            maximize = metric not in MINIMIZED_METRICS
+        evaluations = [Evaluation(params) for params in sets]
+        fractions = [1.0]
+        if successive_halving:
+            rounds = max(math.ceil(math.log(1 / min_fraction, halving_factor) - 1e-9), 0)
+            fractions = [min(min_fraction * halving_factor ** r, 1.0) for r in range(rounds)] + [1.0]
+
+        with self.pool() as pool:
+            survivors = list(range(len(candidates)))
+            for r, fraction in enumerate(fractions):
+                outputs = await self.evaluate(pool, [candidates[i] for i in survivors], cutoff=self._cutoff(fraction))
+                for i, (metrics, error) in zip(survivors, outputs):
+                    evaluations[i].fraction = fraction
+                    evaluations[i].metrics = metrics[0] if metrics else {}
+                    evaluations[i].error = error
+                evaluated = next((evaluations[i].metrics for i in survivors if evaluations[i].metrics), None)
+                if evaluated is not None and metric not in evaluated:
+                    raise ValueError(f"Unknown metric: {metric}")
+                logger.info(f"Optimization round {r + 1}/{len(fractions)}: {len(survivors)} candidates on "
+                            f"{fraction:.0%} of the history")
+                if r < len(fractions) - 1:
+                    survivors.sort(key=lambda i: evaluations[i].score(metric, maximize), reverse=True)
+                    survivors = survivors[:max(1, math.ceil(len(survivors) / halving_factor))]
+
+        return sorted(evaluations, key=lambda evaluation: (evaluation.fraction, evaluation.score(metric, maximize)),
+                      reverse=True)
+
+    def _cutoff(self, fraction: float) -> Optional[pd.Timestamp]:
+        """Last date of the first fraction of the history, or None for all of it."""
+        if fraction >= 1:
+            return None
+        indexes = [df.index for key, df in self.data_dict.items() if not key.startswith('regime_') and len(df)]
+        start = min(index[0] for index in indexes)
+        end = max(index[-1] for index in indexes)
+        return start + (end - start) * fraction
+
@@ -0,0 +1,132 @@
+# app/services/optimization/walk_forward.py
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from app.models.backtest import StrategyInput
+from app.services.backtest.metrics import daily_strategy_metrics
+from app.services.backtest.result import BacktestResult
+from app.services.backtest.run_backtest import backtest_positions
+from app.services.optimization.optimizer import MINIMIZED_METRICS, Evaluation, ParameterOptimizer
+from app.services.strategy_service.strategy import StrategyService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Fold:
+    """An in-sample (train) and the following out-of-sample (test) window, by first and last date."""
+    train_start: pd.Timestamp
+    train_end: pd.Timestamp
+    test_start: pd.Timestamp
+    test_end: pd.Timestamp
+    params: Optional[Dict[str, Any]] = None  # Best parameter set on the train window; None if none could be scored
+    train_metrics: Dict[str, Any] = field(default_factory=dict)
+    test_metrics: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class WalkForwardResult:
+    folds: List[Fold]
+    result: BacktestResult  # Out-of-sample backtest of every fold, one after the other
+    metrics: Dict[str, Any]  # Metrics of result
+
+
+def walk_forward_folds(index: pd.Index, n_folds: int, train_fraction: float, anchored: bool = False) -> List[Fold]:
+    """
+    Folds of a history: the bars after the first train_fraction of it are split into n_folds
+    consecutive test windows (the last one takes the remainder), each trained on the bars
+    before it, either the same number of bars as the first train window or, if anchored,
+    all of them.
+    """
+    n_bars = len(index)
+    train_bars = int(n_bars * train_fraction)
+    test_bars = (n_bars - train_bars) // n_folds
+    if train_bars < 1 or test_bars < 1:
+        raise ValueError(f"{n_bars} bars are not enough for {n_folds} folds with a train fraction of {train_fraction}")
+    folds = []
+    for k in range(n_folds):
+        test_start = train_bars + k * test_bars
+        test_end = n_bars if k == n_folds - 1 else test_start + test_bars
+        train_start = 0 if anchored else test_start - train_bars
+        folds.append(Fold(index[train_start], index[test_start - 1], index[test_start], index[test_end - 1]))
+    return folds
+
+
+async def walk_forward(optimizer: ParameterOptimizer, candidates: List[StrategyInput], sets: List[Dict[str, Any]],
+                       n_folds: int = 5, train_fraction: float = 0.5, anchored: bool = False,
+                       metric: str = 'Sharpe Ratio', maximize: Optional[bool] = None) -> WalkForwardResult:
+    """
+    Walk-forward analysis: for each fold, pick the candidate (built from the parameter set
+    at the same position) with the best metric on the train window, then trade it on the
+    test window. The test windows are stitched into one out-of-sample backtest. A fold on
+    which no candidate has a finite metric (they failed, or the metric is undefined, like
+    a Sortino ratio without losses) stays flat, with params None.
+
+    Each candidate is backtested once over the whole history on the optimizer's pool and
+    its train windows are slices of that backtest, so indicators are computed once rather
+    than per fold, and warmed up at the start of every window. All folds of a chunk of
+    candidates are scored by the same worker.
+    """
+    if maximize is None:
+        maximize = metric not in MINIMIZED_METRICS
+    frequency = candidates[0].frequency
+    df = optimizer.data_dict[frequency]
+    folds = walk_forward_folds(df.index, n_folds, train_fraction, anchored)
+
+    with optimizer.pool() as pool:
+        outputs = await optimizer.evaluate(pool, candidates, windows=[(fold.train_start, fold.train_end) for fold in folds])
+    evaluated = next((metrics[0] for metrics, _ in outputs if metrics), None)
+    if evaluated is None:
+        raise ValueError(f"No parameter set could be backtested: {outputs[0][1]}")
+    if metric not in evaluated:
+        raise ValueError(f"Unknown metric: {metric}")
+
+    # (candidate x fold) scores, higher is better
+    scores = np.array([[Evaluation(params, metrics=window_metrics).score(metric, maximize) for window_metrics in metrics]
+                       if metrics else [-np.inf] * len(folds) for params, (metrics, _) in zip(sets, outputs)])
+    # argmax returns the first candidate when all of them score -inf, so those folds have no best candidate
+    best = [int(i) if np.isfinite(scores[i, k]) else None for k, i in enumerate(scores.argmax(axis=0))]
+    for k, fold in enumerate(folds):
+        if best[k] is None:
+            logger.warning(f"Walk-forward fold {k + 1}/{len(folds)}: no parameter set could be scored on {metric}, "
+                           f"the fold stays flat")
+            continue
+        fold.params = sets[best[k]]
+        fold.train_metrics = outputs[best[k]][0][k]
+        logger.info(f"Walk-forward fold {k + 1}/{len(folds)}: best {metric} {fold.train_metrics[metric]} with {fold.params}")
+
+    # Signals and sizes of each fold's best candidate over its test window, from a backtest on the whole history
+    chosen = sorted({i for i in best if i is not None})
+    results = {}
+    if chosen:
+        inputs = [candidates[i].copy(update={'name': f'{candidates[i].name}_{i}'}) for i in chosen]
+        service = StrategyService(inputs, optimizer.fees, optimizer.slippage)
+        backtests, _, _ = await service.process_strategies(optimizer.data_dict)
+        results = dict(zip(chosen, backtests))
+
+    start = df.index.get_loc(folds[0].test_start)
+    signal = np.zeros(len(df) - start)
+    position_size = np.zeros(len(df) - start)
+    for k, fold in enumerate(folds):
+        if best[k] is None:
+            continue
+        window = slice(df.index.get_loc(fold.test_start), df.index.get_loc(fold.test_end) + 1)
+        stitched = slice(window.start - start, window.stop - start)
+        signal[stitched] = results[best[k]].signal[window]
+        position_size[stitched] = results[best[k]].position_size[window]
+    # Costs of switching parameter sets between folds are paid like any other position change
+    result, = backtest_positions(df.index[start:], df['Close'].to_numpy(dtype=float)[start:], [candidates[0].name],
+                                 signal[:, None], position_size[:, None], optimizer.fees / 100, optimizer.slippage / 100)
+
+    # Scored on daily returns like the train windows (see optimizer._evaluate)
+    returns = pd.Series(result.returns, index=result.index)
+    signal = pd.Series(result.signal, index=result.index)
+    for fold in folds:
+        window = slice(fold.test_start, fold.test_end)
+        fold.test_metrics = daily_strategy_metrics(returns.loc[window], signal.loc[window])
+    metrics = daily_strategy_metrics(returns, signal)
+    return WalkForwardResult(folds, result, metrics)
+
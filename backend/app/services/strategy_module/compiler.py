@@ -0,0 +1,424 @@
+# compiler.py
+
+from dataclasses import dataclass, field
+from functools import reduce
+from typing import Any, Dict, List, Optional, Tuple, Union
+import pandas as pd
+import numpy as np
+from app.services.strategy_module.indicators import INDICATORS, INDICATOR_SPECS
+from app.services.strategy_module.profiling import EvaluationProfile
+from app.services.strategy_module.indicator_cache import IndicatorCache, DataFingerprint
+from app.services.strategy_module.expressions import (
+    Indicator, CompositeIndicator, Rule, CompositeRule, parse_indicator, indicator_cache_key
+)
+
+COMPARISONS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+
+@dataclass(frozen=True)
+class Node:
+    """A single operation in a compiled rule plan.
+
+    kind is one of 'const', 'column', 'indicator', 'function', 'compare' or 'logic'.
+    args holds the ids of the input nodes, value the constant for 'const' nodes.
+    """
+    kind: str
+    name: Optional[str] = None
+    args: Tuple[int, ...] = ()
+    value: Any = None
+
+    @property
+    def key(self) -> Tuple:
+        if self.kind == 'const':
+            return (self.kind, type(self.value).__name__, self.value)
+        return (self.kind, self.name, self.args)
+
+
+@dataclass
+class RulePlan:
+    """A DAG of unique nodes shared by any number of rules.
+
+    Nodes are stored in topological order: every node only refers to nodes
+    with a smaller id, so a plan can be evaluated front to back.
+    """
+    nodes: List[Node] = field(default_factory=list)
+    roots: Dict[str, int] = field(default_factory=dict)
+    _ids: Dict[Tuple, int] = field(default_factory=dict, repr=False)
+
+    def add_node(self, node: Node) -> int:
+        """Add a node, returning the id of an existing identical node if there is one."""
+        node_id = self._ids.get(node.key)
+        if node_id is None:
+            node_id = len(self.nodes)
+            self.nodes.append(node)
+            self._ids[node.key] = node_id
+        return node_id
+
+    def add_rule(self, name: str, rule: Union[Rule, CompositeRule]) -> int:
+        """Compile a parsed rule into the plan and register it under name."""
+        root = self._compile_rule(rule)
+        self.roots[name] = root
+        return root
+
+    def label(self, node_id: int) -> str:
+        """Canonical text of a node, matching str() of the parsed expression."""
+        node = self.nodes[node_id]
+        if node.kind == 'const':
+            return str(node.value)
+        if node.kind == 'column':
+            return node.name
+        if node.kind in ('indicator', 'function'):
+            if not node.args:
+                return node.name
+            return f"{node.name}({', '.join(self.label(arg) for arg in node.args)})"
+        left, right = (self.label(arg) for arg in node.args)
+        return f"({left} {node.name} {right})"
+
+    def warmup(self, node_id: int) -> Optional[int]:
+        """Leading rows for which a node has no value yet, or None if that depends on the data."""
+        node = self.nodes[node_id]
+        inputs = [self.warmup(arg) for arg in node.args]
+        if None in inputs:
+            return None
+        start = max(inputs, default=0)
+        if node.kind == 'indicator':
+            spec = INDICATOR_SPECS[node.name]
+            params = [self.nodes[arg].value for arg in node.args if self.nodes[arg].kind == 'const']
+            own = spec.warmup(*params)
+            if own is None:
+                return None
+            # A series indicator only starts counting once its input has values
+            return start + own if spec.inputs == 'series' else own
+        if node.kind == 'function' and node.name == 'shift':
+            periods = self.nodes[node.args[1]].value if len(node.args) == 2 else 0
+            return start + max(int(periods or 0), 0)
+        return start
+
+    def indicator_nodes(self) -> List[int]:
+        return [i for i, node in enumerate(self.nodes) if node.kind == 'indicator']
+
+    def _compile_rule(self, rule: Union[Rule, CompositeRule]) -> int:
+        if isinstance(rule, Rule):
+            left = self._compile_operand(rule.left)
+            right = self._compile_operand(rule.right)
+            return self.add_node(Node('compare', rule.operator, (left, right)))
+        elif isinstance(rule, CompositeRule):
+            result = self._compile_rule(rule.rule)
+            if rule.logic is None or rule.next_rule is None:
+                return result
+            next_result = self._compile_rule(rule.next_rule)
+            return self.add_node(Node('logic', rule.logic, (result, next_result)))
+        else:
+            raise ValueError(f"Unsupported rule type: {type(rule)}")
+
+    def _compile_operand(self, operand: Union[Indicator, CompositeIndicator, float, int, str]) -> int:
+        if isinstance(operand, bool) or not isinstance(operand, (Indicator, CompositeIndicator, int, float, str)):
+            raise ValueError(f"Unsupported indicator type: {type(operand)}")
+        if isinstance(operand, (int, float)):
+            return self.add_node(Node('const', value=operand))
+        if isinstance(operand, str):
+            # String parameters are either column names or nested indicator expressions
+            if '(' in operand:
+                return self._compile_operand(parse_indicator(operand))
+            return self.add_node(Node('column', operand))
+        if isinstance(operand, CompositeIndicator):
+            args = tuple(self._compile_operand(ind) for ind in operand.indicators)
+            return self.add_node(Node('function', operand.function, args))
+        if operand.name in INDICATORS:
+            args = tuple(self._compile_operand(param) for param in operand.params)
+            return self.add_node(Node('indicator', operand.name, args))
+        return self.add_node(Node('column', operand.name))
+
+
+def compile_rules(rules: Dict[str, Union[Rule, CompositeRule, None]], plan: Optional[RulePlan] = None) -> RulePlan:
+    """Compile named rules into a single plan, sharing common subexpressions."""
+    plan = plan if plan is not None else RulePlan()
+    for name, rule in rules.items():
+        if rule is not None:
+            plan.add_rule(name, rule)
+    return plan
+
+
+class PlanEvaluator:
+    """Evaluates the nodes of a plan on one DataFrame, computing each node at most once.
+
+    With fused=True (the default) the boolean part of a rule (comparisons and
+    and/or) is evaluated as a single kernel writing into preallocated buffers
+    instead of materializing one array per node. chunk_size additionally limits
+    those buffers to chunk_size rows at a time.
+    """
+
+    def __init__(self, plan: RulePlan, df: pd.DataFrame, fused: bool = True, chunk_size: Optional[int] = None,
+                 profile: Optional[EvaluationProfile] = None, frequency: Optional[str] = None,
+                 cache: Optional[IndicatorCache] = None):
+        self.plan = plan
+        self.df = df
+        self.fused = fused
+        self.chunk_size = chunk_size
+        self.profile = profile
+        self.frequency = frequency
+        self.cache = cache
+        self._fingerprint: Optional[DataFingerprint] = None
+        self._values: Dict[int, Any] = {}
+
+    def value(self, node_id: int) -> Any:
+        """Return the values of a node, evaluating any inputs that are still missing."""
+        if node_id in self._values:
+            return self._values[node_id]
+        for i in self._pending(node_id):
+            if self.profile is None or self.plan.nodes[i].kind == 'const':
+                self._values[i] = self._evaluate_node(i)
+            else:
+                self._values[i] = self.profile.run(self.plan.label(i), self.plan.nodes[i].kind, len(self.df), self._evaluate_node, i)
+        return self._values[node_id]
+
+    def evaluate_window_groups(self, node_ids: Optional[List[int]] = None):
+        """Evaluate window indicators on the same input together with the multi-window kernels.
+
+        SMA, Rolling_High and Rolling_Low nodes among node_ids (default: every
+        indicator node) that share their input series are computed in one
+        window_kernel call, and each node's column is stored as its value.
+        """
+        groups: Dict[Tuple[str, int], Dict[int, int]] = {}
+        for node_id in self.plan.indicator_nodes() if node_ids is None else node_ids:
+            node = self.plan.nodes[node_id]
+            if node_id in self._values or INDICATOR_SPECS[node.name].window_kernel is None or len(node.args) != 2:
+                continue
+            window = self.plan.nodes[node.args[1]]
+            if window.kind != 'const' or type(window.value) is not int or window.value < 1:
+                continue
+            if self.plan.label(node_id) in self.df.columns:
+                continue
+            groups.setdefault((node.name, node.args[0]), {})[node_id] = window.value
+
+        for (name, source), windows in groups.items():
+            if self.cache is not None:
+                for node_id in list(windows):
+                    cached = self.cache.get(self._cache_key(node_id))
+                    if cached is not None:
+                        self._values[node_id] = cached
+                        del windows[node_id]
+                if not windows:
+                    continue
+            values = self.value(source)
+            if not isinstance(values, np.ndarray):
+                continue
+            kernel = INDICATOR_SPECS[name].window_kernel
+            # Indicators are shifted by one bar, see indicators.py
+            if self.profile is None:
+                result = kernel(values, list(windows.values()), lag=1)
+            else:
+                label = f"{name}({self.plan.label(source)}, [{', '.join(map(str, windows.values()))}])"
+                result = self.profile.run(label, 'indicator', len(self.df), kernel, values, list(windows.values()), 1)
+            for j, node_id in enumerate(windows):
+                self._values[node_id] = result[:, j] if self.cache is None else self.cache.put(self._cache_key(node_id), result[:, j])
+
+    def evaluate(self, name: str) -> np.ndarray:
+        """Evaluate the rule registered under name to a boolean array."""
+        if self.fused:
+            return self.evaluate_mask(self.plan.roots[name], chunk_size=self.chunk_size)
+        return self.value(self.plan.roots[name])
+
+    def evaluate_mask(self, node_id: int, out: Optional[np.ndarray] = None, chunk_size: Optional[int] = None) -> np.ndarray:
+        """Evaluate a boolean node as one fused kernel.
+
+        Indicator operands are computed (once) on the full index, comparisons and
+        logic are accumulated in place into out, one chunk of rows at a time.
+        """
+        length = len(self.df)
+        if out is None:
+            out = np.empty(length, dtype=bool)
+        for operand in self._operands(node_id):
+            self.value(operand)
+        chunk_size = min(chunk_size or length, length) or 1
+        if self.profile is None:
+            return self._fill_chunks(node_id, out, chunk_size)
+        return self.profile.run(f"mask {self.plan.label(node_id)}", 'mask', length, self._fill_chunks, node_id, out, chunk_size)
+
+    def _fill_chunks(self, node_id: int, out: np.ndarray, chunk_size: int) -> np.ndarray:
+        buffers: List[np.ndarray] = []
+        for start in range(0, len(out), chunk_size):
+            rows = slice(start, min(start + chunk_size, len(out)))
+            self._fill_mask(node_id, rows, out[rows], buffers, 0)
+        return out
+
+    def _operands(self, node_id: int) -> List[int]:
+        """Non-boolean inputs of the comparisons below a boolean node."""
+        operands = []
+        stack = [node_id]
+        while stack:
+            node = self.plan.nodes[stack.pop()]
+            if node.kind == 'logic':
+                stack.extend(node.args)
+            elif node.kind == 'compare':
+                operands.extend(node.args)
+            else:
+                raise ValueError(f"Expected a comparison or logic node, got {node.kind}")
+        return operands
+
+    def _fill_mask(self, node_id: int, rows: slice, out: np.ndarray, buffers: List[np.ndarray], depth: int):
+        node = self.plan.nodes[node_id]
+        if node.kind == 'compare':
+            left, right = (self._values[arg] for arg in node.args)
+            # Scalars broadcast in the ufunc, arrays are sliced as views
+            left = left[rows] if np.ndim(left) else left
+            right = right[rows] if np.ndim(right) else right
+            COMPARISONS[node.name](left, right, out=out)
+            return
+        self._fill_mask(node.args[0], rows, out, buffers, depth)
+        # Skip the right-hand side when the left side already decides the chunk
+        if node.name == 'and':
+            if not out.any():
+                return
+        elif node.name == 'or':
+            if out.all():
+                return
+        else:
+            raise ValueError(f"Unsupported logic: {node.name}")
+        if len(buffers) <= depth:
+            buffers.append(np.empty(len(out), dtype=bool))
+        buffer = buffers[depth][:len(out)]
+        self._fill_mask(node.args[1], rows, buffer, buffers, depth + 1)
+        if node.name == 'and':
+            np.logical_and(out, buffer, out=out)
+        else:
+            np.logical_or(out, buffer, out=out)
+
+    def bind(self, name: str) -> 'BoundRule':
+        return BoundRule(self, name)
+
+    def _pending(self, node_id: int) -> List[int]:
+        """Ids of all not-yet-evaluated nodes node_id depends on, in evaluation order."""
+        pending = set()
+        stack = [node_id]
+        while stack:
+            i = stack.pop()
+            if i in pending or i in self._values:
+                continue
+            pending.add(i)
+            stack.extend(self.plan.nodes[i].args)
+        return sorted(pending)
+
+    def _evaluate_node(self, node_id: int) -> Any:
+        node = self.plan.nodes[node_id]
+        if node.kind == 'const':
+            return node.value
+        if node.kind == 'column':
+            if node.name not in self.df.columns:
+                raise ValueError(f"Unknown indicator: {node.name}")
+            return self.df[node.name].values
+        args = [self._values[arg] for arg in node.args]
+        if node.kind == 'indicator':
+            return self._evaluate_indicator(node_id, args)
+        if node.kind == 'function':
+            return evaluate_function(node.name, args, len(self.df))
+        if node.kind == 'compare':
+            return _as_array(COMPARISONS[node.name](args[0], args[1]), len(self.df))
+        if node.kind == 'logic':
+            if node.name == 'and':
+                return args[0] & args[1]
+            elif node.name == 'or':
+                return args[0] | args[1]
+            raise ValueError(f"Unsupported logic: {node.name}")
+        raise ValueError(f"Unsupported node kind: {node.kind}")
+
+    def _evaluate_indicator(self, node_id: int, args: List[Any]) -> np.ndarray:
+        node = self.plan.nodes[node_id]
+        # Columns written by add_indicators are reused instead of recomputed
+        label = self.plan.label(node_id)
+        if label in self.df.columns:
+            return self.df[label].values
+        if self.cache is None:
+            return self._compute_indicator(node, args)
+        return self.cache.get_or_create(self._cache_key(node_id), lambda: self._compute_indicator(node, args))
+
+    def _compute_indicator(self, node: Node, args: List[Any]) -> np.ndarray:
+        spec = INDICATOR_SPECS[node.name]
+        if spec.inputs == 'frame':
+            # A known bar frequency saves frame indicators from inferring it
+            options = {'frequency': self.frequency} if spec.uses_frequency and self.frequency is not None else {}
+            return INDICATORS[node.name](self.df, *args, **options).values
+        params = [pd.Series(arg, index=self.df.index) if isinstance(arg, np.ndarray) else arg for arg in args]
+        return INDICATORS[node.name](*params).values
+
+    def _cache_key(self, node_id: int) -> Tuple:
+        if self._fingerprint is None:
+            self._fingerprint = DataFingerprint(self.df)
+        return indicator_cache_key(self._fingerprint, self.plan.label(node_id))
+
+
+@dataclass
+class BoundRule:
+    """A plan root bound to an evaluator, usable wherever a CompositeRule is evaluated."""
+    evaluator: PlanEvaluator
+    name: str
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        if df is not self.evaluator.df:
+            evaluator = PlanEvaluator(self.evaluator.plan, df, self.evaluator.fused, self.evaluator.chunk_size, self.evaluator.profile,
+                                      self.evaluator.frequency, self.evaluator.cache)
+            return evaluator.evaluate(self.name)
+        return self.evaluator.evaluate(self.name)
+
+
+def evaluate_function(function: str, values: List[Any], length: int) -> np.ndarray:
+    """Apply a composite indicator function to already evaluated inputs."""
+    if function == 'shift':
+        if len(values) != 2:
+            raise ValueError("Shift function requires exactly two parameters: indicator and periods")
+        series, periods = values
+        if not isinstance(periods, (int, float)):
+            raise ValueError("Shift periods must be a number")
+        return shift_values(_as_array(series, length), int(periods))
+    elif function == 'max':
+        return _as_array(reduce(np.maximum, values), length)
+    elif function == 'min':
+        return _as_array(reduce(np.minimum, values), length)
+    elif function == 'mean':
+        return _as_array(reduce(np.add, values) / len(values), length)
+    elif function == 'add':
+        return _as_array(reduce(np.add, values), length)
+    elif function == 'subtract':
+        if len(values) != 2:
+            raise ValueError("Subtract function requires exactly two indicators")
+        return _as_array(np.subtract(values[0], values[1]), length)
+    elif function == 'multiply':
+        return _as_array(reduce(np.multiply, values), length)
+    elif function == 'divide':
+        if len(values) != 2:
+            raise ValueError("Divide function requires exactly two indicators")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = _as_array(np.true_divide(values[0], values[1]), length)
+            result[~np.isfinite(result)] = np.nan  # Replace -inf, inf, NaN with NaN
+        return result
+    else:
+        raise ValueError(f"Unsupported function in composite indicator: {function}")
+
+
+def shift_values(values: np.ndarray, periods: int) -> np.ndarray:
+    """NumPy equivalent of pd.Series.shift for a 1D array."""
+    result = np.empty(len(values), dtype=np.result_type(values.dtype, np.float64))
+    if periods == 0:
+        result[:] = values
+    elif periods > 0:
+        result[:periods] = np.nan
+        result[periods:] = values[:-periods]
+    else:
+        result[periods:] = np.nan
+        result[:periods] = values[-periods:]
+    return result
+
+
+def _as_array(values: Any, length: int) -> np.ndarray:
+    """Broadcast scalar results to a full-length array."""
+    if np.ndim(values) == 0:
+        return np.full(length, values)
+    return np.asarray(values)
+
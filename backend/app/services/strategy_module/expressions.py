@@ -1,11 +1,15 @@
 # expressions.py
 
 from dataclasses import dataclass, field
-from typing import Union, Optional, Literal, Tuple, List
+from typing import Union, Optional, Literal, Tuple, List, Iterable, Set
 import pandas as pd
 import numpy as np
 import re
-from app.services.strategy_module.indicators import INDICATORS
+import logging
+from app.services.strategy_module.indicators import INDICATORS, INDICATOR_SPECS
+from app.services.strategy_module.indicator_cache import INDICATOR_CACHE, DataFingerprint
+
+logger = logging.getLogger(__name__)
 
 @dataclass(frozen=True)
 class Indicator:
@@ -21,10 +25,13 @@ class Indicator:
         else:
             return f"{self.name}"
 
-@dataclass
+@dataclass(frozen=True)
 class CompositeIndicator:
     function: str
-    indicators: List[Indicator]
+    indicators: Tuple = field(default_factory=tuple)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'indicators', tuple(self.indicators))
 
     def __str__(self):
         indicators_str = ', '.join(str(ind) for ind in self.indicators)
@@ -38,14 +45,19 @@ class Rule:
     operator: Literal['<', '<=', '>', '>=', '==', '!=']
     right: Union[Indicator, float]
 
-    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
-        """Evaluate the rule on the given DataFrame."""
-        left_values = self._get_indicator_values(self.left, df)
+    def evaluate(self, df: pd.DataFrame, fingerprint: Optional[DataFingerprint] = None) -> np.ndarray:
+        """
+        Evaluate the rule on the given DataFrame. fingerprint can be a DataFingerprint of df
+        shared with other rules, so that df is hashed once for the indicator cache.
+        """
+        if fingerprint is None:
+            fingerprint = DataFingerprint(df)
+        left_values = self._get_indicator_values(self.left, df, fingerprint)
 
         if isinstance(self.right, (Indicator, CompositeIndicator)):
-            right_values = self._get_indicator_values(self.right, df)
+            right_values = self._get_indicator_values(self.right, df, fingerprint)
         else:
-            right_values = np.full(len(df), self.right)
+            right_values = self.right  # Scalars broadcast in the comparison
 
         # Perform the comparison
         if self.operator == '<':
@@ -64,12 +76,13 @@ class Rule:
             raise ValueError(f"Unsupported operator: {self.operator}")
 
 
-    def _get_indicator_values(self, indicator: Union[Indicator, CompositeIndicator], df: pd.DataFrame) -> np.ndarray:
+    def _get_indicator_values(self, indicator: Union[Indicator, CompositeIndicator], df: pd.DataFrame,
+                              fingerprint: DataFingerprint) -> np.ndarray:
         if isinstance(indicator, float):
             # Return an array filled with the constant value
             return np.full(len(df), indicator)
         elif isinstance(indicator, CompositeIndicator):
-            return self._evaluate_composite_indicator(indicator, df)
+            return self._evaluate_composite_indicator(indicator, df, fingerprint)
         elif isinstance(indicator, Indicator):
             # Evaluate simple indicators
             if indicator.name in ['Open', 'High', 'Low', 'Close', 'Volume', 'BTC-USD']:
@@ -77,39 +90,45 @@ class Rule:
             elif indicator.name in df.columns:
                 return df[indicator.name].values
             elif indicator.name in INDICATORS:
-                # Handle indicator functions
-                if indicator.name == 'VWAP' or indicator.name == 'Average_Move_From_Open':
-                    # For VWAP, pass the whole DataFrame
-                    return INDICATORS[indicator.name](df).values
-                else:
-                    # Prepare parameters for the indicator function
-                    params = []
-                    for param in indicator.params:
-                        if isinstance(param, (int, float)):
-                            params.append(param)
-                        elif isinstance(param, pd.Series):
-                            params.append(param)
-                        elif isinstance(param, str):
-                            if param in df.columns:
-                                # Parameter is a column name
-                                params.append(df[param])
-                            else:
-                                # Try parsing parameter as an indicator
-                                sub_indicator = parse_indicator(param)
-                                param_values = self._get_indicator_values(sub_indicator, df)
-                                params.append(param_values)
-                        else:
-                            raise ValueError(f"Invalid parameter type: {param}")
-                    # Call the indicator function with evaluated parameters
-                    return INDICATORS[indicator.name](*params).values
+                # Indicator functions are shared across requests on the same data through the indicator cache
+                key = indicator_cache_key(fingerprint, str(indicator))
+                return INDICATOR_CACHE.get_or_create(key, lambda: self._compute_indicator(indicator, df, fingerprint))
             else:
                 raise ValueError(f"Unknown indicator: {indicator.name}")
         else:
             raise ValueError(f"Unsupported indicator type: {type(indicator)}")
 
-    def _evaluate_composite_indicator(self, composite_indicator: CompositeIndicator, df: pd.DataFrame) -> np.ndarray:
+    def _compute_indicator(self, indicator: Indicator, df: pd.DataFrame, fingerprint: DataFingerprint) -> np.ndarray:
+        if INDICATOR_SPECS[indicator.name].inputs == 'frame':
+            # Frame indicators take the whole DataFrame followed by their numeric parameters
+            return INDICATORS[indicator.name](df, *indicator.params).values
+        # Prepare parameters for the indicator function
+        params = []
+        for param in indicator.params:
+            if isinstance(param, (int, float)):
+                params.append(param)
+            elif isinstance(param, pd.Series):
+                params.append(param)
+            elif isinstance(param, (Indicator, CompositeIndicator)):
+                params.append(pd.Series(self._get_indicator_values(param, df, fingerprint), index=df.index))
+            elif isinstance(param, str):
+                if param in df.columns:
+                    # Parameter is a column name
+                    params.append(df[param])
+                else:
+                    # Try parsing parameter as an indicator
+                    sub_indicator = parse_indicator(param)
+                    param_values = self._get_indicator_values(sub_indicator, df, fingerprint)
+                    params.append(param_values)
+            else:
+                raise ValueError(f"Invalid parameter type: {param}")
+        # Call the indicator function with evaluated parameters
+        return INDICATORS[indicator.name](*params).values
+
+    def _evaluate_composite_indicator(self, composite_indicator: CompositeIndicator, df: pd.DataFrame,
+                                      fingerprint: DataFingerprint) -> np.ndarray:
         # Evaluate each indicator in the composite indicator
-        indicator_values = [self._get_indicator_values(ind, df) for ind in composite_indicator.indicators]
+        indicator_values = [self._get_indicator_values(ind, df, fingerprint) for ind in composite_indicator.indicators]
         # Apply the function to the indicator values
         if composite_indicator.function == 'shift':
             if len(indicator_values) != 2:
@@ -154,13 +173,15 @@ class CompositeRule:
     logic: Optional[Literal['and', 'or']] = None
     next_rule: Optional[Union[Rule, 'CompositeRule']] = None
 
-    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
-        """Evaluate the composite rule on the given DataFrame."""
-        result = self.rule.evaluate(df)
+    def evaluate(self, df: pd.DataFrame, fingerprint: Optional[DataFingerprint] = None) -> np.ndarray:
+        """Evaluate the composite rule on the given DataFrame, hashing df once for all its rules."""
+        if fingerprint is None:
+            fingerprint = DataFingerprint(df)
+        result = self.rule.evaluate(df, fingerprint)
         if self.logic is None or self.next_rule is None:
             return result
 
-        next_result = self.next_rule.evaluate(df)
+        next_result = self.next_rule.evaluate(df, fingerprint)
         if self.logic == 'and':
             return result & next_result
         elif self.logic == 'or':
@@ -169,102 +190,225 @@ class CompositeRule:
             raise ValueError(f"Unsupported logic: {self.logic}")
 
 
-import re
-from typing import Union
+BASE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'BTC-USD']
+COMPOSITE_FUNCTIONS = ['max', 'min', 'mean', 'add', 'subtract', 'multiply', 'divide', 'shift']
 
-def parse_indicator(indicator_str: str) -> Union[Indicator, CompositeIndicator, float]:
-    print(f"Parsing indicator: {indicator_str}")
-    # First, check if indicator_str is a number (constant)
-    if is_number(indicator_str):
-        return float(indicator_str)
-    
-    # Update regex to include 'shift'
-    composite_match = re.match(r'(max|min|mean|add|subtract|multiply|divide|shift)\((.*)\)', indicator_str)
-    if composite_match:
-        function_name, params_str = composite_match.groups()
-        # Split the parameters, which may include nested functions
-        params = split_params(params_str)
-        indicators = [parse_indicator(param.strip()) for param in params]
-        return CompositeIndicator(function=function_name, indicators=indicators)
-
-    # Handle base price columns without parameters
-    if indicator_str in ['Open', 'High', 'Low', 'Close', 'Volume', 'BTC-USD']:
-        return Indicator(indicator_str)
-
-    # Handle empty or missing parameters
-    if indicator_str.endswith('()'):
-        base_name = indicator_str[:-2]
-        if base_name in ['Open', 'High', 'Low', 'Close', 'Volume', 'BTC-USD']:
-            return Indicator(base_name)
-        else:
-            raise ValueError(f"Invalid indicator without parameters: {indicator_str}")
-
-    # Parse indicators with parameters
-    match = re.match(r'([\w-]+)\((.*)\)', indicator_str)
-    if not match:
-        raise ValueError(f"Invalid indicator format: {indicator_str}")
-    
-    name, params_str = match.groups()
-    params = [param.strip() for param in params_str.split(',') if param.strip()]
-    
-    # For indicators requiring series parameter, ensure correct order and defaults
-    if name in ['SMA', 'EMA', 'Rolling_High', 'Rolling_Low', 'MA_trend']:
-        parsed_params = []
-        if not params:
-            # If no parameters provided, use defaults
-            if name in ['SMA', 'EMA']:
-                parsed_params = ['Close', 20]  # Default to Close with 20 period window
-            elif name in ['Rolling_High', 'Rolling_Low']:
-                parsed_params = ['Close', 14]  # Default to Close with 14 period window
-            elif name == 'MA_trend':
-                parsed_params = ['Close', 20, 5]  # Default values for MA_trend
+# Single-pass tokenizer: one alternation per token type, tried in order.
+# Numbers directly after an operator, '(' or ',' may carry a sign (e.g. shift(Close,-1)).
+TOKEN_PATTERN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<number>(?<![\w)])[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+  | (?P<name>[A-Za-z_][\w-]*)
+  | (?P<op><=|>=|==|!=|<|>)
+  | (?P<lparen>\()
+  | (?P<rparen>\))
+  | (?P<comma>,)
+""", re.VERBOSE)
+
+LOGIC_OPERATORS = ['and', 'or']
+# Binding powers: comparisons bind tighter than 'and', which binds tighter than 'or'
+BINDING_POWER = {'or': 10, 'and': 20, 'op': 30}
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str
+    text: str
+    pos: int
+
+
+def tokenize(text: str) -> List[Token]:
+    """Split a rule string into tokens in a single left-to-right pass."""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = TOKEN_PATTERN.match(text, pos)
+        if not match:
+            raise ValueError(f"Invalid character {text[pos]!r} at position {pos} in rule: {text}")
+        kind = match.lastgroup
+        if kind != 'ws':
+            token_text = match.group()
+            if kind == 'name' and token_text in LOGIC_OPERATORS:
+                kind = 'logic'
+            tokens.append(Token(kind, token_text, pos))
+        pos = match.end()
+    tokens.append(Token('end', '', len(text)))
+    return tokens
+
+
+class RuleParser:
+    """Pratt parser for the rule grammar.
+
+    rule    := rule ('and' | 'or') rule | operand op operand | '(' rule ')'
+    operand := number | name | name '(' [operand (',' operand)*] ')'
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def parse_rule(self) -> CompositeRule:
+        result = self._parse_expression(0)
+        self._expect('end')
+        if isinstance(result, Rule):
+            return CompositeRule(result)
+        if not isinstance(result, CompositeRule):
+            raise ValueError(f"Invalid rule: {self.text}. No valid operator found.")
+        return result
+
+    def parse_operand(self) -> Union[Indicator, CompositeIndicator, float]:
+        result = self._parse_operand()
+        self._expect('end')
+        return result
+
+    def _peek(self) -> Token:
+        return self.tokens[self.pos]
+
+    def _next(self) -> Token:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _expect(self, kind: str) -> Token:
+        token = self._next()
+        if token.kind != kind:
+            expected = {'end': 'end of rule', 'rparen': "')'", 'lparen': "'('"}.get(kind, kind)
+            raise ValueError(f"Expected {expected} at position {token.pos} in rule: {self.text}")
+        return token
+
+    def _binding_power(self, token: Token) -> int:
+        if token.kind == 'logic':
+            return BINDING_POWER[token.text]
+        return BINDING_POWER.get(token.kind, 0)
+
+    def _parse_expression(self, rbp: int):
+        if self._peek().kind == 'lparen':
+            self._next()
+            left = self._parse_expression(0)
+            self._expect('rparen')
         else:
-            # Process provided parameters
-            series_param = 'Close'  # Default series
-            numeric_params = []
-            
-            for param in params:
-                if param.isdigit() or is_number(param):
-                    numeric_params.append(int(param) if param.isdigit() else float(param))
-                else:
-                    series_param = param
-            
-            if name == 'MA_trend':
-                if len(numeric_params) == 2:
-                    parsed_params = [series_param] + numeric_params
-                else:
-                    raise ValueError(f"MA_trend requires series and two numeric parameters: {params_str}")
+            left = self._parse_operand()
+        while rbp < self._binding_power(self._peek()):
+            token = self._next()
+            if token.kind == 'op':
+                left = self._comparison(left, token)
             else:
-                if len(numeric_params) == 1:
-                    parsed_params = [series_param, numeric_params[0]]
-                else:
-                    raise ValueError(f"{name} requires series and one numeric parameter: {params_str}")
-    else:
-        # For other indicators, parse parameters normally
-        parsed_params = []
+                left = self._logic(left, token)
+        return left
+
+    def _comparison(self, left, token: Token) -> Rule:
+        if isinstance(left, (Rule, CompositeRule)):
+            raise ValueError(f"Unexpected operator {token.text!r} at position {token.pos} in rule: {self.text}")
+        right = self._parse_operand()
+        return Rule(left, token.text, right)
+
+    def _logic(self, left, token: Token) -> CompositeRule:
+        # Chains of the same operator are collected and combined as a balanced tree,
+        # so very long rule sets never produce deeply nested CompositeRules
+        if not isinstance(left, (Rule, CompositeRule)):
+            raise ValueError(f"Expected a comparison before {token.text!r} at position {token.pos} in rule: {self.text}")
+        operands = [left]
+        while True:
+            operand = self._parse_expression(BINDING_POWER[token.text])
+            if not isinstance(operand, (Rule, CompositeRule)):
+                raise ValueError(f"Expected a comparison after {token.text!r} at position {token.pos} in rule: {self.text}")
+            operands.append(operand)
+            if self._peek().kind != 'logic' or self._peek().text != token.text:
+                break
+            token = self._next()
+        return _balanced(token.text, operands)
+
+    def _parse_operand(self) -> Union[Indicator, CompositeIndicator, float]:
+        token = self._next()
+        if token.kind == 'number':
+            return float(token.text)
+        if token.kind != 'name':
+            raise ValueError(f"Unexpected {token.text or 'end of rule'!r} at position {token.pos} in rule: {self.text}")
+        if self._peek().kind != 'lparen':
+            return Indicator(token.text)
+        self._next()
+        args = []
+        if self._peek().kind != 'rparen':
+            args.append(self._parse_argument())
+            while self._peek().kind == 'comma':
+                self._next()
+                args.append(self._parse_argument())
+        self._expect('rparen')
+        if token.text in COMPOSITE_FUNCTIONS:
+            return CompositeIndicator(token.text, [float(arg) if isinstance(arg, (int, float)) else arg for arg in args])
+        return build_indicator(token.text, args)
+
+    def _parse_argument(self) -> Union[Indicator, CompositeIndicator, int, float]:
+        if self._peek().kind == 'number':
+            text = self._next().text
+            return int(text) if text.isdigit() else float(text)
+        return self._parse_operand()
+
+
+def _balanced(logic: str, operands: List[Union[Rule, CompositeRule]]) -> Union[Rule, CompositeRule]:
+    if len(operands) == 1:
+        return operands[0]
+    middle = len(operands) // 2
+    return CompositeRule(_balanced(logic, operands[:middle]), logic, _balanced(logic, operands[middle:]))
+
+
+def build_indicator(name: str, args: List[Union[Indicator, CompositeIndicator, int, float]]) -> Indicator:
+    """Create an Indicator from parsed arguments, applying defaults and parameter order."""
+    # Plain columns are kept by name so str(indicator) matches the DataFrame column names
+    params = [arg.name if isinstance(arg, Indicator) and not arg.params else arg for arg in args]
+    if name in BASE_COLUMNS:
+        if params:
+            raise ValueError(f"Price column {name} does not take parameters")
+        return Indicator(name)
+
+    spec = INDICATOR_SPECS.get(name)
+    if spec is not None and spec.inputs == 'series':
+        # The series may be given anywhere among the numeric parameters and defaults to Close
+        series_param = 'Close'
+        numeric_params = []
         for param in params:
-            if param.isdigit():
-                parsed_params.append(int(param))
-            elif is_number(param):
-                parsed_params.append(float(param))
+            if isinstance(param, (int, float)):
+                numeric_params.append(param)
             else:
-                parsed_params.append(param)
+                series_param = param
+        if params and len(numeric_params) != len(spec.params):
+            raise ValueError(f"{name} requires series and {len(spec.params)} numeric parameter(s): {params}")
+        params = [series_param] + spec.validate(numeric_params)
+    elif spec is not None:
+        if not all(isinstance(param, (int, float)) for param in params):
+            raise ValueError(f"{name} only takes numeric parameters: {params}")
+        params = spec.validate(params)
+
+    logger.debug("Parsed indicator: %s with params: %s", name, params)
+    return Indicator(name, tuple(params))
+
+
+def referenced_columns(text: str, columns: Iterable[str]) -> Set[str]:
+    """Data columns an indicator expression reads: the columns it names and those read by its frame indicators."""
+    columns = set(columns)
+    referenced = set()
+    for token in tokenize(text):
+        if token.kind != 'name':
+            continue
+        if token.text in columns:
+            referenced.add(token.text)
+        spec = INDICATOR_SPECS.get(token.text)
+        if spec is not None:
+            referenced.update(column for column in spec.columns if column in columns)
+    return referenced
+
+
+def indicator_cache_key(fingerprint: DataFingerprint, label: str) -> Tuple:
+    """IndicatorCache key of an indicator label on the data behind fingerprint."""
+    return (fingerprint.of(referenced_columns(label, fingerprint.df.columns)), label)
 
-    print(f"Parsed indicator: {name} with params: {parsed_params}")
-    return Indicator(name, tuple(parsed_params))
 
-def is_number(s):
-    try:
-        float(s)
-        return True
-    except ValueError:
-        return False
-def is_number(s):
-    try:
-        float(s)
-        return True
-    except ValueError:
-        return False
+def parse_indicator(indicator_str: str) -> Union[Indicator, CompositeIndicator, float]:
+    """Parse a single indicator expression such as 'SMA(Close,20)' or 'max(High, shift(High,1))'."""
+    logger.debug("Parsing indicator: %s", indicator_str)
+    return RuleParser(indicator_str).parse_operand()
+
 
 def is_number(s):
     try:
@@ -273,65 +417,14 @@ def is_number(s):
     except ValueError:
         return False
 
-def split_params(params_str: str) -> List[str]:
-    # This function handles splitting parameters that may include nested parentheses
-    params = []
-    bracket_level = 0
-    current_param = ''
-    for char in params_str:
-        if char == ',' and bracket_level == 0:
-            params.append(current_param)
-            current_param = ''
-        else:
-            if char == '(':
-                bracket_level += 1
-            elif char == ')':
-                bracket_level -= 1
-            current_param += char
-    if current_param:
-        params.append(current_param)
-    return params
-
 
 def parse_rule(rule_str: str) -> CompositeRule:
-    """Parse a rule string into a CompositeRule object."""
-    print(f"Parsing rule: {rule_str}")
-    def parse_single_rule(rule: str) -> Rule:
-        for op in ['<=', '>=', '==', '!=', '<', '>']:
-            if op in rule:
-                left, right = rule.split(op)
-                left_indicator = parse_indicator(left.strip())
-                try:
-                    right_value = float(right.strip())
-                except ValueError:
-                    right_value = parse_indicator(right.strip())
-                print(f"Parsed single rule: {left_indicator} {op} {right_value}")
-                return Rule(left_indicator, op, right_value)
-        raise ValueError(f"Invalid rule: {rule}. No valid operator found.")
-
-    # Split the rule into parts based on 'and'/'or' logical operators
-    tokens = re.split(r'\s+', rule_str)
-    rules = []
-    logic_ops = []
-    current_rule = []
-
-    for token in tokens:
-        if token in ['and', 'or']:
-            rules.append(parse_single_rule(' '.join(current_rule)))
-            logic_ops.append(token)
-            current_rule = []
-        else:
-            current_rule.append(token)
-    rules.append(parse_single_rule(' '.join(current_rule)))
-
-    # Build the composite rule
-    composite_rule = CompositeRule(rules[0])
-    current_composite = composite_rule
-    for i, logic in enumerate(logic_ops):
-        next_rule = CompositeRule(rules[i + 1])
-        current_composite.logic = logic
-        current_composite.next_rule = next_rule
-        current_composite = next_rule
-
-    print(f"Parsed composite rule: {composite_rule}")
+    """Parse a rule string into a CompositeRule object.
+
+    'and' binds tighter than 'or', and parentheses group sub-rules.
+    """
+    logger.debug("Parsing rule: %s", rule_str)
+    composite_rule = RuleParser(rule_str).parse_rule()
+    logger.debug("Parsed composite rule: %s", composite_rule)
     return composite_rule
+
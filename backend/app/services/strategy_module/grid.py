@@ -0,0 +1,136 @@
+# grid.py
+
+from dataclasses import dataclass
+from itertools import product
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Literal, Optional
+import pandas as pd
+import numpy as np
+from app.services.strategy_module.compiler import RulePlan, PlanEvaluator
+from app.services.strategy_module.rule_cache import cached_parse_rule
+from app.services.strategy_module.signals import latch_positions
+
+
+@dataclass
+class GridResult:
+    """Signals, positions and returns of one rule template over many parameter sets.
+
+    Every array is (time x parameter set); column k belongs to params[k].
+    """
+    params: List[Dict[str, Any]]
+    index: pd.Index
+    signals: np.ndarray
+    positions: np.ndarray
+    returns: np.ndarray
+
+    def summary(self, periods_per_year: int = 365) -> pd.DataFrame:
+        """Total return, Sharpe ratio and max drawdown per parameter set, defined as in calculate_metrics."""
+        returns = np.nan_to_num(self.returns)
+        equity = np.cumprod(1 + returns, axis=0)
+        drawdown = 1 - equity / np.maximum.accumulate(equity, axis=0)
+        total_return = equity[-1] - 1
+        annualized_return = (1 + total_return) ** (periods_per_year / len(returns)) - 1
+        volatility = returns.std(axis=0, ddof=1) * np.sqrt(periods_per_year)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(volatility != 0, annualized_return / volatility, 0.0)
+        summary = pd.DataFrame(self.params)
+        summary['Total Return'] = total_return
+        summary['Annualized Return'] = annualized_return
+        summary['Sharpe Ratio'] = sharpe
+        summary['Max Drawdown'] = drawdown.max(axis=0)
+        return summary
+
+    def column(self, k: int) -> pd.DataFrame:
+        """Signal, position and returns of a single parameter set."""
+        return pd.DataFrame({
+            'signal': self.signals[:, k],
+            'position': self.positions[:, k],
+            'returns': self.returns[:, k],
+        }, index=self.index)
+
+
+def parameter_grid(param_grid: Dict[str, Iterable], constraint: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+    """All combinations of the parameter values, optionally filtered by constraint."""
+    names = list(param_grid)
+    combinations = [dict(zip(names, values)) for values in product(*(list(param_grid[name]) for name in names))]
+    if constraint is not None:
+        combinations = [params for params in combinations if constraint(params)]
+    return combinations
+
+
+def iter_grid(
+    df: pd.DataFrame,
+    entry_template: str,
+    exit_template: str,
+    param_grid: Dict[str, Iterable],
+    position_type: Literal['long', 'short'] = 'long',
+    position_size: float = 1.0,
+    fees: float = 0.0,
+    slippage: float = 0.0,
+    constraint: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    batch_size: Optional[int] = None,
+) -> Iterator[GridResult]:
+    """
+    Evaluate entry/exit rule templates such as 'SMA(Close,{fast}) > SMA(Close,{slow})'
+    for every parameter combination, yielding results batch_size combinations at a time.
+
+    All combinations are compiled into one plan, so each distinct indicator is
+    computed once regardless of how many combinations use it. Fees and slippage
+    are percentages, as in run_backtest.
+    """
+    combinations = parameter_grid(param_grid, constraint)
+    if not combinations:
+        raise ValueError("Parameter grid is empty")
+
+    plan = RulePlan()
+    for k, params in enumerate(combinations):
+        plan.add_rule(f'entry_{k}', cached_parse_rule(entry_template.format(**params)))
+        plan.add_rule(f'exit_{k}', cached_parse_rule(exit_template.format(**params)))
+    evaluator = PlanEvaluator(plan, df)
+    evaluator.evaluate_window_groups()
+
+    position_type_value = 1 if position_type == 'long' else -1
+    close = df['Close'].to_numpy(dtype=float)
+    close_pct_change = np.empty(len(close))
+    close_pct_change[0] = np.nan
+    close_pct_change[1:] = close[1:] / close[:-1] - 1
+    costs = (fees + slippage) / 100
+
+    batch_size = batch_size or len(combinations)
+    for start in range(0, len(combinations), batch_size):
+        batch = combinations[start:start + batch_size]
+        # Column-major so every combination's mask is a contiguous column
+        entry = np.empty((len(df), len(batch)), dtype=bool, order='F')
+        exit = np.empty((len(df), len(batch)), dtype=bool, order='F')
+        for j in range(len(batch)):
+            evaluator.evaluate_mask(plan.roots[f'entry_{start + j}'], out=entry[:, j])
+            evaluator.evaluate_mask(plan.roots[f'exit_{start + j}'], out=exit[:, j])
+        signals = latch_positions(entry, exit, position_type_value)
+        del entry, exit
+
+        # Same conventions as run_backtest: trade on the next bar, pay costs on position changes
+        positions = np.full(signals.shape, np.nan)
+        positions[1:] = signals[:-1] * position_size
+        returns = np.full(signals.shape, np.nan)
+        returns[2:] = positions[1:-1] * close_pct_change[2:, None] - np.abs(positions[2:] - positions[1:-1]) * costs
+        yield GridResult(batch, df.index, signals, positions, returns)
+
+
+def evaluate_grid(
+    df: pd.DataFrame,
+    entry_template: str,
+    exit_template: str,
+    param_grid: Dict[str, Iterable],
+    **kwargs,
+) -> GridResult:
+    """Evaluate all parameter combinations at once; see iter_grid for the arguments."""
+    results = list(iter_grid(df, entry_template, exit_template, param_grid, **kwargs))
+    if len(results) == 1:
+        return results[0]
+    return GridResult(
+        params=[params for result in results for params in result.params],
+        index=df.index,
+        signals=np.hstack([result.signals for result in results]),
+        positions=np.hstack([result.positions for result in results]),
+        returns=np.hstack([result.returns for result in results]),
+    )
+
@@ -0,0 +1,113 @@
+# indicator_cache.py
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple, Union
+import hashlib
+import pandas as pd
+import numpy as np
+from app.utils.tracing import count
+
+
+class DataFingerprint:
+    """Content hashes of a DataFrame's index and columns, computed on first use."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._hashes: Dict[Optional[str], str] = {}
+
+    def of(self, columns: Iterable[str]) -> Tuple:
+        """Fingerprint of the index and the given columns."""
+        return (self._hash(None),) + tuple((column, self._hash(column)) for column in sorted(set(columns)))
+
+    def _hash(self, column: Optional[str]) -> str:
+        if column not in self._hashes:
+            values = self.df.index if column is None else self.df[column]
+            self._hashes[column] = _hash_values(values)
+        return self._hashes[column]
+
+
+def _hash_values(values: Union[pd.Index, pd.Series]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    array = values.asi8 if isinstance(values, pd.DatetimeIndex) else np.asarray(values)
+    if array.dtype.kind not in 'biufcmM':
+        array = pd.util.hash_array(array.astype(object))
+    digest.update(f"{array.dtype}{array.shape}{getattr(values, 'tz', None)}".encode())
+    digest.update(np.ascontiguousarray(array).view(np.uint8))
+    return digest.hexdigest()
+
+
+class IndicatorCache:
+    """
+    Process-wide LRU cache of computed indicator arrays, bounded by their total size.
+
+    Keys combine a DataFingerprint of the data an indicator reads with its canonical
+    label, so the same indicator on the same data is shared across requests. Cached
+    arrays are made read-only; arrays larger than the whole budget are not stored.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 2**20):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            values = self._entries.get(key)
+            if values is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        count('indicator_cache_miss' if values is None else 'indicator_cache_hit')
+        return values
+
+    def put(self, key: Hashable, values: np.ndarray) -> np.ndarray:
+        """Store a copy of values under key and return it."""
+        if values.nbytes > self.max_bytes:
+            return values
+        values = np.array(values, copy=True)
+        values.flags.writeable = False
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key).nbytes
+            self._entries[key] = values
+            self.nbytes += values.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return values
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], np.ndarray]) -> np.ndarray:
+        values = self.get(key)
+        if values is None:
+            values = self.put(key, np.asarray(factory()))
+        return values
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+INDICATOR_CACHE = IndicatorCache()
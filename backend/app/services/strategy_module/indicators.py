@@ -1,7 +1,20 @@
 # indicators.py
 
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
 import pandas as pd
-from typing import Callable, Dict
+import numpy as np
+from app.services.strategy_module.kernels import (
+    WINDOW_KERNELS, rsi, average_true_range, bollinger_band, macd, rolling_extremes, zscore
+)
+from app.services.strategy_module.streaming import (
+    StreamingSMA, StreamingEMA, StreamingRollingHigh, StreamingRollingLow, StreamingMATrend,
+    StreamingVWAP, StreamingAverageMoveFromOpen
+)
+
+NANOSECONDS_PER_DAY = 86_400_000_000_000
+# Frequency labels of daily bars, as used by strategies and returned by pd.infer_freq
+DAILY_FREQUENCIES = {'Daily', 'D', '1d'}
 
 # Indicator Functions
 def SMA(series: pd.Series, window: int) -> pd.Series:
@@ -25,88 +38,269 @@ def MA_trend(series: pd.Series, ma_window: int, return_window: int) -> pd.Series
     ma = series.rolling(window=ma_window).mean()
     return ma.pct_change(periods=return_window)
 
-def VWAP(df: pd.DataFrame) -> pd.Series:
-    """Calculate Volume Weighted Average Price (VWAP)."""
+def session_clock(index: pd.Index, session_tz: Optional[str] = None, session_start: str = '00:00') -> np.ndarray:
+    """
+    Nanoseconds of every timestamp since the epoch on a clock whose days start at
+    session_start ('HH:MM') in session_tz, or in the index's own timezone if no
+    session_tz is given; a naive index is taken as UTC when converting.
+    """
+    index = pd.DatetimeIndex(index)
+    if session_tz is not None:
+        index = (index.tz_localize('UTC') if index.tz is None else index).tz_convert(session_tz)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.asi8 - pd.Timedelta(f"{session_start}:00").value
+
+
+def session_codes(index: pd.Index, session_tz: Optional[str] = None, session_start: str = '00:00') -> np.ndarray:
+    """
+    Integer session id of every timestamp: the number of days since the epoch of the
+    session it belongs to, see session_clock. Missing timestamps get -1.
+    """
+    codes = session_clock(index, session_tz, session_start) // NANOSECONDS_PER_DAY
+    codes[pd.isna(index)] = -1
+    return codes
+
+
+def session_cumsum(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """
+    Cumulative sum of values restarting at every session, like a groupby(codes).cumsum():
+    NaN values are skipped and stay NaN, rows with a negative code are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return values
+    order = None
+    if len(codes) > 1 and np.any(codes[1:] < codes[:-1]):
+        order = np.argsort(codes, kind='stable')
+        values, codes = values[order], codes[order]
+    missing = np.isnan(values) | (codes < 0)
+    filled = np.where(missing, 0.0, values)
+    positions = np.arange(len(values))
+    starts = np.ones(len(values), dtype=bool)
+    starts[1:] = codes[1:] != codes[:-1]
+    first = np.maximum.accumulate(np.where(starts, positions, 0))
+    session = np.cumsum(starts) - 1
+    offset = positions - first
+    if (session[-1] + 1) * (offset.max() + 1) <= 2 * len(values):
+        # Sessions of similar length: lay them out as rows and sum along each row
+        table = np.zeros((session[-1] + 1, offset.max() + 1))
+        table[session, offset] = filled
+        result = np.cumsum(table, axis=1)[session, offset]
+    else:
+        total = np.cumsum(filled)
+        result = total - (total[first] - filled[first])
+    result[missing] = np.nan
+    if order is not None:
+        unsorted = np.empty_like(result)
+        unsorted[order] = result
+        result = unsorted
+    return result
+
+
+def VWAP(df: pd.DataFrame, frequency: Optional[str] = None, session_tz: Optional[str] = None,
+         session_start: str = '00:00') -> pd.Series:
+    """
+    Calculate Volume Weighted Average Price (VWAP), restarting every session.
+
+    By default sessions are the calendar dates of the index; session_tz and
+    session_start ('HH:MM') move them to another timezone or opening time. Pass the
+    bar frequency when it is known (e.g. 'Daily', '1h') to skip inferring it from the index.
+    """
     # Check that data is intraday
-    inferred_freq = pd.infer_freq(df.index)
-    if inferred_freq == 'D':
+    if frequency is None:
+        frequency = pd.infer_freq(df.index)
+    if frequency in DAILY_FREQUENCIES:
         raise ValueError("VWAP can only be calculated on intraday data")
-    avg_price = (df['High'] + df['Low'] + df['Close']) / 3
-    cum_vol_price = (avg_price * df['Volume']).groupby(df.index.date).cumsum()
-    cum_volume = df['Volume'].groupby(df.index.date).cumsum()
-    vwap = cum_vol_price / cum_volume
-    return vwap.shift()
+    codes = session_codes(df.index, session_tz, session_start)
+    volume = df['Volume'].to_numpy(dtype=float)
+    avg_price = (df['High'].to_numpy(dtype=float) + df['Low'].to_numpy(dtype=float) + df['Close'].to_numpy(dtype=float)) / 3
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = session_cumsum(avg_price * volume, codes) / session_cumsum(volume, codes)
+    shifted = np.empty(len(vwap))
+    shifted[:1] = np.nan
+    shifted[1:] = vwap[:-1]
+    return pd.Series(shifted, index=df.index)
+
+
+def average_move_from_open(df: pd.DataFrame, rolling_window: int = 14, session_tz: str = 'America/New_York',
+                           session_start: str = '00:00', frequency: Optional[str] = None) -> pd.Series:
+    """
+    Average absolute move from the session open at each bar's time of day over the previous days.
+
+    For a bar at time t of session d, this is the mean of |Close / Open - 1| at time t
+    over the rolling_window previous sessions that have a bar at t, where Open is the
+    open of each session's first bar. Only earlier sessions are used, so the value is
+    known at the start of the bar. It is NaN until rolling_window earlier sessions are
+    available, or if any of their moves is missing.
+    """
+    if frequency is None:
+        frequency = pd.infer_freq(df.index)
+    if frequency in DAILY_FREQUENCIES:
+        raise ValueError("Average_Move_From_Open can only be calculated on intraday data")
+    clock = session_clock(df.index, session_tz, session_start)
+    order = np.argsort(clock, kind='stable')
+    clock = clock[order]
+    sessions, time_of_day = np.divmod(clock, NANOSECONDS_PER_DAY)
 
+    # Move of each bar from the open of its session's first bar
+    first = np.ones(len(clock), dtype=bool)
+    first[1:] = sessions[1:] != sessions[:-1]
+    session_open = df['Open'].to_numpy(dtype=float)[order][np.maximum.accumulate(np.where(first, np.arange(len(clock)), 0))]
+    move = np.abs(df['Close'].to_numpy(dtype=float)[order] / session_open - 1)
 
-def average_move_from_open(intraday_df: pd.DataFrame, 
-                             daily_df: pd.DataFrame,
-                             rolling_window: int) -> pd.DataFrame:
+    # Group the bars by time of day, oldest session first, and sum the previous rolling_window moves
+    by_slot = np.lexsort((sessions, time_of_day))
+    slot_moves = move[by_slot]
+    slot_times = time_of_day[by_slot]
+    slot_start = np.ones(len(clock), dtype=bool)
+    slot_start[1:] = slot_times[1:] != slot_times[:-1]
+    positions = np.arange(len(clock))
+    position_in_slot = positions - np.maximum.accumulate(np.where(slot_start, positions, 0))
+    total = np.zeros(len(clock))
+    for lag in range(rolling_window, 0, -1):
+        total[lag:] += slot_moves[:-lag]
+    average = np.full(len(clock), np.nan)
+    complete = position_in_slot >= rolling_window
+    average[complete] = total[complete] / rolling_window
+
+    result = np.empty(len(clock))
+    result[order[by_slot]] = average
+    return pd.Series(result, index=df.index)
+
+def RSI(series: pd.Series, window: int = 14) -> pd.Series:
+    """Calculate Relative Strength Index (Wilder)."""
+    return pd.Series(rsi(series.to_numpy(dtype=float), window, lag=1), index=series.index)
+
+def ATR(df: pd.DataFrame, window: int = 14) -> pd.Series:
+    """Calculate Average True Range (Wilder)."""
+    values = average_true_range(df['High'].to_numpy(dtype=float), df['Low'].to_numpy(dtype=float),
+                                df['Close'].to_numpy(dtype=float), window, lag=1)
+    return pd.Series(values, index=df.index)
+
+def bollinger_upper(series: pd.Series, window: int = 20, num_std: float = 2.0) -> pd.Series:
+    """Calculate the upper Bollinger Band (rolling mean + num_std population standard deviations)."""
+    return pd.Series(bollinger_band(series.to_numpy(dtype=float), window, num_std, lag=1), index=series.index)
+
+def bollinger_lower(series: pd.Series, window: int = 20, num_std: float = 2.0) -> pd.Series:
+    """Calculate the lower Bollinger Band (rolling mean - num_std population standard deviations)."""
+    return pd.Series(bollinger_band(series.to_numpy(dtype=float), window, -num_std, lag=1), index=series.index)
+
+def MACD(series: pd.Series, fast: int = 12, slow: int = 26) -> pd.Series:
+    """Calculate the MACD line: EMA(fast) - EMA(slow)."""
+    return pd.Series(macd(series.to_numpy(dtype=float), fast, slow, lag=1), index=series.index)
+
+def MACD_signal(series: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.Series:
+    """Calculate the MACD signal line: EMA(signal) of the MACD line."""
+    return pd.Series(macd(series.to_numpy(dtype=float), fast, slow, signal, lag=1), index=series.index)
+
+def donchian_high(df: pd.DataFrame, window: int = 20) -> pd.Series:
+    """Calculate the upper Donchian Channel: highest High over the window."""
+    return pd.Series(rolling_extremes(df['High'].to_numpy(dtype=float), [window], 'max', lag=1)[:, 0], index=df.index)
+
+def donchian_low(df: pd.DataFrame, window: int = 20) -> pd.Series:
+    """Calculate the lower Donchian Channel: lowest Low over the window."""
+    return pd.Series(rolling_extremes(df['Low'].to_numpy(dtype=float), [window], 'min', lag=1)[:, 0], index=df.index)
+
+def z_score(series: pd.Series, window: int = 20) -> pd.Series:
+    """Calculate the rolling z-score against the rolling mean and population standard deviation."""
+    return pd.Series(zscore(series.to_numpy(dtype=float), window, lag=1), index=series.index)
+
+
+@dataclass(frozen=True)
+class IndicatorParam:
+    """A numeric parameter of an indicator."""
+    name: str
+    default: Any
+    type: type = int
+    minimum: Optional[float] = 1
+
+    def validate(self, indicator: str, value: Any) -> Any:
+        if self.type is int and not float(value).is_integer():
+            raise ValueError(f"{indicator} parameter {self.name} must be an integer: {value}")
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f"{indicator} parameter {self.name} must be at least {self.minimum}: {value}")
+        return self.type(value)
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
     """
-    Creates a matrix with times as rows and dates as columns, with values normalized by daily open.
-    
-    Args:
-        intraday_df: DataFrame with minute-level data (columns: volume, open, high, low, close, caldt)
-        daily_df: DataFrame with daily data (columns: volume, open, high, low, close, caldt)
-        
-    Returns:
-        DataFrame with times as index and last 14 calendar dates as columns, values normalized by daily open
+    Declaration of an indicator and how the engine may compute it.
+
+    inputs is 'series' for indicators called as function(series, *params) and 'frame'
+    for those called as function(df, *params), reading the given columns; frame indicators
+    that check the bar frequency also take frequency=... when it is known. warmup maps the numeric
+    parameters to the number of leading rows without a value (None if it depends on
+    the data). window_kernel computes many windows of the indicator at once (see
+    kernels.py) and streaming is its incremental counterpart (see streaming.py).
     """
-    # Convert caldt to datetime for both dataframes
-    intraday_df = intraday_df.copy()
-    daily_df = daily_df.copy()
-    
-    intraday_df['datetime'] = pd.to_datetime(intraday_df.index, utc=True)
-    daily_df['datetime'] = pd.to_datetime(daily_df.index, utc=True)
-
-    intraday_df['datetime'] = intraday_df['datetime'].dt.tz_convert('America/New_York')
-    daily_df['datetime'] = daily_df['datetime'].dt.tz_convert('America/New_York')
-    
-    # Extract date and time for intraday data
-    intraday_df['date'] = intraday_df['datetime'].dt.date
-    intraday_df['time'] = intraday_df['datetime'].dt.strftime('%H:%M')
-    
-    # Extract date for daily data
-    daily_df['date'] = daily_df['datetime'].dt.date
-    
-    # Create a dictionary of daily opens for quick lookup
-    daily_opens = daily_df.set_index('date')['Open'].to_dict()
-    
-    # Create the basic time-date matrix first
-    pivot_df = intraday_df.pivot(
-        index='time',
-        columns='date',
-        values='Close'
-    )
-
-    
-    # Get the last X dates
-    last_X_dates = sorted(intraday_df['date'].unique())[-rolling_window:]
-    pivot_df = pivot_df[last_X_dates]
-
-    
-    # Normalize each column by its daily open
-    for date in last_X_dates:
-        if date in daily_opens:
-            pivot_df[date] = abs(pivot_df[date] / daily_opens[date] - 1)
-    
-    # Sort index by time
-    pivot_df.sort_index(inplace=True)
-    
-    # Round to 4 decimal places for readability
-    pivot_df = pivot_df.round(4)
-
-    avg_move_from_open = pd.DataFrame(pivot_df.mean(axis=1), columns=['avg_move_from_open'])
-    
-    return avg_move_from_open
-
-# Add to INDICATORS dictionary
-INDICATORS: Dict[str, Callable] = {
-    'SMA': SMA,
-    'EMA': EMA,
-    'Rolling_High': rolling_high,
-    'Rolling_Low': rolling_low,
-    'MA_trend': MA_trend,
-    'VWAP': VWAP,
-    'Average_Move_From_Open': average_move_from_open,
-}
+    name: str
+    function: Callable
+    inputs: Literal['series', 'frame'] = 'series'
+    columns: Tuple[str, ...] = ()
+    uses_frequency: bool = False
+    params: Tuple[IndicatorParam, ...] = ()
+    warmup: Callable[..., Optional[int]] = lambda *params: 0
+    dtype: type = np.float64
+    window_kernel: Optional[Callable[..., np.ndarray]] = None
+    streaming: Optional[type] = None
+
+    @property
+    def incremental(self) -> bool:
+        return self.streaming is not None
+
+    def create_streaming(self, *params) -> Any:
+        """Incremental instance of the indicator for the given numeric parameters."""
+        if self.streaming is None:
+            raise ValueError(f"{self.name} has no incremental implementation")
+        return self.streaming(*self.validate(list(params)))
+
+    def validate(self, params: List[Any]) -> List[Any]:
+        """Check numeric parameters against the schema, filling in defaults for missing trailing ones."""
+        if len(params) > len(self.params):
+            raise ValueError(f"{self.name} takes at most {len(self.params)} numeric parameters: {params}")
+        return [param.validate(self.name, value) for param, value in zip(self.params, params)] + \
+            [param.default for param in self.params[len(params):]]
+
+
+INDICATOR_SPECS: Dict[str, IndicatorSpec] = {spec.name: spec for spec in [
+    IndicatorSpec('SMA', SMA, params=(IndicatorParam('window', 20),), warmup=lambda window: window,
+                  window_kernel=WINDOW_KERNELS['SMA'], streaming=StreamingSMA),
+    IndicatorSpec('EMA', EMA, params=(IndicatorParam('window', 20),), warmup=lambda window: 1,
+                  streaming=StreamingEMA),
+    IndicatorSpec('Rolling_High', rolling_high, params=(IndicatorParam('window', 14),), warmup=lambda window: window,
+                  window_kernel=WINDOW_KERNELS['Rolling_High'], streaming=StreamingRollingHigh),
+    IndicatorSpec('Rolling_Low', rolling_low, params=(IndicatorParam('window', 14),), warmup=lambda window: window,
+                  window_kernel=WINDOW_KERNELS['Rolling_Low'], streaming=StreamingRollingLow),
+    IndicatorSpec('MA_trend', MA_trend, params=(IndicatorParam('ma_window', 20), IndicatorParam('return_window', 5)),
+                  warmup=lambda ma_window, return_window: ma_window - 1 + return_window, streaming=StreamingMATrend),
+    IndicatorSpec('VWAP', VWAP, inputs='frame', columns=('High', 'Low', 'Close', 'Volume'), uses_frequency=True,
+                  warmup=lambda: 1, streaming=StreamingVWAP),
+    # Needs rolling_window earlier sessions, whose length in bars depends on the data
+    IndicatorSpec('Average_Move_From_Open', average_move_from_open, inputs='frame', columns=('Open', 'Close'),
+                  uses_frequency=True, params=(IndicatorParam('rolling_window', 14),), warmup=lambda rolling_window: None,
+                  streaming=StreamingAverageMoveFromOpen),
+    IndicatorSpec('RSI', RSI, params=(IndicatorParam('window', 14),), warmup=lambda window: window + 1),
+    IndicatorSpec('ATR', ATR, inputs='frame', columns=('High', 'Low', 'Close'), params=(IndicatorParam('window', 14),),
+                  warmup=lambda window: window),
+    IndicatorSpec('Bollinger_Upper', bollinger_upper,
+                  params=(IndicatorParam('window', 20), IndicatorParam('num_std', 2.0, float, 0)),
+                  warmup=lambda window, num_std: window),
+    IndicatorSpec('Bollinger_Lower', bollinger_lower,
+                  params=(IndicatorParam('window', 20), IndicatorParam('num_std', 2.0, float, 0)),
+                  warmup=lambda window, num_std: window),
+    IndicatorSpec('MACD', MACD, params=(IndicatorParam('fast', 12), IndicatorParam('slow', 26)),
+                  warmup=lambda fast, slow: 1),
+    IndicatorSpec('MACD_Signal', MACD_signal,
+                  params=(IndicatorParam('fast', 12), IndicatorParam('slow', 26), IndicatorParam('signal', 9)),
+                  warmup=lambda fast, slow, signal: 1),
+    IndicatorSpec('Donchian_High', donchian_high, inputs='frame', columns=('High',), params=(IndicatorParam('window', 20),),
+                  warmup=lambda window: window),
+    IndicatorSpec('Donchian_Low', donchian_low, inputs='frame', columns=('Low',), params=(IndicatorParam('window', 20),),
+                  warmup=lambda window: window),
+    IndicatorSpec('ZScore', z_score, params=(IndicatorParam('window', 20),), warmup=lambda window: window),
+]}
 
+# Name -> function view of the registry
+INDICATORS: Dict[str, Callable] = {name: spec.function for name, spec in INDICATOR_SPECS.items()}
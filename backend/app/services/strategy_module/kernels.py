@@ -0,0 +1,193 @@
+# kernels.py
+
+from typing import Callable, Dict, Iterable, List, Literal, Optional, Tuple
+import pandas as pd
+import numpy as np
+
+
+def _window_output(length: int, windows: List[int]) -> np.ndarray:
+    # Column-major so each window's series is a contiguous column
+    return np.full((length, len(windows)), np.nan, order='F')
+
+
+def _check_windows(windows: Iterable[int]) -> List[int]:
+    windows = [int(window) for window in windows]
+    if any(window < 1 for window in windows):
+        raise ValueError("Windows must be positive integers")
+    return windows
+
+
+def rolling_means(values: np.ndarray, windows: Iterable[int], lag: int = 0) -> np.ndarray:
+    """
+    Rolling mean of values for every window from a single cumulative sum.
+
+    Returns a (len(values) x len(windows)) array whose column j equals
+    pd.Series(values).rolling(windows[j]).mean().shift(lag), up to floating point
+    rounding: the sum runs over values centered on their mean to keep the
+    cancellation error small, and like pandas a window of identical values
+    returns that value exactly and windows with any NaN are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    windows = _check_windows(windows)
+    length = len(values)
+    out = _window_output(length, windows)
+    if length == 0:
+        return out
+
+    valid = ~np.isnan(values)
+    reference = values[valid].mean() if valid.any() else 0.0
+    cumulative = np.zeros(length + 1)
+    np.cumsum(np.where(valid, values - reference, 0.0), out=cumulative[1:])
+    nan_count = np.zeros(length + 1, dtype=np.int64)
+    np.cumsum(~valid, out=nan_count[1:])
+    negative_count = np.zeros(length + 1, dtype=np.int64)
+    np.cumsum(np.signbit(values) & valid, out=negative_count[1:])
+    # Length of the run of identical values ending at each position
+    positions = np.arange(length)
+    run_start = np.zeros(length, dtype=np.int64)
+    run_start[1:] = np.where(values[1:] != values[:-1], positions[1:], 0)
+    run_length = positions - np.maximum.accumulate(run_start) + 1
+
+    for j, window in enumerate(windows):
+        if window + lag > length:
+            continue
+        # Window sums ending at positions window-1 .. length-1
+        mean = (cumulative[window:] - cumulative[:-window]) / window + reference
+        negatives = negative_count[window:] - negative_count[:-window]
+        mean[(negatives == 0) & (mean < 0)] = 0.0
+        mean[(negatives == window) & (mean > 0)] = 0.0
+        constant = run_length[window - 1:] >= window
+        mean[constant] = values[window - 1:][constant]
+        mean[(nan_count[window:] - nan_count[:-window]) > 0] = np.nan
+        out[window - 1 + lag:, j] = mean[:len(mean) - lag]
+    return out
+
+
+def rolling_extremes(values: np.ndarray, windows: Iterable[int], mode: Literal['max', 'min'] = 'max', lag: int = 0) -> np.ndarray:
+    """
+    Rolling max or min of values for every window in one sparse-table pass.
+
+    Level k of the table holds the extreme of each block of 2**k values, and a
+    window of length w is the extreme of two overlapping blocks of the largest
+    2**k <= w. Windows are processed in increasing order so only one level is
+    kept in memory. Column j equals pd.Series(values).rolling(windows[j]).max()
+    (or .min()) shifted by lag, exactly.
+    """
+    values = np.asarray(values, dtype=float)
+    windows = _check_windows(windows)
+    length = len(values)
+    out = _window_output(length, windows)
+    if length == 0:
+        return out
+
+    combine = np.fmax if mode == 'max' else np.fmin
+    nan_count = np.zeros(length + 1, dtype=np.int64)
+    np.cumsum(np.isnan(values), out=nan_count[1:])
+
+    level, block = values, 1
+    for j in sorted(range(len(windows)), key=lambda j: windows[j]):
+        window = windows[j]
+        if window + lag > length:
+            continue
+        while block * 2 <= window:
+            level = combine(level[:-block], level[block:])
+            block *= 2
+        extreme = combine(level[:length - window + 1], level[window - block:])
+        extreme[(nan_count[window:] - nan_count[:-window]) > 0] = np.nan
+        out[window - 1 + lag:, j] = extreme[:len(extreme) - lag]
+    return out
+
+
+def _writable(values: np.ndarray) -> np.ndarray:
+    # pandas may hand out read-only views of its results
+    return values if values.flags.writeable else values.copy()
+
+
+def lag_values(values: np.ndarray, lag: int) -> np.ndarray:
+    """Shift values forward by lag rows in place, filling the first rows with NaN."""
+    if lag > 0:
+        values[lag:] = values[:-lag]
+        values[:lag] = np.nan
+    return values
+
+
+def ewm_mean(values: np.ndarray, alpha: float, min_periods: int = 0) -> np.ndarray:
+    """Recursive exponential average (ewm with adjust=False), computed in pandas' compiled loop."""
+    return _writable(pd.Series(values, copy=False).ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy())
+
+
+def rsi(values: np.ndarray, window: int, lag: int = 0) -> np.ndarray:
+    """Relative Strength Index with Wilder's smoothing of gains and losses; 50 when prices do not move."""
+    values = np.asarray(values, dtype=float)
+    change = np.empty(len(values))
+    change[:1] = np.nan
+    np.subtract(values[1:], values[:-1], out=change[1:])
+    average_gain = ewm_mean(np.maximum(change, 0.0), 1 / window, window)
+    np.negative(change, out=change)
+    average_loss = ewm_mean(np.maximum(change, 0.0, out=change), 1 / window, window)
+    flat = (average_gain == 0) & (average_loss == 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 100 - 100 / (1 + gain / loss), in place
+        np.divide(average_gain, average_loss, out=average_gain)
+        average_gain += 1
+        np.divide(100.0, average_gain, out=average_gain)
+        np.subtract(100.0, average_gain, out=average_gain)
+    average_gain[flat] = 50.0
+    return lag_values(average_gain, lag)
+
+
+def average_true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int, lag: int = 0) -> np.ndarray:
+    """Wilder-smoothed true range; the first bar's true range is its high - low."""
+    high, low, close = (np.asarray(values, dtype=float) for values in (high, low, close))
+    previous_close = lag_values(close.copy(), 1)
+    true_range = high - low
+    gap = np.abs(high - previous_close)
+    np.fmax(true_range, gap, out=true_range)
+    np.subtract(low, previous_close, out=gap)
+    np.fmax(true_range, np.abs(gap, out=gap), out=true_range)
+    return lag_values(ewm_mean(true_range, 1 / window, window), lag)
+
+
+def rolling_mean_std(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Rolling mean and population standard deviation over a fixed window, in one rolling pass each."""
+    rolling = pd.Series(values, copy=False).rolling(window)
+    return _writable(rolling.mean().to_numpy()), _writable(rolling.std(ddof=0).to_numpy())
+
+
+def bollinger_band(values: np.ndarray, window: int, num_std: float, lag: int = 0) -> np.ndarray:
+    """Rolling mean plus num_std population standard deviations (negative num_std for the lower band)."""
+    mean, std = rolling_mean_std(np.asarray(values, dtype=float), window)
+    std *= num_std
+    mean += std
+    return lag_values(mean, lag)
+
+
+def zscore(values: np.ndarray, window: int, lag: int = 0) -> np.ndarray:
+    """Distance of each value from its rolling mean in rolling standard deviations; 0 for constant windows."""
+    values = np.asarray(values, dtype=float)
+    mean, std = rolling_mean_std(values, window)
+    np.subtract(values, mean, out=mean)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(mean, std, out=mean)
+    mean[std == 0] = 0.0
+    return lag_values(mean, lag)
+
+
+def macd(values: np.ndarray, fast: int, slow: int, signal: Optional[int] = None, lag: int = 0) -> np.ndarray:
+    """MACD line (difference of the fast and slow EMAs, as in EMA), or its EMA over signal bars if given."""
+    values = np.asarray(values, dtype=float)
+    line = ewm_mean(values, 2 / (fast + 1))
+    line -= ewm_mean(values, 2 / (slow + 1))
+    if signal is not None:
+        line = ewm_mean(line, 2 / (signal + 1))
+    return lag_values(line, lag)
+
+
+# Batch kernels for the window indicators in INDICATORS; those indicators are
+# shifted by one bar, so lag=1 reproduces them.
+WINDOW_KERNELS: Dict[str, Callable[..., np.ndarray]] = {
+    'SMA': rolling_means,
+    'Rolling_High': lambda values, windows, lag=0: rolling_extremes(values, windows, 'max', lag),
+    'Rolling_Low': lambda values, windows, lag=0: rolling_extremes(values, windows, 'min', lag),
+}
+
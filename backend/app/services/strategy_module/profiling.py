@@ -0,0 +1,87 @@
+# profiling.py
+
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+import time
+import tracemalloc
+import numpy as np
+
+
+@dataclass
+class NodeProfile:
+    label: str
+    kind: str
+    calls: int = 0
+    wall_time: float = 0.0  # seconds
+    rows: int = 0
+    bytes_allocated: int = 0  # size of the output arrays the node allocated
+    peak_bytes: Optional[int] = None  # peak traced memory while the node ran, if trace_memory is on
+
+
+class EvaluationProfile:
+    """
+    Opt-in per-node timing and memory profile of rule evaluation.
+
+    Pass an instance to PlanEvaluator (or add_indicators / Strategy.generate_signals /
+    run_backtest) and every evaluated node, including each INDICATORS call, is recorded
+    under its canonical label. trace_memory additionally records the peak memory traced
+    by tracemalloc while each node runs, at a noticeable cost in speed.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.nodes: Dict[str, NodeProfile] = {}
+
+    def run(self, label: str, kind: str, rows: int, func: Callable[..., Any], *args) -> Any:
+        """Call func(*args), recording its wall time, rows and allocated bytes under label."""
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            memory_before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+
+        node = self.nodes.get(label)
+        if node is None:
+            node = self.nodes[label] = NodeProfile(label, kind)
+        node.calls += 1
+        node.wall_time += elapsed
+        node.rows += rows
+        # Column lookups return views of the DataFrame and allocate nothing
+        if isinstance(result, np.ndarray) and kind != 'column':
+            node.bytes_allocated += result.nbytes
+        if self.trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            node.peak_bytes = max(node.peak_bytes or 0, peak - memory_before)
+            if started_tracing:
+                tracemalloc.stop()
+        return result
+
+    def merge(self, other: 'EvaluationProfile'):
+        """Add the records of another profile to this one."""
+        for label, other_node in other.nodes.items():
+            node = self.nodes.get(label)
+            if node is None:
+                node = self.nodes[label] = NodeProfile(label, other_node.kind)
+            node.calls += other_node.calls
+            node.wall_time += other_node.wall_time
+            node.rows += other_node.rows
+            node.bytes_allocated += other_node.bytes_allocated
+            if other_node.peak_bytes is not None:
+                node.peak_bytes = max(node.peak_bytes or 0, other_node.peak_bytes)
+
+    @property
+    def total_time(self) -> float:
+        return sum(node.wall_time for node in self.nodes.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Structured profile, most expensive nodes first."""
+        nodes: List[Dict[str, Any]] = [asdict(node) for node in sorted(self.nodes.values(), key=lambda n: n.wall_time, reverse=True)]
+        return {
+            'total_time': self.total_time,
+            'nodes': nodes,
+        }
@@ -0,0 +1,92 @@
+# rule_cache.py
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import re
+from app.services.strategy_module.expressions import parse_rule, CompositeRule
+from app.services.strategy_module.compiler import RulePlan, compile_rules
+from app.utils.tracing import count
+
+_MISSING = object()
+
+
+class RuleCache:
+    """Bounded LRU cache with hit/miss counters, also counted as {name}_hit/{name}_miss events when named."""
+
+    def __init__(self, maxsize: int = 512, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value for key, creating and storing it on a miss."""
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if self.name is not None:
+            count(f'{self.name}_{"miss" if value is _MISSING else "hit"}')
+        if value is not _MISSING:
+            return value
+        value = factory()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+# Parsed rules and compiled plans are treated as immutable once cached,
+# so they are shared between all strategies built from the same rule text.
+PARSED_RULES = RuleCache(maxsize=1024, name='parsed_rules')
+COMPILED_PLANS = RuleCache(maxsize=256, name='compiled_plans')
+
+
+def normalize_rule(rule_str: str) -> str:
+    """Canonical form of a rule string: single spaces, none inside parentheses or around commas."""
+    rule_str = re.sub(r'\s+', ' ', rule_str.strip())
+    rule_str = re.sub(r'\s*,\s*', ',', rule_str)
+    rule_str = re.sub(r'\(\s+', '(', rule_str)
+    return re.sub(r'\s+\)', ')', rule_str)
+
+
+def cached_parse_rule(rule_str: str) -> CompositeRule:
+    """parse_rule backed by the PARSED_RULES cache."""
+    key = normalize_rule(rule_str)
+    return PARSED_RULES.get_or_create(key, lambda: parse_rule(key))
+
+
+def cached_compile_rules(rule_strs: Dict[str, Optional[str]]) -> Tuple[Dict[str, Optional[CompositeRule]], RulePlan]:
+    """Parse and compile named rule strings, reusing cached results for identical rule sets."""
+    normalized = {name: normalize_rule(rule) if rule else None for name, rule in rule_strs.items()}
+    rules = {name: cached_parse_rule(rule) if rule else None for name, rule in normalized.items()}
+    plan = COMPILED_PLANS.get_or_create(tuple(normalized.items()), lambda: compile_rules(rules))
+    return rules, plan
+
+
+def rule_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {'parsed_rules': PARSED_RULES.stats(), 'compiled_plans': COMPILED_PLANS.stats()}
@@ -32,6 +32,62 @@ def generate_signals_old(df: pd.DataFrame, entry_signal: CompositeRule, exit_sig
     return pd.Series(position, index=df.index)
 
 
+def latch_positions(entry: np.ndarray, exit: np.ndarray, position_type: int = 1) -> np.ndarray:
+    """
+    Turn entry and exit masks into positions: an entry while flat opens a position,
+    an exit while in a position closes it, and the first bar is always flat.
+    2D masks are latched column by column.
+
+    Bars with only an entry set the state, bars with only an exit reset it and bars
+    with both flip it, so the state at each bar is the state left by the last set or
+    reset bar, flipped once for every entry-and-exit bar since then.
+    """
+    entry = np.asarray(entry, dtype=bool)
+    exit = np.asarray(exit, dtype=bool)
+    position = np.zeros(entry.shape, dtype=np.int8)
+    if len(entry) == 0:
+        return position
+    if entry.ndim == 1:
+        position[_latch_state(entry[:, None], exit[:, None])[:, 0]] = position_type
+        return position
+    # Bound the size of the index arrays on wide inputs
+    step = max(1, 2**24 // len(entry))
+    for start in range(0, entry.shape[1], step):
+        columns = slice(start, start + step)
+        position[:, columns][_latch_state(entry[:, columns], exit[:, columns])] = position_type
+    return position
+
+
+def _latch_state(entry: np.ndarray, exit: np.ndarray) -> np.ndarray:
+    # In-position mask of (time x column) entry and exit masks
+    sets = entry & ~exit
+    resets = exit & ~entry
+    flips = entry & exit
+    sets[0], resets[0], flips[0] = False, True, False
+    index_type = np.int32 if len(entry) < 2**31 else np.int64
+    rows = np.arange(len(entry), dtype=index_type)[:, None]
+    last_event = np.where(sets | resets, rows, 0).astype(index_type, copy=False)
+    np.maximum.accumulate(last_event, axis=0, out=last_event)
+    flip_count = np.cumsum(flips, axis=0, dtype=index_type)
+    flip_count -= np.take_along_axis(flip_count, last_event, axis=0)
+    return np.take_along_axis(sets, last_event, axis=0) ^ (flip_count & 1).astype(bool)
+
+
+def _latch_loop(entry: np.ndarray, exit: np.ndarray, position_type: int = 1) -> np.ndarray:
+    # Bar-by-bar reference of latch_positions, as generate_signals used to run it
+    position = np.zeros(len(entry))
+    in_position = np.zeros(len(entry), dtype=bool)
+    for i in range(1, len(entry)):
+        if entry[i] and not in_position[i - 1]:
+            position[i] = position_type
+        elif exit[i] and in_position[i - 1]:
+            position[i] = 0
+        else:
+            position[i] = position[i - 1]
+        in_position[i] = position[i] != 0
+    return position
+
+
 def generate_signals(
     df: pd.DataFrame, 
     entry_signal: CompositeRule, 
@@ -41,65 +97,79 @@ def generate_signals(
     exit_regime: Optional[CompositeRule] = None,
     regime_df: Optional[pd.DataFrame] = None,
     regime_entry_action: Optional[str] = None,
-    regime_exit_action: Optional[str] = None
+    regime_exit_action: Optional[str] = None,
+    regime_alignment: Optional['RegimeAlignment'] = None
 ) -> pd.Series:
     """
     Generate trading signals based on entry and exit rules with regime filters.
     """
-    # Base signals
-    entry = entry_signal.evaluate(df)
-    if isinstance(entry, np.ndarray):
-        entry = pd.Series(entry, index=df.index)
-    
-    exit = exit_signal.evaluate(df)
-    if isinstance(exit, np.ndarray):
-        exit = pd.Series(exit, index=df.index)
-
-    # Initialize arrays
-    position = pd.Series(np.zeros(len(df)), index=df.index)
-    in_position = pd.Series(np.zeros(len(df), dtype=bool), index=df.index)
-
-    # Handle regime filters if provided
-    if regime_df is not None:
-        # Entry regime handling
-        allow_entries = pd.Series(np.ones(len(df), dtype=bool), index=df.index)  # Default allow all entries
-        if entry_regime and regime_entry_action:
-            entry_regime_signal = entry_regime.evaluate(regime_df)
-            if isinstance(entry_regime_signal, np.ndarray):
-                entry_regime_signal = pd.Series(entry_regime_signal, index=regime_df.index)
-            entry_regime_signal = entry_regime_signal.reindex(df.index, method='ffill').fillna(False)
-            
-            # Only allow entries when regime condition is met
-            allow_entries = entry_regime_signal
-
-        # Modify entry signals based on regime permission
-        entry = entry & allow_entries
-
-        # Exit regime handling
-        if exit_regime and regime_exit_action:
-            exit_regime_signal = exit_regime.evaluate(regime_df)
-            if isinstance(exit_regime_signal, np.ndarray):
-                exit_regime_signal = pd.Series(exit_regime_signal, index=regime_df.index)
-            exit_regime_signal = exit_regime_signal.reindex(df.index, method='ffill').fillna(False)
-            
-            # Force exit when regime exit condition is met
-            exit = exit | exit_regime_signal
-
-    # Convert to numpy arrays for performance
-    entry = entry.values
-    exit = exit.values
-    position = position.values
-    in_position = in_position.values
-
-    # Process signals through time
-    for i in range(1, len(df)):
-        if entry[i] and not in_position[i - 1]:  # New entry
-            position[i] = position_type
-        elif exit[i] and in_position[i - 1]:  # Exit
-            position[i] = 0
-        else:  # Maintain previous position
-            position[i] = position[i - 1]
+    # Base signals, copied since the regime filters update them in place
+    entry = np.array(entry_signal.evaluate(df), dtype=bool)
+    exit = np.array(exit_signal.evaluate(df), dtype=bool)
 
-        in_position[i] = position[i] != 0
+    apply_regime_filters(entry, exit, df.index, regime_df, entry_regime, exit_regime, regime_entry_action, regime_exit_action,
+                         regime_alignment)
+    position = latch_positions(entry, exit, position_type)
+    return pd.Series(position.astype(float), index=df.index)
+
+
+class RegimeAlignment:
+    """
+    As-of mapping from a strategy's timeline to a regime timeline: each timestamp of
+    index takes the regime bar at or before it, as reindex(index, method='ffill')
+    would, and bars before the first regime bar are False. The positions are found
+    once with searchsorted and reused for every regime signal on the same pair of
+    indexes.
+    """
+
+    def __init__(self, regime_index: pd.Index, index: pd.Index):
+        self.regime_index = regime_index
+        self.index = index
+        positions = regime_index.searchsorted(index, side='right') - 1
+        self.valid = positions >= 0
+        self.positions = np.maximum(positions, 0)
+
+    def matches(self, regime_index: pd.Index, index: pd.Index) -> bool:
+        return (regime_index is self.regime_index or regime_index.equals(self.regime_index)) and \
+            (index is self.index or index.equals(self.index))
+
+    def align(self, signal: np.ndarray) -> np.ndarray:
+        """Regime signal as of each timestamp of index."""
+        signal = np.asarray(signal, dtype=bool)
+        if not len(signal):
+            return np.zeros(len(self.index), dtype=bool)
+        aligned = signal.take(self.positions)
+        aligned &= self.valid
+        return aligned
+
+
+def apply_regime_filters(
+    entry: np.ndarray,
+    exit: np.ndarray,
+    index: pd.Index,
+    regime_df: Optional[pd.DataFrame],
+    entry_regime: Optional[CompositeRule] = None,
+    exit_regime: Optional[CompositeRule] = None,
+    regime_entry_action: Optional[str] = None,
+    regime_exit_action: Optional[str] = None,
+    alignment: Optional[RegimeAlignment] = None
+):
+    """
+    Mask entry and extend exit in place with the regime signals, aligned as of each
+    timestamp of index. alignment can be an existing RegimeAlignment of regime_df on index.
+    """
+    if regime_df is None:
+        return
+    entry_regime = entry_regime if regime_entry_action else None
+    exit_regime = exit_regime if regime_exit_action else None
+    if not entry_regime and not exit_regime:
+        return
+    if alignment is None or not alignment.matches(regime_df.index, index):
+        alignment = RegimeAlignment(regime_df.index, index)
+    if entry_regime:
+        # Only allow entries when regime condition is met
+        entry &= alignment.align(entry_regime.evaluate(regime_df))
+    if exit_regime:
+        # Force exit when regime exit condition is met
+        exit |= alignment.align(exit_regime.evaluate(regime_df))
 
-    return pd.Series(position, index=df.index)
\ No newline at end of file
@@ -1,11 +1,15 @@
 # strategy.py
 
 from dataclasses import dataclass
-from typing import Optional, Literal, List
+from typing import Optional, Literal, List, Dict
 import pandas as pd
 import numpy as np
 from app.services.strategy_module.expressions import parse_rule, CompositeRule
-from app.services.strategy_module.signals import generate_signals
+from app.services.strategy_module.compiler import PlanEvaluator
+from app.services.strategy_module.profiling import EvaluationProfile
+from app.services.strategy_module.rule_cache import cached_compile_rules
+from app.services.strategy_module.signals import RegimeAlignment, generate_signals
+from app.services.strategy_module.volatility import volatility_estimate as estimate_volatility
 
 @dataclass
 class Strategy:
@@ -28,24 +32,50 @@ class Strategy:
     frequency: str = 'Daily'
 
     def __post_init__(self):
-        self.entry_rules: CompositeRule = parse_rule(self.entry_rules)
-        self.exit_rules: CompositeRule = parse_rule(self.exit_rules)
-        self.entry_regime_rules: Optional[CompositeRule] = parse_rule(self.entry_regime_rules) if self.entry_regime_rules else None
-        self.exit_regime_rules: Optional[CompositeRule] = parse_rule(self.exit_regime_rules) if self.exit_regime_rules else None
+        # Parsing and compilation are cached on the normalized rule text
+        rules, self.plan = cached_compile_rules({
+            'entry': self.entry_rules,
+            'exit': self.exit_rules,
+            'entry_regime': self.entry_regime_rules,
+            'exit_regime': self.exit_regime_rules,
+        })
+        self.entry_rules: CompositeRule = rules['entry']
+        self.exit_rules: CompositeRule = rules['exit']
+        self.entry_regime_rules: Optional[CompositeRule] = rules['entry_regime']
+        self.exit_regime_rules: Optional[CompositeRule] = rules['exit_regime']
         self.position_type_value: int = 1 if self.position_type == 'long' else -1
 
-    def generate_signals(self, df: pd.DataFrame, regime_df: Optional[pd.DataFrame] = None) -> pd.Series:
-        """Generate trading signals for the strategy."""
+    def rules(self) -> Dict[str, Optional[CompositeRule]]:
+        """Parsed rules of the strategy, keyed by their role."""
+        return {
+            'entry': self.entry_rules,
+            'exit': self.exit_rules,
+            'entry_regime': self.entry_regime_rules,
+            'exit_regime': self.exit_regime_rules,
+        }
+
+    def warmup(self) -> Optional[int]:
+        """Leading rows before the entry and exit rules have all their inputs, or None if that depends on the data."""
+        warmups = [self.plan.warmup(root) for name, root in self.plan.roots.items() if name in ('entry', 'exit')]
+        return None if None in warmups else max(warmups, default=0)
+
+    def generate_signals(self, df: pd.DataFrame, regime_df: Optional[pd.DataFrame] = None, chunk_size: Optional[int] = None,
+                         profile: Optional[EvaluationProfile] = None, regime_alignment: Optional[RegimeAlignment] = None) -> pd.Series:
+        """Generate trading signals for the strategy. regime_alignment can be an existing alignment of regime_df on df."""
+        # Evaluate all rules through one plan so shared indicators are computed once per DataFrame
+        evaluator = PlanEvaluator(self.plan, df, chunk_size=chunk_size, profile=profile, frequency=self.frequency)
+        regime_evaluator = PlanEvaluator(self.plan, regime_df, chunk_size=chunk_size, profile=profile) if regime_df is not None else None
         signals = generate_signals(
             df=df,
-            entry_signal=self.entry_rules,
-            exit_signal=self.exit_rules,
+            entry_signal=evaluator.bind('entry'),
+            exit_signal=evaluator.bind('exit'),
             position_type=self.position_type_value,
-            entry_regime=self.entry_regime_rules if self.regime_entry_action else None,
-            exit_regime=self.exit_regime_rules if self.regime_exit_action else None,
+            entry_regime=regime_evaluator.bind('entry_regime') if regime_evaluator and self.entry_regime_rules and self.regime_entry_action else None,
+            exit_regime=regime_evaluator.bind('exit_regime') if regime_evaluator and self.exit_regime_rules and self.regime_exit_action else None,
             regime_df=regime_df,
             regime_entry_action=self.regime_entry_action,
-            regime_exit_action=self.regime_exit_action
+            regime_exit_action=self.regime_exit_action,
+            regime_alignment=regime_alignment
         )
         return signals
 
@@ -60,9 +90,8 @@ class Strategy:
         elif self.position_size_method == 'volatility_target':
             if self.volatility_target is None:
                 raise ValueError('volatility_target must be set when position_size_method is "volatility_target"')
-            returns = df['Close'].pct_change()
-            realized_vol = returns.ewm(span=self.volatility_lookback).std().shift() * np.sqrt(365)
-            volatility_estimate = realized_vol.ewm(span=self.volatility_lookback).mean().shift()
+            # Shared with every strategy sizing on the same prices, lookback and frequency
+            volatility_estimate = pd.Series(estimate_volatility(df, self.volatility_lookback, self.frequency), index=df.index)
             position_sizes = (self.volatility_target / 100) / volatility_estimate  # Frontend receives percentage
             # Apply buffer to adjust position sizes when volatility deviates
             if self.volatility_buffer is not None:
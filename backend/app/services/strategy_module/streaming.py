@@ -0,0 +1,359 @@
+# streaming.py
+
+from collections import deque
+from datetime import date, time
+from math import copysign, isnan, nan, sqrt
+from typing import Callable, Dict, Iterable, Optional
+import pandas as pd
+import numpy as np
+
+
+class StreamingIndicator:
+    """
+    Stateful counterpart of a batch indicator in indicators.py.
+
+    update() takes the next bar and returns the indicator value for that bar, equal
+    to the batch function's value at the same position (including its trailing
+    .shift(), so the value only depends on earlier bars). Each update runs in
+    constant amortized time.
+    """
+
+    def update(self, value: float) -> float:
+        raise NotImplementedError
+
+    def update_many(self, values: Iterable[float]) -> np.ndarray:
+        """Feed a batch of bars, returning one value per bar."""
+        return np.array([self.update(value) for value in values], dtype=float)
+
+
+class _RollingMean:
+    """Fixed-window mean with the same compensated add/remove arithmetic as pandas' rolling().mean()."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value: Optional[float] = None
+
+    def push(self, value: float) -> float:
+        if self.prev_value is None:
+            self.prev_value = value
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(value)
+        self._add(value)
+        return self.mean()
+
+    def _add(self, value: float):
+        if isnan(value):
+            return
+        self.nobs += 1
+        y = value - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if copysign(1.0, value) < 0:
+            self.neg_ct += 1
+        if value == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = value
+
+    def _remove(self, value: float):
+        if isnan(value):
+            return
+        self.nobs -= 1
+        y = -value - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if copysign(1.0, value) < 0:
+            self.neg_ct -= 1
+
+    def mean(self) -> float:
+        if self.nobs < self.window or self.nobs == 0:
+            return nan
+        if self.num_consecutive_same_value >= self.nobs:
+            return self.prev_value
+        result = self.sum_x / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class StreamingSMA(StreamingIndicator):
+    """Incremental SMA(series, window): running compensated sum over the last window bars."""
+
+    def __init__(self, window: int):
+        self._mean = _RollingMean(window)
+        self._last = nan
+
+    def update(self, value: float) -> float:
+        result = self._last
+        self._last = self._mean.push(float(value))
+        return result
+
+
+class _EwmMean:
+    """Exponentially weighted mean with the same update as pandas' ewm(alpha=...).mean()."""
+
+    def __init__(self, alpha: float, adjust: bool = True):
+        self.adjust = adjust
+        self._new_wt = 1.0 if adjust else alpha
+        self._old_wt_factor = 1.0 - alpha
+        self._old_wt = 1.0
+        self.value = nan
+
+    def push(self, value: float) -> float:
+        if self.value == self.value:
+            self._old_wt *= self._old_wt_factor
+            if value == value:
+                if self.value != value:
+                    self.value = (self._old_wt * self.value + self._new_wt * value) / (self._old_wt + self._new_wt)
+                self._old_wt = self._old_wt + self._new_wt if self.adjust else 1.0
+        elif value == value:
+            self.value = value
+        return self.value
+
+
+class _EwmVar:
+    """Exponentially weighted variance with bias correction, as pandas' ewm(alpha=...).var() updates it."""
+
+    def __init__(self, alpha: float, adjust: bool = True):
+        self.adjust = adjust
+        self._new_wt = 1.0 if adjust else alpha
+        self._old_wt_factor = 1.0 - alpha
+        self._old_wt = 1.0
+        self._sum_wt = 1.0
+        self._sum_wt2 = 1.0
+        self._mean = nan
+        self._cov = 0.0
+        self._nobs = 0
+
+    def push(self, value: float) -> float:
+        observed = value == value
+        self._nobs += observed
+        if self._mean == self._mean:
+            self._sum_wt *= self._old_wt_factor
+            self._sum_wt2 *= self._old_wt_factor * self._old_wt_factor
+            self._old_wt *= self._old_wt_factor
+            if observed:
+                old_mean = self._mean
+                if self._mean != value:
+                    self._mean = (self._old_wt * old_mean + self._new_wt * value) / (self._old_wt + self._new_wt)
+                self._cov = (self._old_wt * (self._cov + (old_mean - self._mean) * (old_mean - self._mean))
+                             + self._new_wt * (value - self._mean) * (value - self._mean)) / (self._old_wt + self._new_wt)
+                self._sum_wt += self._new_wt
+                self._sum_wt2 += self._new_wt * self._new_wt
+                self._old_wt += self._new_wt
+                if not self.adjust:
+                    self._sum_wt /= self._old_wt
+                    self._sum_wt2 /= self._old_wt * self._old_wt
+                    self._old_wt = 1.0
+        elif observed:
+            self._mean = value
+        if not self._nobs:
+            return nan
+        numerator = self._sum_wt * self._sum_wt
+        denominator = numerator - self._sum_wt2
+        return numerator / denominator * self._cov if denominator > 0 else nan
+
+
+class StreamingEMA(StreamingIndicator):
+    """Incremental EMA(series, window): the recursive ewm(span=window, adjust=False) update."""
+
+    def __init__(self, window: int):
+        self._mean = _EwmMean(2.0 / (window + 1.0), adjust=False)
+        self._last = nan
+
+    def update(self, value: float) -> float:
+        result = self._last
+        self._last = self._mean.push(float(value))
+        return result
+
+
+class _RollingExtreme(StreamingIndicator):
+    """Rolling max/min over a fixed window using a monotonic deque of (position, value)."""
+
+    def __init__(self, window: int, better: Callable[[float, float], bool]):
+        self.window = window
+        self._better = better
+        self._candidates: deque = deque()
+        self._nans: deque = deque()
+        self._position = 0
+        self._last = nan
+
+    def update(self, value: float) -> float:
+        value = float(value)
+        result = self._last
+        position = self._position
+        self._position += 1
+        oldest = position - self.window
+        while self._candidates and self._candidates[0][0] <= oldest:
+            self._candidates.popleft()
+        while self._nans and self._nans[0] <= oldest:
+            self._nans.popleft()
+        if isnan(value):
+            self._nans.append(position)
+        else:
+            while self._candidates and not self._better(self._candidates[-1][1], value):
+                self._candidates.pop()
+            self._candidates.append((position, value))
+        full = self._position >= self.window and not self._nans
+        self._last = self._candidates[0][1] if full else nan
+        return result
+
+
+class StreamingRollingHigh(_RollingExtreme):
+    """Incremental rolling_high(series, window)."""
+
+    def __init__(self, window: int):
+        super().__init__(window, lambda kept, new: kept > new)
+
+
+class StreamingRollingLow(_RollingExtreme):
+    """Incremental rolling_low(series, window)."""
+
+    def __init__(self, window: int):
+        super().__init__(window, lambda kept, new: kept < new)
+
+
+class StreamingMATrend(StreamingIndicator):
+    """Incremental MA_trend(series, ma_window, return_window); like the batch function it is not shifted."""
+
+    def __init__(self, ma_window: int, return_window: int):
+        self._mean = _RollingMean(ma_window)
+        self._history: deque = deque(maxlen=return_window + 1)
+        self._last_valid = nan
+
+    def update(self, value: float) -> float:
+        ma = self._mean.push(float(value))
+        # pct_change forward-fills missing averages before comparing
+        if not isnan(ma):
+            self._last_valid = ma
+        self._history.append(self._last_valid)
+        if len(self._history) < self._history.maxlen:
+            return nan
+        return self._history[-1] / self._history[0] - 1
+
+
+class StreamingVolatility(StreamingIndicator):
+    """
+    Incremental volatility.volatility_estimate(df, lookback, frequency): update() takes the
+    next close and returns the estimate position sizing uses for that bar.
+    """
+
+    def __init__(self, lookback: int, periods_per_year: float = 365):
+        alpha = 2.0 / (lookback + 1.0)
+        self._variance = _EwmVar(alpha)
+        self._mean = _EwmMean(alpha)
+        self._scale = np.sqrt(periods_per_year)
+        self._previous_close = nan
+        self._last_std = nan
+        self._last = nan
+
+    def update(self, value: float) -> float:
+        value = float(value)
+        result = self._last
+        variance = self._variance.push(value / self._previous_close - 1)
+        self._previous_close = value
+        # The realized volatility of a bar is the standard deviation up to the bar before
+        self._last = self._mean.push(self._last_std * self._scale)
+        self._last_std = sqrt(variance) if variance >= 0 else (0.0 if variance == variance else nan)
+        return result
+
+
+def session_clock(timestamp: pd.Timestamp, session_tz: Optional[str], session_offset: pd.Timedelta) -> pd.Timestamp:
+    """Naive timestamp on a clock whose days are sessions, as in indicators.session_clock."""
+    timestamp = pd.Timestamp(timestamp)
+    if session_tz is not None:
+        timestamp = (timestamp.tz_localize('UTC') if timestamp.tz is None else timestamp).tz_convert(session_tz)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_localize(None)
+    return timestamp - session_offset
+
+
+class StreamingVWAP:
+    """Incremental VWAP(df, session_tz=..., session_start=...): cumulative price*volume and volume, reset every session."""
+
+    def __init__(self, session_tz: Optional[str] = None, session_start: str = '00:00'):
+        self.session_tz = session_tz
+        self._session_offset = pd.Timedelta(f"{session_start}:00")
+        self._session = None
+        self._cum_vol_price = 0.0
+        self._cum_volume = 0.0
+        self._last = nan
+
+    def session(self, timestamp: pd.Timestamp) -> date:
+        return session_clock(timestamp, self.session_tz, self._session_offset).date()
+
+    def update(self, timestamp: pd.Timestamp, high: float, low: float, close: float, volume: float) -> float:
+        result = self._last
+        session = self.session(timestamp)
+        if session != self._session:
+            self._session = session
+            self._cum_vol_price = 0.0
+            self._cum_volume = 0.0
+        vol_price = (high + low + close) / 3 * volume
+        # Like the batch session cumsum, missing values are skipped but yield NaN at their own bar
+        if not isnan(vol_price):
+            self._cum_vol_price += vol_price
+        if not isnan(volume):
+            self._cum_volume += volume
+        if isnan(vol_price) or isnan(volume) or not self._cum_volume:
+            self._last = nan
+        else:
+            self._last = self._cum_vol_price / self._cum_volume
+        return result
+
+    def update_many(self, df: pd.DataFrame) -> np.ndarray:
+        return np.array([
+            self.update(timestamp, high, low, close, volume)
+            for timestamp, high, low, close, volume in zip(df.index, df['High'], df['Low'], df['Close'], df['Volume'])
+        ], dtype=float)
+
+
+class StreamingAverageMoveFromOpen:
+    """
+    Incremental average_move_from_open(df, rolling_window, session_tz, session_start).
+
+    Keeps a running sum of the last rolling_window moves from the session open for every
+    time of day, so each day's bars extend the history of their own time slot in constant
+    time. The sums are compensated like SMA's; they can differ from the batch sums by rounding.
+    """
+
+    def __init__(self, rolling_window: int = 14, session_tz: str = 'America/New_York', session_start: str = '00:00'):
+        self.rolling_window = rolling_window
+        self.session_tz = session_tz
+        self._session_offset = pd.Timedelta(f"{session_start}:00")
+        self._session = None
+        self._session_open = nan
+        self._moves: Dict[time, _RollingMean] = {}
+
+    def update(self, timestamp: pd.Timestamp, open: float, close: float) -> float:
+        clock = session_clock(timestamp, self.session_tz, self._session_offset)
+        if clock.date() != self._session:
+            self._session = clock.date()
+            self._session_open = float(open)
+        moves = self._moves.get(clock.time())
+        if moves is None:
+            moves = self._moves[clock.time()] = _RollingMean(self.rolling_window)
+        # Only earlier sessions count; NaN until rolling_window moves without a missing one
+        result = moves.mean()
+        moves.push(abs(float(close) / self._session_open - 1))
+        return result
+
+    def update_many(self, df: pd.DataFrame) -> np.ndarray:
+        return np.array([
+            self.update(timestamp, open, close)
+            for timestamp, open, close in zip(df.index, df['Open'], df['Close'])
+        ], dtype=float)
+
@@ -0,0 +1,94 @@
+# transitions.py
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+import pandas as pd
+import numpy as np
+
+
+@dataclass
+class Transitions:
+    """
+    Run-length encoding of a per-bar series that changes rarely, such as a signal or
+    the in-position mask of a strategy: values[k] holds from bar starts[k] up to the
+    next start. Missing values form their own runs.
+
+    Once built, counts, lengths and trade boundaries are computed from the runs alone,
+    in O(number of changes).
+    """
+    index: pd.Index
+    starts: np.ndarray  # bar positions where a run begins, starting with 0
+    values: np.ndarray  # value of each run
+
+    @classmethod
+    def from_dense(cls, values: Union[np.ndarray, pd.Series], index: Optional[pd.Index] = None) -> 'Transitions':
+        """Encode a dense array (or Series, whose index is used if index is not given; bar positions otherwise)."""
+        if isinstance(values, pd.Series):
+            index = values.index if index is None else index
+            values = values.to_numpy()
+        values = np.asarray(values)
+        index = pd.RangeIndex(len(values)) if index is None else index
+        if len(values) == 0:
+            return cls(index, np.zeros(0, dtype=np.int64), values[:0])
+        changed = values[1:] != values[:-1]
+        if values.dtype.kind == 'f':
+            # NaN runs are kept together; they still differ from every number
+            changed &= ~(np.isnan(values[1:]) & np.isnan(values[:-1]))
+        starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+        return cls(index, starts, values[starts])
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Number of bars in each run."""
+        return np.diff(self.starts, append=len(self))
+
+    def to_dense(self) -> np.ndarray:
+        return np.repeat(self.values, self.lengths)
+
+    def to_series(self, name: Optional[str] = None) -> pd.Series:
+        return pd.Series(self.to_dense(), index=self.index, name=name)
+
+    def changes(self) -> int:
+        """Number of bars where the value changes between two non-missing values, like diff() != 0 counts them."""
+        if len(self.values) < 2 or self.values.dtype.kind != 'f':
+            return max(len(self.values) - 1, 0)
+        present = ~np.isnan(self.values)
+        return int(np.count_nonzero(present[1:] & present[:-1]))
+
+    def exposure(self) -> float:
+        """Fraction of bars whose value is not zero (missing values count as exposed, like != 0)."""
+        return self.lengths[self.values != 0].sum() / len(self) if len(self) else np.nan
+
+    def run_count(self) -> int:
+        """Number of runs when every missing bar is a run of its own, as a != shift() grouping makes them."""
+        if self.values.dtype.kind != 'f':
+            return len(self.values)
+        missing = np.isnan(self.values)
+        return int(np.count_nonzero(~missing) + self.lengths[missing].sum())
+
+    def trades(self) -> np.ndarray:
+        """
+        (entry, exit) bar positions of every run of non-zero values: entry is the first
+        bar of the run and exit the first flat bar after it, or len(self) if the run
+        lasts until the end.
+        """
+        held = self.values != 0
+        entries = np.flatnonzero(held & ~np.concatenate(([False], held[:-1])))
+        # The run after a held run that is not held is its flat exit bar; skip runs of other held values
+        exits = np.searchsorted(np.flatnonzero(~held), entries)
+        flat_runs = np.append(np.flatnonzero(~held), len(self.values))
+        exit_runs = flat_runs[exits]
+        starts = np.append(self.starts, len(self))
+        return np.column_stack((self.starts[entries], starts[exit_runs]))
+
+    def to_records(self, name: str = 'value', **columns: Union[np.ndarray, pd.Series]) -> List[Dict[str, Any]]:
+        """
+        One {'Date', name} record per run, at its first bar. Each keyword adds a per-bar
+        column (such as Close) with its value at that bar.
+        """
+        fields = {name: self.values.tolist()}
+        fields.update({column: np.asarray(values)[self.starts].tolist() for column, values in columns.items()})
+        return [{'Date': date, **dict(zip(fields, values))} for date, *values in zip(self.index[self.starts], *fields.values())]
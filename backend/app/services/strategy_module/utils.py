@@ -1,51 +1,122 @@
 # utils.py
 
 import pandas as pd
-from typing import List, Set
-from app.services.strategy_module.indicators import INDICATORS
-from app.services.strategy_module.expressions import Indicator, Rule, CompositeRule
+import numpy as np
+from typing import Dict, List, Optional
+from app.services.strategy_module.compiler import RulePlan, PlanEvaluator, compile_rules
+from app.services.strategy_module.indicators import INDICATOR_SPECS
+from app.services.strategy_module.indicator_cache import INDICATOR_CACHE, IndicatorCache
+from app.services.strategy_module.profiling import EvaluationProfile
+from app.services.strategy_module.signals import RegimeAlignment, apply_regime_filters, latch_positions
 from app.services.strategy_module.strategy import Strategy
+from app.utils.tracing import span
 
-def add_indicators(df: pd.DataFrame, strategies: List[Strategy]) -> pd.DataFrame:
-    """Add the required indicators to the DataFrame based on the strategies."""
-    all_indicators: Set[Indicator] = set()
-
-    def collect_indicators(rule):
-        if isinstance(rule, Rule):
-            all_indicators.add(rule.left)
-            if isinstance(rule.right, Indicator):
-                all_indicators.add(rule.right)
-        elif isinstance(rule, CompositeRule):
-            collect_indicators(rule.rule)
-            if rule.next_rule:
-                collect_indicators(rule.next_rule)
-
-    for strategy in strategies:
-        # Main rules
-        collect_indicators(strategy.entry_rules)
-        collect_indicators(strategy.exit_rules)
-        
-        # Regime rules
-        if strategy.entry_regime_rules:
-            collect_indicators(strategy.entry_regime_rules)
-        if strategy.exit_regime_rules:
-            collect_indicators(strategy.exit_regime_rules)
-
-    for indicator in all_indicators:
-        if indicator.name in INDICATORS:
-            print(f"Adding indicator: {indicator}")
-            if indicator.name == 'VWAP':
-                df[str(indicator)] = INDICATORS[indicator.name](df)
-            else:
-                # Prepare parameters
-                params = []
-                for param in indicator.params:
-                    try:
-                        params.append(int(param))
-                    except ValueError:
-                        if param in df.columns:
-                            params.append(df[param])
-                        else:
-                            raise ValueError(f"Parameter {param} not found in DataFrame columns.")
-                df[str(indicator)] = INDICATORS[indicator.name](*params)
+def add_indicators(df: pd.DataFrame, strategies: List[Strategy], profile: Optional[EvaluationProfile] = None,
+                   frequency: Optional[str] = None, cache: Optional[IndicatorCache] = INDICATOR_CACHE) -> pd.DataFrame:
+    """
+    Add the required indicators to the DataFrame based on the strategies. frequency is the bar
+    frequency of df, if known. Indicators already computed on identical data are taken from cache.
+    """
+    # Compile every strategy into one plan so indicators shared across strategies are computed once
+    with span('parse'):
+        plan = RulePlan()
+        for strategy in strategies:
+            compile_rules({f'{strategy.name}_{role}': rule for role, rule in strategy.rules().items()}, plan)
+
+    evaluator = PlanEvaluator(plan, df, profile=profile, frequency=frequency, cache=cache)
+    # All windows requested on the same series are computed together
+    with span('indicators'):
+        evaluator.evaluate_window_groups()
+    new_columns: Dict[str, int] = {}
+    for node_id in plan.indicator_nodes():
+        label = plan.label(node_id)
+        if label not in df.columns and label not in new_columns:
+            new_columns[label] = node_id
+    if not new_columns:
+        return df
+
+    # Fill one pre-allocated block and add all columns at once instead of growing df column by column
+    dtype = np.result_type(*(INDICATOR_SPECS[plan.nodes[node_id].name].dtype for node_id in new_columns.values()))
+    block = np.empty((len(df), len(new_columns)), dtype=dtype, order='F')
+    for j, (label, node_id) in enumerate(new_columns.items()):
+        block[:, j] = evaluator.value(node_id)
+    df[list(new_columns)] = block
     return df
+
+
+def generate_batch_signals(df: pd.DataFrame, strategies: List[Strategy], regime_dfs: Optional[Dict[str, pd.DataFrame]] = None,
+                           frequency: Optional[str] = None, cache: Optional[IndicatorCache] = INDICATOR_CACHE,
+                           regime_alignments: Optional[Dict[str, RegimeAlignment]] = None) -> pd.DataFrame:
+    """
+    Signals of several strategies on the same DataFrame, one column per strategy name.
+
+    The rules of all strategies are compiled into one plan and evaluated once, their
+    entry and exit masks are stacked as columns of (time x strategy) matrices and
+    latched in a single pass. regime_dfs maps each regime asset to its data; the regime
+    rules on each asset are compiled into one plan as well, and aligned on df through
+    one RegimeAlignment per asset, taken from and added to regime_alignments if given.
+    Each column equals Strategy.generate_signals with the strategy's regime DataFrame.
+    """
+    regime_dfs = regime_dfs or {}
+    regime_alignments = regime_alignments if regime_alignments is not None else {}
+    with span('parse'):
+        plan = RulePlan()
+        regime_plans: Dict[str, RulePlan] = {}
+        for j, strategy in enumerate(strategies):
+            compile_rules({f'entry_{j}': strategy.entry_rules, f'exit_{j}': strategy.exit_rules}, plan)
+            if strategy.regime_asset in regime_dfs:
+                compile_rules({
+                    f'entry_regime_{j}': strategy.entry_regime_rules if strategy.regime_entry_action else None,
+                    f'exit_regime_{j}': strategy.exit_regime_rules if strategy.regime_exit_action else None,
+                }, regime_plans.setdefault(strategy.regime_asset, RulePlan()))
+    with span('indicators'):
+        evaluator = PlanEvaluator(plan, df, frequency=frequency, cache=cache)
+        evaluator.evaluate_window_groups()
+        regime_evaluators = {asset: PlanEvaluator(regime_plan, regime_dfs[asset], cache=cache) for asset, regime_plan in regime_plans.items()}
+        for asset, regime_evaluator in regime_evaluators.items():
+            regime_evaluator.evaluate_window_groups()
+            alignment = regime_alignments.get(asset)
+            if alignment is None or not alignment.matches(regime_dfs[asset].index, df.index):
+                regime_alignments[asset] = RegimeAlignment(regime_dfs[asset].index, df.index)
+
+    with span('signals'):
+        return _batch_signals(df, strategies, evaluator, regime_evaluators, regime_alignments)
+
+
+def _batch_signals(df: pd.DataFrame, strategies: List[Strategy], evaluator: PlanEvaluator,
+                   regime_evaluators: Dict[str, PlanEvaluator], regime_alignments: Dict[str, RegimeAlignment]) -> pd.DataFrame:
+    # Entry and exit masks of every strategy from the evaluated plans, latched into signals
+    plan = evaluator.plan
+    # Column-major so every strategy's mask is a contiguous column
+    entry = np.empty((len(df), len(strategies)), dtype=bool, order='F')
+    exit = np.empty((len(df), len(strategies)), dtype=bool, order='F')
+    for j, strategy in enumerate(strategies):
+        evaluator.evaluate_mask(plan.roots[f'entry_{j}'], out=entry[:, j])
+        evaluator.evaluate_mask(plan.roots[f'exit_{j}'], out=exit[:, j])
+        regime_evaluator = regime_evaluators.get(strategy.regime_asset)
+        if regime_evaluator is not None:
+            roots = regime_evaluator.plan.roots
+            apply_regime_filters(
+                entry[:, j], exit[:, j], df.index, regime_evaluator.df,
+                entry_regime=regime_evaluator.bind(f'entry_regime_{j}') if f'entry_regime_{j}' in roots else None,
+                exit_regime=regime_evaluator.bind(f'exit_regime_{j}') if f'exit_regime_{j}' in roots else None,
+                regime_entry_action=strategy.regime_entry_action,
+                regime_exit_action=strategy.regime_exit_action,
+                alignment=regime_alignments[strategy.regime_asset],
+            )
+
+    position_types = np.array([strategy.position_type_value for strategy in strategies], dtype=float)
+    signals = latch_positions(entry, exit) * position_types
+    return pd.DataFrame(signals, index=df.index, columns=[strategy.name for strategy in strategies])
+
+
+def profile_strategy(df: pd.DataFrame, strategy: Strategy, regime_df: Optional[pd.DataFrame] = None,
+                     trace_memory: bool = False) -> EvaluationProfile:
+    """Evaluate a strategy's rules on copies of the data and return the per-node profile."""
+    profile = EvaluationProfile(trace_memory=trace_memory)
+    # Bypass the indicator cache so the profile shows the cost of computing every indicator
+    df = add_indicators(df.copy(), [strategy], profile=profile, cache=None)
+    if regime_df is not None:
+        regime_df = add_indicators(regime_df.copy(), [strategy], profile=profile, cache=None)
+    strategy.generate_signals(df, regime_df, profile=profile)
+    return profile
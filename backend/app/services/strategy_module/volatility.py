@@ -0,0 +1,50 @@
+# volatility.py
+
+from typing import Optional
+import pandas as pd
+import numpy as np
+from app.services.strategy_module.indicators import NANOSECONDS_PER_DAY, DAILY_FREQUENCIES
+from app.services.strategy_module.indicator_cache import INDICATOR_CACHE, IndicatorCache, DataFingerprint
+
+# Markets trade every day of the year, as the metrics assume
+DAYS_PER_YEAR = 365
+
+
+def periods_per_year(frequency: Optional[str]) -> float:
+    """Number of bars of the given frequency ('Daily', '4h', '15m', ...) in a year; daily if unknown."""
+    if frequency is None or frequency in DAILY_FREQUENCIES:
+        return DAYS_PER_YEAR
+    try:
+        bar = pd.Timedelta(frequency)
+    except ValueError:
+        raise ValueError(f"Unknown frequency: {frequency}")
+    if bar <= pd.Timedelta(0):
+        raise ValueError(f"Unknown frequency: {frequency}")
+    return DAYS_PER_YEAR * NANOSECONDS_PER_DAY / bar.value
+
+
+def realized_volatility(close: pd.Series, lookback: int, frequency: Optional[str] = None) -> pd.Series:
+    """Annualized exponentially weighted standard deviation of returns over lookback bars, known from the next bar."""
+    returns = close.pct_change()
+    return returns.ewm(span=lookback).std().shift() * np.sqrt(periods_per_year(frequency))
+
+
+def volatility_estimate(df: pd.DataFrame, lookback: int, frequency: Optional[str] = None,
+                        cache: Optional[IndicatorCache] = INDICATOR_CACHE) -> np.ndarray:
+    """
+    Volatility forecast used by volatility-target sizing: the exponentially weighted
+    average of the realized volatility of df['Close'], lagged one more bar.
+
+    Estimates are cached on the close prices, lookback and bar frequency, so strategies
+    and parameter sweeps on the same data share them. The cached array is read-only.
+    For bars appended one at a time, streaming.StreamingVolatility gives the same values.
+    """
+    def compute() -> np.ndarray:
+        realized_vol = realized_volatility(df['Close'], lookback, frequency)
+        return realized_vol.ewm(span=lookback).mean().shift().to_numpy()
+
+    if cache is None:
+        return compute()
+    key = (DataFingerprint(df).of(['Close']), f"Volatility_Estimate(Close, {lookback}, {periods_per_year(frequency)})")
+    return cache.get_or_create(key, compute)
+
@@ -1,17 +1,27 @@
 # app/services/strategy_service/strategy.py
 
-from typing import List, Tuple, Dict
+from typing import List, Optional, Tuple, Dict
 import pandas as pd
 from app.models.backtest import StrategyInput
 from app.services.strategy_module.rule_parser import construct_rule_string
-from app.services.backtest.run_backtest import Strategy, run_backtest
+from app.services.backtest.run_backtest import Strategy, backtest_strategy, backtest_strategies
+from app.services.backtest.result import BacktestResult
+from app.services.strategy_module.rule_cache import rule_cache_stats
+from app.services.strategy_module.indicator_cache import INDICATOR_CACHE
+from app.services.strategy_module.profiling import EvaluationProfile
+from app.services.strategy_module.signals import RegimeAlignment
+from app.services.strategy_module.utils import generate_batch_signals
+from app.utils.tracing import span
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 class StrategyService:
-    def __init__(self, strategies: List[StrategyInput], fees: float, slippage: float):
+    def __init__(self, strategies: List[StrategyInput], fees: float, slippage: float, profile: bool = False):
         self.strategies = strategies
+        # Per-strategy rule evaluation profiles, collected only when profiling is requested
+        self.profiles: Dict[str, EvaluationProfile] = {}
+        self.profile = profile
         # Log the initial strategy data
         for strategy in strategies:
             logger.info(f"""
@@ -81,22 +91,38 @@ Exit Regime Rules: {[{
             """)
         self.fees = fees
         self.slippage = slippage
+        # As-of alignments of each regime asset on each strategy frequency, built once per request
+        self.regime_alignments: Dict[Tuple[str, str], RegimeAlignment] = {}
 
     async def process_strategies(self, data_dict: Dict[str, pd.DataFrame]) -> Tuple[List, List, List]:
         """
         Processes all strategies and returns results.
+
+        Strategies sharing a frequency are backtested together: their signals in one batch
+        (see generate_batch_signals) and their returns as columns of one matrix (see
+        backtest_strategies), unless per-strategy profiles are requested.
         """
         strategies_results = []
         strategies_info = []
         strategies_df_results = []
 
-        for strategy in self.strategies:
+        batch_results: Dict[int, Tuple[BacktestResult, Strategy]] = {}
+        if not self.profile:
+            batch_results = self._backtest_batches(data_dict)
+
+        for i, strategy in enumerate(self.strategies):
             try:
                 df = data_dict.get(strategy.frequency)
                 if df is None:
                     raise ValueError(f"No data found for frequency: {strategy.frequency}")
                 
-                results = await self.process_single_strategy(strategy, df, data_dict)
+                if i in batch_results:
+                    result, strategy_instance = batch_results[i]
+                    self._regime_data(strategy, data_dict)
+                    self._check_history(strategy_instance, df)
+                    results = (result, strategy_instance, result)
+                else:
+                    results = await self.process_single_strategy(strategy, df, data_dict)
                 strategies_results.append(results[0])
                 strategies_info.append(results[1])
                 strategies_df_results.append(results[2])
@@ -104,52 +130,115 @@ Exit Regime Rules: {[{
                 logger.error(f"Error processing strategy {strategy.name}: {str(e)}")
                 raise
 
+        logger.debug(f"Rule cache stats: {rule_cache_stats()}")
+        logger.debug(f"Indicator cache stats: {INDICATOR_CACHE.stats()}")
         return strategies_results, strategies_info, strategies_df_results
 
-    async def process_single_strategy(self, strategy: StrategyInput, df: pd.DataFrame, data_dict: Dict[str, pd.DataFrame]) -> Tuple:
+    def _backtest_batches(self, data_dict: Dict[str, pd.DataFrame]) -> Dict[int, Tuple[BacktestResult, Strategy]]:
+        """
+        Results and instances of every strategy whose data is available, keyed by its position
+        in self.strategies. Strategies of a frequency whose batch fails are left out.
+        """
+        groups: Dict[str, List[int]] = {}
+        for i, strategy in enumerate(self.strategies):
+            if strategy.frequency in data_dict:
+                groups.setdefault(strategy.frequency, []).append(i)
+
+        results: Dict[int, Tuple[BacktestResult, Strategy]] = {}
+        for frequency, positions in groups.items():
+            try:
+                with span('parse'):
+                    instances = [self._build_strategy(self.strategies[i]) for i in positions]
+                regime_dfs = {instance.regime_asset: data_dict[f"regime_{instance.regime_asset}"] for instance in instances
+                              if instance.regime_asset and f"regime_{instance.regime_asset}" in data_dict}
+                alignments = {asset: alignment for (asset, alignment_frequency), alignment in self.regime_alignments.items()
+                              if alignment_frequency == frequency}
+                batch = generate_batch_signals(data_dict[frequency], instances, regime_dfs, frequency=frequency,
+                                               regime_alignments=alignments)
+                self.regime_alignments.update({(asset, frequency): alignment for asset, alignment in alignments.items()})
+                batch_results = backtest_strategies(data_dict[frequency], instances, batch, self.fees, self.slippage)
+            except Exception as e:
+                # Each strategy reports its own error when it is processed on its own; the traceback shows
+                # failures of the batch path itself, which would otherwise only make requests slower
+                logger.warning(f"Batch backtest failed for frequency {frequency}, backtesting its strategies one at a time: "
+                               f"{str(e)}", exc_info=True)
+                continue
+            for i, result, instance in zip(positions, batch_results, instances):
+                results[i] = (result, instance)
+        return results
+
+    def _regime_data(self, strategy: StrategyInput, data_dict: Dict[str, pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """Data of the strategy's regime asset, or None if it has no regime rules."""
+        if not (strategy.regimeAsset and (strategy.entryRegimeRules or strategy.exitRegimeRules)):
+            return None
+        regime_df = data_dict.get(f"regime_{strategy.regimeAsset}")
+        if regime_df is None:
+            raise ValueError(f"No data found for regime asset: {strategy.regimeAsset}")
+        return regime_df
+
+    def _check_history(self, strategy: Strategy, df: pd.DataFrame):
+        """Warn when df is too short for the strategy's rules to have values."""
+        warmup = strategy.warmup()
+        if warmup is not None and warmup >= len(df):
+            logger.warning(f"Strategy {strategy.name} needs {warmup} bars of history before its rules have values, "
+                           f"but only {len(df)} bars were fetched")
+
+    def _build_strategy(self, strategy: StrategyInput) -> Strategy:
+        """Strategy instance for a strategy input."""
+        position_params = self._initialize_position_parameters(strategy)
+        
+        # Construct rule strings
+        entry_rules = construct_rule_string(strategy.entryRules)
+        exit_rules = construct_rule_string(strategy.exitRules)
+        entry_regime_rules = construct_rule_string(strategy.entryRegimeRules) if strategy.entryRegimeRules else None
+        exit_regime_rules = construct_rule_string(strategy.exitRegimeRules) if strategy.exitRegimeRules else None
+        
+        return Strategy(
+            name=strategy.name,
+            entry_rules=entry_rules,
+            exit_rules=exit_rules,
+            entry_regime_rules=entry_regime_rules,
+            exit_regime_rules=exit_regime_rules,
+            position_type=strategy.positionType,
+            active=strategy.active,
+            regime_entry_action=strategy.regimeEntryAction,
+            regime_exit_action=strategy.regimeExitAction,
+            regime_asset=strategy.regimeAsset,
+            position_size_method=strategy.position_size_method,
+            fixed_position_size=position_params['fixed_position_size'],
+            volatility_target=position_params['volatility_target'],
+            volatility_lookback=strategy.volatility_lookback,
+            volatility_buffer=strategy.volatility_buffer,
+            max_leverage=strategy.max_leverage,
+            frequency=strategy.frequency
+        )
+
+    async def process_single_strategy(self, strategy: StrategyInput, df: pd.DataFrame, data_dict: Dict[str, pd.DataFrame],
+                                      signals: Optional[pd.Series] = None) -> Tuple:
         try:
-            # Initialize strategy parameters first
-            position_params = self._initialize_position_parameters(strategy)
-            
-            # Construct rule strings
-            entry_rules = construct_rule_string(strategy.entryRules)
-            exit_rules = construct_rule_string(strategy.exitRules)
-            entry_regime_rules = construct_rule_string(strategy.entryRegimeRules) if strategy.entryRegimeRules else None
-            exit_regime_rules = construct_rule_string(strategy.exitRegimeRules) if strategy.exitRegimeRules else None
-            
             # Create strategy instance
-            strategy_instance = Strategy(
-                name=strategy.name,
-                entry_rules=entry_rules,
-                exit_rules=exit_rules,
-                entry_regime_rules=entry_regime_rules,
-                exit_regime_rules=exit_regime_rules,
-                position_type=strategy.positionType,
-                active=strategy.active,
-                regime_entry_action=strategy.regimeEntryAction,
-                regime_exit_action=strategy.regimeExitAction,
-                regime_asset=strategy.regimeAsset,
-                position_size_method=strategy.position_size_method,
-                fixed_position_size=position_params['fixed_position_size'],
-                volatility_target=position_params['volatility_target'],
-                volatility_lookback=strategy.volatility_lookback,
-                volatility_buffer=strategy.volatility_buffer,
-                max_leverage=strategy.max_leverage,
-                frequency=strategy.frequency
-            )
+            with span('parse'):
+                strategy_instance = self._build_strategy(strategy)
             
-            # Get regime data if needed
-            regime_df = None
-            if strategy.regimeAsset and (strategy.entryRegimeRules or strategy.exitRegimeRules):
-                regime_key = f"regime_{strategy.regimeAsset}"
-                regime_df = data_dict.get(regime_key)
-                if regime_df is None:
-                    raise ValueError(f"No data found for regime asset: {strategy.regimeAsset}")
+            regime_df = self._regime_data(strategy, data_dict)
             
-            # Run backtest
-            df_result = run_backtest(df.copy(), strategy_instance, self.fees, self.slippage, regime_df)
+            self._check_history(strategy_instance, df)
+
+            regime_alignment = None
+            if regime_df is not None and signals is None:
+                regime_alignment = self.regime_alignments.get((strategy.regimeAsset, strategy.frequency))
+                if regime_alignment is None or not regime_alignment.matches(regime_df.index, df.index):
+                    regime_alignment = RegimeAlignment(regime_df.index, df.index)
+                    self.regime_alignments[(strategy.regimeAsset, strategy.frequency)] = regime_alignment
+
+            # Run backtest; df is only read, so every strategy shares the same frame
+            profile = EvaluationProfile() if self.profile else None
+            result = backtest_strategy(df, strategy_instance, self.fees, self.slippage, regime_df, profile=profile, signals=signals,
+                                       regime_alignment=regime_alignment)
+            if profile is not None:
+                self.profiles[strategy.name] = profile
             
-            return df_result, strategy_instance, df_result.copy()
+            return result, strategy_instance, result
             
         except Exception as e:
             logger.error(f"Error processing strategy {strategy.name}: {str(e)}")
@@ -238,4 +327,5 @@ Right Value: {rule.rightValue}
                 'volatility_target': strategy.volatility_target * strategy.allocation / 100
             }
         else:
-            raise ValueError(f"Strategy '{strategy.name}' has unknown position_size_method: {strategy.position_size_method}")
\ No newline at end of file
+            raise ValueError(f"Strategy '{strategy.name}' has unknown position_size_method: {strategy.position_size_method}")
+
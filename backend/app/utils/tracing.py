@@ -0,0 +1,154 @@
+# app/utils/tracing.py
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus exposes them."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Process-wide stage latency histograms and event counters, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def render(self, prefix: str = 'quantifi') -> str:
+        """Histograms as {prefix}_stage_duration_seconds{stage=...} and counters as {prefix}_events_total{event=...}."""
+        with self._lock:
+            lines = [f'# HELP {prefix}_stage_duration_seconds Wall time of each request stage.',
+                     f'# TYPE {prefix}_stage_duration_seconds histogram']
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                    lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum!r}')
+                lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+            lines += [f'# HELP {prefix}_events_total Cache hits and misses and other counted events.',
+                      f'# TYPE {prefix}_events_total counter']
+            lines += [f'{prefix}_events_total{{event="{name}"}} {count}' for name, count in sorted(self.counters.items())]
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+
+
+@dataclass
+class Span:
+    name: str
+    start: float  # seconds since the start of the trace
+    duration: float = 0.0
+    depth: int = 0  # number of enclosing spans
+
+
+@dataclass
+class Trace:
+    """Spans and event counts of one request, in the order the spans started."""
+    name: str
+    spans: List[Span] = field(default_factory=list)
+    counters: Dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+    _depth: int = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Total time, time per stage (spans of the same name summed; nested spans are included in their parents), spans and counters."""
+        stages: Dict[str, float] = {}
+        for span in self.spans:
+            stages[span.name] = stages.get(span.name, 0.0) + span.duration
+        return {
+            'total_time': self.elapsed,
+            'stages': stages,
+            'spans': [{'name': span.name, 'start': span.start, 'duration': span.duration, 'depth': span.depth}
+                      for span in self.spans],
+            'counters': dict(self.counters),
+        }
+
+
+_CURRENT_TRACE: ContextVar[Optional[Trace]] = ContextVar('trace', default=None)
+
+
+@contextmanager
+def trace_request(name: str) -> Iterator[Trace]:
+    """Collect the spans and counts of the enclosed code in a new Trace; its total time is observed as stage name."""
+    trace = Trace(name)
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT_TRACE.reset(token)
+        METRICS.observe(name, trace.elapsed)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time the enclosed code as stage name: observed in the process-wide histogram and,
+    inside trace_request, recorded in the request's trace. Costs two clock reads.
+    """
+    trace = _CURRENT_TRACE.get()
+    start = time.perf_counter()
+    record = None
+    if trace is not None:
+        record = Span(name, start - trace.started, depth=trace._depth)
+        trace.spans.append(record)
+        trace._depth += 1
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        METRICS.observe(name, elapsed)
+        if record is not None:
+            record.duration = elapsed
+            trace._depth -= 1
+
+
+def count(event: str, amount: int = 1):
+    """Count an event, such as a cache hit, process-wide and in the current trace."""
+    METRICS.increment(event, amount)
+    trace = _CURRENT_TRACE.get()
+    if trace is not None:
+        trace.counters[event] = trace.counters.get(event, 0) + amount
@@ -0,0 +1,46 @@
+# benchmarks/parameter_search.py
+
+import asyncio
+import os
+import time
+import numpy as np
+import pandas as pd
+from app.models.backtest import StrategyInput
+from app.services.optimization.optimizer import ParameterOptimizer, candidate_strategies, parameter_sets
+
+
+def sma(window: int) -> dict:
+    return {'type': 'simple', 'name': 'SMA', 'params': {'series': 'Close', 'window': window}}
+
+
+if __name__ == "__main__":
+    # Wall time of the same search with growing worker counts
+    n_rows = 20_000
+    rng = np.random.default_rng(0)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 1e-3, n_rows)))
+    df = pd.DataFrame({'Open': close, 'High': close * 1.001, 'Low': close * 0.999, 'Close': close, 'Volume': 1.0},
+                      index=pd.date_range('2020-01-01', periods=n_rows, freq='h'))
+
+    template = StrategyInput(name='SMA Cross', allocation=100, positionType='long', frequency='1h',
+                             position_size_method='fixed', fixed_position_size=1,
+                             entryRules=[{'leftIndicator': sma(10), 'operator': '>', 'rightIndicator': sma(100)}],
+                             exitRules=[{'leftIndicator': sma(10), 'operator': '<', 'rightIndicator': sma(100)}])
+    parameters = {'entryRules.0.leftIndicator.params.window': list(range(5, 85, 5)),
+                  'entryRules.0.rightIndicator.params.window': list(range(50, 450, 50))}
+    sets = parameter_sets(parameters)
+    for params in sets:
+        # The exit rule crosses back over the same averages
+        params['exitRules.0.leftIndicator.params.window'] = params['entryRules.0.leftIndicator.params.window']
+        params['exitRules.0.rightIndicator.params.window'] = params['entryRules.0.rightIndicator.params.window']
+    candidates = candidate_strategies(template, sets)
+
+    for max_workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        optimizer = ParameterOptimizer({'1h': df}, fees=0.1, slippage=0.05, max_workers=max_workers)
+        start = time.perf_counter()
+        ranked = asyncio.run(optimizer.optimize(candidates, sets))
+        print(f"{len(sets)} parameter sets, {max_workers} workers: {time.perf_counter() - start:.2f} s")
+    start = time.perf_counter()
+    asyncio.run(optimizer.optimize(candidates, sets, successive_halving=True))
+    print(f"with successive halving: {time.perf_counter() - start:.2f} s")
+    print(pd.DataFrame([{**evaluation.params, 'Sharpe Ratio': evaluation.metrics.get('Sharpe Ratio')}
+                        for evaluation in ranked[:5]]))
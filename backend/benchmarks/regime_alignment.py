@@ -0,0 +1,20 @@
+# benchmarks/regime_alignment.py
+
+import time
+import numpy as np
+import pandas as pd
+from app.services.strategy_module.signals import RegimeAlignment
+
+if __name__ == "__main__":
+    # A 1m timeline on a daily regime, against the reindex the alignment replaces
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2021-01-01 00:00:30', periods=3 * 525_600, freq='min')
+    regime_index = pd.date_range('2021-01-02', periods=1100, freq='D')
+    regime_signal = rng.random(len(regime_index)) < 0.5
+    start = time.perf_counter()
+    pd.Series(regime_signal, index=regime_index).reindex(index, method='ffill').fillna(False)
+    reindexed = time.perf_counter() - start
+    start = time.perf_counter()
+    RegimeAlignment(regime_index, index).align(regime_signal)
+    taken = time.perf_counter() - start
+    print(f"reindex {reindexed * 1e3:.0f} ms, alignment {taken * 1e3:.1f} ms")
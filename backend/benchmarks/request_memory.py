@@ -0,0 +1,44 @@
+# benchmarks/request_memory.py
+
+import asyncio
+import tracemalloc
+import numpy as np
+import pandas as pd
+from app.models.backtest import StrategyInput
+from app.services.strategy_module.indicator_cache import INDICATOR_CACHE
+from app.services.strategy_service.strategy import StrategyService
+
+
+def sma_rule(fast: int, slow: int, operator: str) -> dict:
+    sma = lambda window: {'type': 'simple', 'name': 'SMA', 'params': {'series': 'Close', 'window': window}}
+    return {'leftIndicator': sma(fast), 'operator': operator, 'useRightIndicator': True, 'rightIndicator': sma(slow),
+            'logicalOperator': 'and'}
+
+
+if __name__ == "__main__":
+    # Memory allocated while processing a request on top of its data, against the size of its outputs
+    # (tracemalloc, which sees NumPy allocations), for growing strategy counts
+    n_rows = 500_000
+    rng = np.random.default_rng(0)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 1e-3, n_rows)))
+    df = pd.DataFrame({'Open': close, 'High': close * 1.001, 'Low': close * 0.999, 'Close': close, 'Volume': 1.0},
+                      index=pd.date_range('2020-01-01', periods=n_rows, freq='min'))
+    raw_bytes = df.memory_usage(index=True).sum()
+
+    for n_strategies in (1, 4, 16):
+        strategies = [StrategyInput(name=f'S{k}', allocation=100 / n_strategies, positionType='long', frequency='1m',
+                                    position_size_method='fixed', fixed_position_size=100,
+                                    entryRules=[sma_rule(10 + k, 100 + 10 * k, '>')], exitRules=[sma_rule(10 + k, 100 + 10 * k, '<')])
+                      for k in range(n_strategies)]
+        service = StrategyService(strategies, fees=0.1, slippage=0.05)
+        INDICATOR_CACHE.clear()
+        tracemalloc.start()
+        results, _, _ = asyncio.run(service.process_strategies({'1m': df}))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # Outputs are the result arrays plus the indicators kept in the cache
+        output_bytes = INDICATOR_CACHE.nbytes + sum(
+            array.nbytes for result in results
+            for array in (result.signal, result.position_size, result.position, result.returns, result.log_returns))
+        print(f"{n_strategies:>2} strategies: peak {peak / 2**20:6.0f} MiB above the data ({raw_bytes / 2**20:.0f} MiB), "
+              f"outputs {output_bytes / 2**20:.0f} MiB, peak / outputs {peak / output_bytes:.2f}")
@@ -0,0 +1,14 @@
+# benchmarks/rule_parsing.py
+
+import time
+from app.services.strategy_module.expressions import parse_rule
+
+if __name__ == "__main__":
+    # Parsing time should grow linearly with the number of clauses
+    clause = "SMA(Close,{w}) > max(EMA(Close,{w}), shift(High,1))"
+    for n_clauses in [10, 100, 1000, 10000]:
+        rule_str = ' and '.join(clause.format(w=5 + i % 50) for i in range(n_clauses))
+        start = time.perf_counter()
+        parse_rule(rule_str)
+        elapsed = time.perf_counter() - start
+        print(f"{n_clauses:>6} clauses, {len(rule_str):>8} chars: {elapsed * 1000:8.2f} ms ({elapsed / n_clauses * 1e6:.1f} us/clause)")
@@ -0,0 +1,30 @@
+# benchmarks/streaming_indicators.py
+
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from app.services.strategy_module.indicators import SMA, EMA, rolling_high, rolling_low
+from app.services.strategy_module.streaming import StreamingEMA, StreamingRollingHigh, StreamingRollingLow, StreamingSMA
+
+if __name__ == "__main__":
+    n_rows = 200_000
+    rng = np.random.default_rng(0)
+    close = pd.Series(30000 * np.exp(np.cumsum(rng.normal(0, 1e-3, n_rows))),
+                      index=pd.date_range('2020-01-01', periods=n_rows, freq='min'))
+    history, fresh = close.iloc[:-1000], close.iloc[-1000:]
+
+    for name, batch, streaming in [
+        ('SMA', SMA, StreamingSMA),
+        ('EMA', EMA, StreamingEMA),
+        ('Rolling_High', rolling_high, StreamingRollingHigh),
+        ('Rolling_Low', rolling_low, StreamingRollingLow),
+    ]:
+        indicator = streaming(50)
+        indicator.update_many(history)
+        start = perf_counter()
+        indicator.update_many(fresh)
+        per_bar = (perf_counter() - start) / len(fresh)
+        start = perf_counter()
+        batch(close, 50)
+        recompute = perf_counter() - start
+        print(f"{name:<13} {per_bar * 1e6:.1f} us/bar vs {recompute * 1e3:.1f} ms batch recompute")
@@ -0,0 +1,23 @@
+# benchmarks/volatility_estimate.py
+
+import time
+import numpy as np
+import pandas as pd
+from app.services.strategy_module.indicator_cache import INDICATOR_CACHE
+from app.services.strategy_module.streaming import StreamingVolatility
+from app.services.strategy_module.volatility import periods_per_year, volatility_estimate
+
+if __name__ == "__main__":
+    n_rows = 200_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'Close': 30000 * np.exp(np.cumsum(rng.normal(0, 1e-3, n_rows)))},
+                      index=pd.date_range('2020-01-01', periods=n_rows, freq='5min'))
+    for cache in (None, INDICATOR_CACHE, INDICATOR_CACHE):
+        start = time.perf_counter()
+        volatility_estimate(df, 30, '5m', cache=cache)
+        print(f"volatility_estimate {'cached' if cache else 'uncached'}: {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    streaming = StreamingVolatility(30, periods_per_year('5m'))
+    start = time.perf_counter()
+    streaming.update_many(df['Close'])
+    print(f"StreamingVolatility: {(time.perf_counter() - start) / n_rows * 1e6:.1f} us/bar")
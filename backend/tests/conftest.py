@@ -0,0 +1,23 @@
+# tests/conftest.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def price_frame(n_rows: int = 2000, freq: str = 'h', seed: int = 0) -> pd.DataFrame:
+    """OHLCV bars of a random walk."""
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 1e-2, n_rows)))
+    return pd.DataFrame({'Open': close, 'High': close * 1.001, 'Low': close * 0.999, 'Close': close, 'Volume': 1.0},
+                        index=pd.date_range('2020-01-01', periods=n_rows, freq=freq))
+
+
+def sma(window: int) -> dict:
+    """An SMA of Close as a strategy input indicator."""
+    return {'type': 'simple', 'name': 'SMA', 'params': {'series': 'Close', 'window': window}}
+
+
+@pytest.fixture
+def prices() -> pd.DataFrame:
+    return price_frame()
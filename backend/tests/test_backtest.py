@@ -0,0 +1,84 @@
+# tests/test_backtest.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.backtest.metrics import rolling_sharpe_ratio
+from app.services.backtest.result import BacktestResult
+from app.services.backtest.run_backtest import backtest_positions, backtest_strategies, run_backtest
+from app.services.strategy_module.strategy import Strategy
+from app.services.strategy_module.utils import generate_batch_signals
+
+
+@pytest.fixture
+def strategies():
+    return [
+        Strategy(name='Long', entry_rules='SMA(Close, 10) > SMA(Close, 50)', exit_rules='SMA(Close, 10) < SMA(Close, 50)',
+                 position_type='long', fixed_position_size=1.0, frequency='1h'),
+        Strategy(name='Short', entry_rules='Close < Rolling_Low(Close, 20)', exit_rules='Close > SMA(Close, 20)',
+                 position_type='short', fixed_position_size=0.5, frequency='1h'),
+        Strategy(name='Vol', entry_rules='EMA(Close, 20) > SMA(Close, 100)', exit_rules='EMA(Close, 20) < SMA(Close, 100)',
+                 position_type='long', position_size_method='volatility_target', volatility_target=0.5,
+                 volatility_lookback=30, max_leverage=2.0, frequency='1h'),
+    ]
+
+
+def test_kernel_matches_the_pandas_formulas(prices):
+    rng = np.random.default_rng(3)
+    close = prices['Close']
+    signals = np.repeat(rng.choice([-1.0, 0.0, 1.0], size=(len(prices) // 40, 3)), 40, axis=0)
+    position_sizes = rng.uniform(0.5, 2, signals.shape)
+    fees, slippage = 0.001, 0.0005
+    results = backtest_positions(prices.index, close.to_numpy(), ['A', 'B', 'C'], signals, position_sizes, fees, slippage)
+
+    market_returns = close.pct_change()
+    market_log_returns = np.log(close / close.shift())
+    for j, result in enumerate(results):
+        # The per-strategy columns run_backtest computed with pandas before the kernel
+        signal = pd.Series(signals[:, j], index=prices.index)
+        position = signal.shift() * pd.Series(position_sizes[:, j], index=prices.index)
+        costs = position.diff().abs() * (fees + slippage)
+        returns = position.shift() * market_returns - costs
+        log_returns = position.shift() * market_log_returns - costs
+        equity = (1 + returns).cumprod()
+        expected = {
+            'position': position,
+            'returns': returns,
+            'log_returns': log_returns,
+            'cumulative_equity': equity,
+            'cumulative_returns': equity - 1,
+            'cumulative_log_equity': log_returns.cumsum(),
+            'drawdown': 1 - equity / equity.cummax(),
+            'rolling_sharpe': rolling_sharpe_ratio(returns, 90),
+        }
+        for column, values in expected.items():
+            np.testing.assert_allclose(getattr(result, column), values.to_numpy(), rtol=1e-12, atol=1e-15, err_msg=column)
+        np.testing.assert_allclose(result.market_returns, market_returns.to_numpy(), rtol=1e-12)
+        np.testing.assert_allclose(result.market_log_returns, market_log_returns.to_numpy(), rtol=1e-12)
+
+
+def test_batch_backtest_matches_run_backtest(prices, strategies):
+    signals = generate_batch_signals(prices, strategies, frequency='1h')
+    results = backtest_strategies(prices, strategies, signals, fees=0.1, slippage=0.05)
+    for strategy, result in zip(strategies, results):
+        expected = run_backtest(prices.copy(), strategy, fees=0.1, slippage=0.05)
+        assert result.name == strategy.name
+        for column, values in result.columns().items():
+            np.testing.assert_allclose(values(), expected[column].to_numpy(dtype=float), rtol=1e-12, err_msg=column)
+
+
+def test_kernel_columns_match_lazy_results(prices):
+    rng = np.random.default_rng(0)
+    n_rows, n_strategies = len(prices), 5
+    close = prices['Close'].to_numpy()
+    signals = np.repeat(rng.choice([-1.0, 0.0, 1.0], size=(n_rows // 50, n_strategies)), 50, axis=0)
+    position_sizes = rng.uniform(0.5, 2, (n_rows, n_strategies))
+    results = backtest_positions(prices.index, close, [f'S{j}' for j in range(n_strategies)], signals, position_sizes, 0.001, 0.0005)
+    for j, result in enumerate(results):
+        # A result of the column alone, whose derived series are computed on first access
+        alone, = backtest_positions(prices.index, close, [result.name], signals[:, j:j + 1], position_sizes[:, j:j + 1], 0.001, 0.0005)
+        lazy = BacktestResult(name=result.name, index=prices.index, close=close, signal=alone.signal,
+                              position_size=alone.position_size, position=alone.position, returns=alone.returns,
+                              log_returns=alone.log_returns)
+        for column, values in result.columns().items():
+            np.testing.assert_allclose(values(), lazy.columns()[column](), rtol=1e-12, err_msg=column)
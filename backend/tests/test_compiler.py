@@ -0,0 +1,37 @@
+# tests/test_compiler.py
+
+import numpy as np
+import pytest
+from app.services.strategy_module.compiler import PlanEvaluator, compile_rules
+from app.services.strategy_module.expressions import parse_rule
+from conftest import price_frame
+
+RULES = [
+    "Close > SMA(Close, 20) and Close > 25000 and Volume > 0.5 or SMA(Close, 20) < 20000",
+    "EMA(Close, 10) > SMA(Close, 50) or (Close < Rolling_Low(Close, 30) and High > shift(Close, 1))",
+    "max(Close, Open) >= min(High, 30000) and RSI(Close, 14) < 70",
+]
+
+
+@pytest.fixture
+def df():
+    df = price_frame(3000)
+    df['Volume'] = np.random.default_rng(1).uniform(0, 1, len(df))
+    return df
+
+
+@pytest.mark.parametrize('rule_str', RULES)
+def test_plan_matches_rule_evaluation(df, rule_str):
+    rule = parse_rule(rule_str)
+    expected = np.asarray(rule.evaluate(df), dtype=bool)
+    plan = compile_rules({'rule': rule})
+    for evaluator in (PlanEvaluator(plan, df, fused=False), PlanEvaluator(plan, df),
+                      PlanEvaluator(plan, df, chunk_size=256), PlanEvaluator(plan, df, chunk_size=1)):
+        np.testing.assert_array_equal(evaluator.evaluate('rule'), expected)
+
+
+def test_common_subexpressions_are_shared():
+    plan = compile_rules({'entry': parse_rule("SMA(Close, 20) > SMA(Close, 50)"),
+                          'exit': parse_rule("SMA(Close,20) < SMA( Close , 50 )")})
+    assert len(plan.indicator_nodes()) == 2
+    assert plan.nodes[plan.roots['entry']].args == plan.nodes[plan.roots['exit']].args
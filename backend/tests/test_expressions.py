@@ -0,0 +1,74 @@
+# tests/test_expressions.py
+
+from itertools import product
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.strategy_module.expressions import (
+    CompositeIndicator, CompositeRule, Indicator, Rule, parse_indicator, parse_rule
+)
+
+
+@pytest.fixture
+def truth_table() -> pd.DataFrame:
+    # Every combination of three conditions A > 0, B > 0 and C > 0
+    rows = np.array(list(product([-1.0, 1.0], repeat=3)))
+    return pd.DataFrame(rows, columns=['Open', 'High', 'Low'])
+
+
+def conditions(df: pd.DataFrame):
+    return df['Open'].to_numpy() > 0, df['High'].to_numpy() > 0, df['Low'].to_numpy() > 0
+
+
+def depth(rule) -> int:
+    if isinstance(rule, Rule):
+        return 0
+    if rule.next_rule is None:
+        return depth(rule.rule)
+    return 1 + max(depth(rule.rule), depth(rule.next_rule))
+
+
+def test_and_binds_tighter_than_or(truth_table):
+    a, b, c = conditions(truth_table)
+    np.testing.assert_array_equal(parse_rule("Open > 0 and High > 0 or Low > 0").evaluate(truth_table), (a & b) | c)
+    np.testing.assert_array_equal(parse_rule("Open > 0 or High > 0 and Low > 0").evaluate(truth_table), a | (b & c))
+
+
+def test_parentheses_group_sub_rules(truth_table):
+    a, b, c = conditions(truth_table)
+    np.testing.assert_array_equal(parse_rule("Open > 0 and (High > 0 or Low > 0)").evaluate(truth_table), a & (b | c))
+    np.testing.assert_array_equal(parse_rule("((Open > 0) or High > 0) and Low > 0").evaluate(truth_table), (a | b) & c)
+
+
+def test_long_chains_are_balanced(truth_table):
+    rule = parse_rule(' and '.join(["Open > 0"] * 1000))
+    assert depth(rule) <= 10
+    a, _, _ = conditions(truth_table)
+    np.testing.assert_array_equal(rule.evaluate(truth_table), a)
+
+
+def test_comparisons_and_arguments():
+    rule = parse_rule("SMA(Close, 20) >= shift(Close,-1)")
+    assert isinstance(rule, CompositeRule) and rule.logic is None
+    assert rule.rule.operator == '>='
+    assert rule.rule.left == Indicator('SMA', ('Close', 20))
+    assert rule.rule.right == CompositeIndicator('shift', (Indicator('Close'), -1.0))
+    assert parse_rule("Close < -1.5e2").rule.right == -150.0
+    # The series of a series indicator may come after its parameters and defaults to Close
+    assert parse_indicator("SMA(20, High)") == Indicator('SMA', ('High', 20))
+    assert parse_indicator("SMA(20)") == Indicator('SMA', ('Close', 20))
+
+
+@pytest.mark.parametrize('rule_str', [
+    "Close >",
+    "Close > 1 and",
+    "(Close > 1",
+    "Close > 1)",
+    "Close > 1 > 2",
+    "Close and High > 1",
+    "Close $ 1",
+    "SMA(Close, 20, 30) > 1",
+])
+def test_invalid_rules_raise(rule_str):
+    with pytest.raises(ValueError):
+        parse_rule(rule_str)
@@ -0,0 +1,37 @@
+# tests/test_grid.py
+
+import numpy as np
+from app.services.backtest.run_backtest import backtest_strategy
+from app.services.strategy_module.grid import evaluate_grid, parameter_grid
+from app.services.strategy_module.strategy import Strategy
+from conftest import price_frame
+
+ENTRY = 'SMA(Close,{fast}) > SMA(Close,{slow})'
+EXIT = 'SMA(Close,{fast}) < SMA(Close,{slow})'
+GRID = {'fast': [5, 10, 20], 'slow': [30, 60]}
+
+
+def test_parameter_grid_applies_the_constraint():
+    combinations = parameter_grid({'fast': [5, 50], 'slow': [20, 40]}, constraint=lambda p: p['fast'] < p['slow'])
+    assert combinations == [{'fast': 5, 'slow': 20}, {'fast': 5, 'slow': 40}]
+
+
+def test_grid_columns_match_single_backtests():
+    df = price_frame(2000)
+    result = evaluate_grid(df, ENTRY, EXIT, GRID, position_type='short', fees=0.1, slippage=0.05)
+    for k, params in enumerate(result.params):
+        strategy = Strategy(name='S', entry_rules=ENTRY.format(**params), exit_rules=EXIT.format(**params),
+                            position_type='short', fixed_position_size=1.0)
+        expected = backtest_strategy(df, strategy, fees=0.1, slippage=0.05)
+        np.testing.assert_array_equal(result.signals[:, k], expected.signal)
+        np.testing.assert_array_equal(result.positions[:, k], expected.position)
+        np.testing.assert_allclose(result.returns[:, k], expected.returns, rtol=1e-12, equal_nan=True)
+
+
+def test_batches_match_a_single_pass():
+    df = price_frame(1000)
+    whole = evaluate_grid(df, ENTRY, EXIT, GRID)
+    batched = evaluate_grid(df, ENTRY, EXIT, GRID, batch_size=4)
+    assert batched.params == whole.params
+    np.testing.assert_array_equal(batched.signals, whole.signals)
+    np.testing.assert_array_equal(batched.returns, whole.returns)
@@ -0,0 +1,82 @@
+# tests/test_indicator_cache.py
+
+import numpy as np
+from app.services.strategy_module import indicator_cache
+from app.services.strategy_module.expressions import indicator_cache_key, parse_rule
+from app.services.strategy_module.indicator_cache import DataFingerprint, IndicatorCache
+from conftest import price_frame
+
+
+def values(n: int) -> np.ndarray:
+    return np.arange(n, dtype=float)
+
+
+def test_least_recently_used_arrays_are_evicted_within_the_budget():
+    cache = IndicatorCache(max_bytes=3 * 80)
+    for key in 'abc':
+        cache.put(key, values(10))
+    assert cache.get('a') is not None  # 'b' is now the least recently used
+    cache.put('d', values(10))
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in 'acd')
+    # A larger array evicts as many of the oldest entries as needed
+    cache.put('e', values(20))
+    assert [key for key in 'acde' if cache.get(key) is not None] == ['d', 'e']
+    stats = cache.stats()
+    assert stats['evictions'] == 3
+    assert stats['size'] == 2 and stats['bytes'] == 240 == cache.nbytes
+
+
+def test_arrays_larger_than_the_budget_are_not_stored():
+    cache = IndicatorCache(max_bytes=80)
+    array = values(11)
+    assert cache.put('big', array) is array and array.flags.writeable
+    assert cache.get('big') is None
+    assert cache.stats()['size'] == 0 and cache.nbytes == 0
+
+
+def test_stored_arrays_are_read_only_copies_and_hit_rate():
+    cache = IndicatorCache()
+    array = values(5)
+    stored = cache.get_or_create('a', lambda: array)
+    assert stored is not array and not stored.flags.writeable
+    array[0] = 100
+    assert cache.get_or_create('a', lambda: values(1)) is stored and stored[0] == 0
+    cache.get('a')
+    cache.get('missing')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 2)
+    assert stats['hit_rate'] == 0.5
+    cache.clear()
+    assert cache.stats()['hit_rate'] == 0.0 and cache.stats()['size'] == 0
+
+
+def test_keys_change_only_with_the_columns_read():
+    df = price_frame()
+    key = indicator_cache_key(DataFingerprint(df), 'SMA(Close, 20)')
+    assert indicator_cache_key(DataFingerprint(df.copy()), 'SMA(Close, 20)') == key
+    assert indicator_cache_key(DataFingerprint(df), 'SMA(Close, 30)') != key
+
+    unread = df.copy()
+    unread['High'] *= 2
+    assert indicator_cache_key(DataFingerprint(unread), 'SMA(Close, 20)') == key
+
+    read = df.copy()
+    read.iloc[100, read.columns.get_loc('Close')] += 1
+    assert indicator_cache_key(DataFingerprint(read), 'SMA(Close, 20)') != key
+
+    shifted = df.copy()
+    shifted.index = shifted.index + np.timedelta64(1, 'h')
+    assert indicator_cache_key(DataFingerprint(shifted), 'SMA(Close, 20)') != key
+    # Frame indicators read their columns without naming them
+    assert indicator_cache_key(DataFingerprint(unread), 'ATR(14)') != indicator_cache_key(DataFingerprint(df), 'ATR(14)')
+
+
+def test_rule_evaluation_hashes_the_frame_once(monkeypatch):
+    hashed = []
+    hash_values = indicator_cache._hash_values
+    monkeypatch.setattr(indicator_cache, '_hash_values', lambda values: hashed.append(values.name) or hash_values(values))
+    rule = parse_rule("SMA(Close, 5) > SMA(Close, 10) and EMA(Close, 3) > Rolling_Low(Close, 7) or RSI(Close, 14) < 30")
+    rule.evaluate(price_frame())
+    # The index and Close, whatever the number of indicators
+    assert len(hashed) == 2
@@ -0,0 +1,63 @@
+# tests/test_kernels.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.strategy_module.indicators import (
+    ATR, MACD, MACD_signal, RSI, SMA, bollinger_lower, bollinger_upper, rolling_high, rolling_low, z_score
+)
+from app.services.strategy_module.kernels import WINDOW_KERNELS
+from conftest import price_frame
+
+WINDOWS = [1, 2, 5, 14, 50, 200]
+
+
+@pytest.mark.parametrize('name, batch', [('SMA', SMA), ('Rolling_High', rolling_high), ('Rolling_Low', rolling_low)])
+def test_window_kernels_match_the_indicators(name, batch):
+    close = price_frame(3000)['Close']
+    close.iloc[[100, 101, 1500]] = np.nan
+    result = WINDOW_KERNELS[name](close.to_numpy(), WINDOWS, lag=1)
+    assert result.shape == (len(close), len(WINDOWS))
+    for k, window in enumerate(WINDOWS):
+        np.testing.assert_allclose(result[:, k], batch(close, window).to_numpy(), rtol=1e-9)
+
+
+def test_window_kernels_keep_constant_windows_exact():
+    values = np.r_[np.full(30, 3.3), np.arange(30.0)]
+    np.testing.assert_array_equal(WINDOW_KERNELS['SMA'](values, [10])[9:30, 0], 3.3)
+
+
+def test_window_kernels_reject_empty_windows():
+    with pytest.raises(ValueError):
+        WINDOW_KERNELS['SMA'](np.arange(10.0), [5, 0])
+
+
+def wilder(values, window):
+    return values.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+
+
+def test_native_indicators_match_pandas():
+    df = price_frame(3000)
+    close = df['Close']
+    change = close.diff()
+    gain, loss = wilder(change.clip(lower=0), 14), wilder((-change).clip(lower=0), 14)
+    np.testing.assert_allclose(RSI(close, 14), (100 - 100 / (1 + gain / loss)).shift(), rtol=1e-9)
+
+    true_range = pd.concat([df['High'] - df['Low'], (df['High'] - close.shift()).abs(),
+                            (df['Low'] - close.shift()).abs()], axis=1).max(axis=1)
+    np.testing.assert_allclose(ATR(df, 14), wilder(true_range, 14).shift(), rtol=1e-9)
+
+    line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    np.testing.assert_allclose(MACD(close), line.shift(), rtol=1e-9)
+    np.testing.assert_allclose(MACD_signal(close), line.ewm(span=9, adjust=False).mean().shift(), rtol=1e-9)
+
+    mean, std = close.rolling(20).mean(), close.rolling(20).std(ddof=0)
+    np.testing.assert_allclose(bollinger_upper(close), (mean + 2 * std).shift(), rtol=1e-9)
+    np.testing.assert_allclose(bollinger_lower(close), (mean - 2 * std).shift(), rtol=1e-9)
+    np.testing.assert_allclose(z_score(close), ((close - mean) / std).shift(), rtol=1e-6)
+
+
+def test_native_indicators_on_flat_prices():
+    close = pd.Series(np.full(50, 100.0))
+    assert (RSI(close, 14).iloc[15:] == 50).all()
+    assert (z_score(close, 20).iloc[21:] == 0).all()
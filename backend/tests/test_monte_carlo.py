@@ -0,0 +1,53 @@
+# tests/test_monte_carlo.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.backtest.metrics import calculate_metrics
+from app.services.backtest.monte_carlo import monte_carlo_returns, monte_carlo_trades, simulate
+
+
+@pytest.fixture
+def returns() -> pd.Series:
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2016-01-01', periods=3000, freq='D')
+    return pd.Series(rng.normal(5e-4, 2e-2, len(index)), index=index)
+
+
+def test_path_metrics_match_calculate_metrics(returns):
+    # Every path is the backtest itself, so every percentile is the backtest's metric
+    identity = simulate(lambda n: np.tile(returns.to_numpy(), (n, 1)), len(returns), 2, 365)
+    metrics = calculate_metrics(returns, pd.Series(1.0, index=returns.index))
+    np.testing.assert_allclose(identity.max_drawdown, metrics['Max Drawdown'], rtol=1e-12)
+    np.testing.assert_allclose(identity.sharpe_ratio, metrics['Sharpe Ratio'], rtol=1e-12)
+    np.testing.assert_allclose(identity.total_return, metrics['Total Return'], rtol=1e-12)
+    np.testing.assert_allclose(identity.equity[0], (1 + returns).cumprod().to_numpy()[identity.points], rtol=1e-12)
+
+
+def test_results_do_not_depend_on_the_chunk_size(returns):
+    expected = monte_carlo_returns(returns, n_paths=300, seed=1)
+    chunked = monte_carlo_returns(returns, n_paths=300, seed=1, max_chunk_elements=7 * len(returns))
+    for field in ('equity', 'max_drawdown', 'sharpe_ratio', 'total_return'):
+        np.testing.assert_array_equal(getattr(chunked, field), getattr(expected, field))
+    assert expected.points.equals(returns.index[np.unique(np.linspace(0, len(returns) - 1, 500).round().astype(int))])
+
+
+def test_shuffled_trades_share_total_return_and_sharpe():
+    rng = np.random.default_rng(2)
+    trades = pd.DataFrame({'Entry Date': pd.date_range('2016-01-01', periods=300, freq='7D'),
+                           'Trade Return': rng.normal(0.01, 0.05, 300)})
+    result = monte_carlo_trades(trades, n_paths=500, seed=0)
+    np.testing.assert_allclose(result.total_return, np.prod(1 + trades['Trade Return']) - 1, rtol=1e-9)
+    np.testing.assert_allclose(result.sharpe_ratio, result.sharpe_ratio[0], rtol=1e-9)
+    assert result.max_drawdown[0] < result.max_drawdown[-1]
+    assert result.points[0] == 1 and result.points[-1] == 300
+    output = result.to_dict()
+    assert output['n_paths'] == 500 and len(output['equity']) == 300
+    assert list(output['max_drawdown']) == ['p5', 'p25', 'p50', 'p75', 'p95']
+
+
+def test_too_short_inputs_raise():
+    with pytest.raises(ValueError):
+        monte_carlo_returns(np.array([0.01]))
+    with pytest.raises(ValueError):
+        monte_carlo_trades(np.array([0.01, np.nan]))
@@ -0,0 +1,92 @@
+# tests/test_optimizer.py
+
+import asyncio
+import pytest
+from app.api.backtest import backtest
+from app.models.backtest import BacktestInput, StrategyInput
+from app.services.optimization.optimizer import ParameterOptimizer, candidate_strategies, parameter_sets, set_parameter
+from app.services.data.data_service import DataService
+from conftest import sma
+
+FAST = 'entryRules.0.leftIndicator.params.window'
+SLOW = 'entryRules.0.rightIndicator.params.window'
+
+
+@pytest.fixture
+def template() -> StrategyInput:
+    return StrategyInput(name='SMA Cross', allocation=100, positionType='long', frequency='1h',
+                         position_size_method='fixed', fixed_position_size=1,
+                         entryRules=[{'leftIndicator': sma(10), 'operator': '>', 'rightIndicator': sma(50)}],
+                         exitRules=[{'leftIndicator': sma(10), 'operator': '<', 'rightIndicator': sma(50)}])
+
+
+def crossing_sets(fast, slow):
+    sets = parameter_sets({FAST: fast, SLOW: slow})
+    for params in sets:
+        # The exit rule crosses back over the same averages
+        params['exitRules.0.leftIndicator.params.window'] = params[FAST]
+        params['exitRules.0.rightIndicator.params.window'] = params[SLOW]
+    return sets
+
+
+def test_parameter_sets():
+    parameters = {'a': [1, 2, 3], 'b': ['x', 'y']}
+    grid = parameter_sets(parameters)
+    assert grid == [{'a': a, 'b': b} for a in (1, 2, 3) for b in ('x', 'y')]
+    sampled = parameter_sets(parameters, 'random', n_samples=4, seed=0)
+    assert len(sampled) == 4 and all(params in grid for params in sampled)
+    assert len({tuple(params.items()) for params in sampled}) == 4
+    assert sorted(parameter_sets(parameters, 'random', n_samples=100, seed=0), key=str) == sorted(grid, key=str)
+    with pytest.raises(ValueError):
+        parameter_sets(parameters, 'bayesian')
+
+
+def test_set_parameter():
+    strategy = {'entryRules': [{'leftIndicator': {'params': {'window': 10}}}], 'allocation': 100}
+    set_parameter(strategy, 'entryRules.0.leftIndicator.params.window', 20)
+    set_parameter(strategy, 'entryRules.0.leftIndicator.params.series', 'High')
+    set_parameter(strategy, 'allocation', 50)
+    assert strategy == {'entryRules': [{'leftIndicator': {'params': {'window': 20, 'series': 'High'}}}], 'allocation': 50}
+    for path in ('entryRules.1.leftIndicator', 'entryRules.x', 'allocations', 'allocation.value'):
+        with pytest.raises(ValueError):
+            set_parameter(strategy, path, 1)
+
+
+def test_successive_halving_keeps_the_best_of_the_full_search(prices, template):
+    sets = crossing_sets([5, 10, 20], [30, 50, 100])
+    candidates = candidate_strategies(template, sets)
+    optimizer = ParameterOptimizer({'1h': prices}, fees=0.1, slippage=0.05, max_workers=2)
+    ranked = asyncio.run(optimizer.optimize(candidates, sets))
+    halved = asyncio.run(optimizer.optimize(candidates, sets, successive_halving=True, min_fraction=0.25))
+
+    assert all(evaluation.fraction == 1.0 for evaluation in ranked)
+    assert [evaluation.fraction for evaluation in halved].count(1.0) == 1
+    assert sorted(evaluation.fraction for evaluation in halved) == [0.25] * 6 + [0.75] * 2 + [1.0]
+    assert halved[0].params == ranked[0].params
+    assert halved[0].metrics == ranked[0].metrics
+
+
+def test_unknown_metric_raises(prices, template):
+    sets = crossing_sets([5], [30])
+    optimizer = ParameterOptimizer({'1h': prices}, fees=0.1, slippage=0.05, max_workers=1)
+    with pytest.raises(ValueError):
+        asyncio.run(optimizer.optimize(candidate_strategies(template, sets), sets, metric='Alpha'))
+
+
+def test_scores_match_the_backtest_endpoint(monkeypatch, prices, template):
+    sets = crossing_sets([5, 20], [50])
+    candidates = candidate_strategies(template, sets)
+    optimizer = ParameterOptimizer({'1h': prices}, fees=0.1, slippage=0.05, max_workers=1)
+    ranked = asyncio.run(optimizer.optimize(candidates, sets))
+
+    async def fetch_data(symbol, start, end, data_source, strategies):
+        return {'1h': prices}
+
+    monkeypatch.setattr(DataService, 'fetch_data', staticmethod(fetch_data))
+    for evaluation in ranked:
+        strategy = candidates[sets.index(evaluation.params)]
+        response = asyncio.run(backtest(BacktestInput(symbol='BTC-USD', data_source='Yahoo Finance', start='2020-01-01',
+                                                      end='2020-04-01', fees=0.1, slippage=0.05, strategies=[strategy])))
+        reported = response['metrics'][strategy.name]
+        for metric in ('Sharpe Ratio', 'Max Drawdown', 'Total Return', 'Sortino Ratio', 'Number of Trades'):
+            assert evaluation.metrics[metric] == pytest.approx(reported[metric], rel=1e-12), metric
@@ -0,0 +1,49 @@
+# tests/test_profiling.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.strategy_module.profiling import EvaluationProfile
+from app.services.strategy_module.strategy import Strategy
+from app.services.strategy_module.utils import profile_strategy
+
+
+@pytest.fixture
+def strategy() -> Strategy:
+    return Strategy(name='S', entry_rules='SMA(Close, 10) > SMA(Close, 50) and Close > 0',
+                    exit_rules='SMA(Close, 10) < SMA(Close, 50)', position_type='long', fixed_position_size=1.0, frequency='1h')
+
+
+def test_profile_records_every_node(prices, strategy):
+    profile = profile_strategy(prices, strategy)
+    nodes = {node['label']: node for node in profile.to_dict()['nodes']}
+    assert {'SMA(Close, 10)', 'SMA(Close, 50)', 'Close', 'mask ((SMA(Close, 10) > SMA(Close, 50)) and (Close > 0.0))',
+            'mask (SMA(Close, 10) < SMA(Close, 50))'} <= set(nodes)
+    for label in ('SMA(Close, 10)', 'SMA(Close, 50)'):
+        assert nodes[label]['kind'] == 'indicator'
+        assert nodes[label]['calls'] == 1 and nodes[label]['rows'] == len(prices)
+        assert nodes[label]['bytes_allocated'] == len(prices) * 8
+    assert nodes['Close']['kind'] == 'column' and nodes['Close']['bytes_allocated'] == 0
+    assert all(node['wall_time'] >= 0 and node['calls'] >= 1 and node['peak_bytes'] is None for node in nodes.values())
+    assert profile.total_time == pytest.approx(sum(node['wall_time'] for node in nodes.values()))
+    # Most expensive nodes first
+    times = [node['wall_time'] for node in profile.to_dict()['nodes']]
+    assert times == sorted(times, reverse=True)
+
+
+def test_profiled_signals_match_unprofiled(prices, strategy):
+    profile = EvaluationProfile(trace_memory=True)
+    profiled = strategy.generate_signals(prices, profile=profile)
+    pd.testing.assert_series_equal(profiled, strategy.generate_signals(prices))
+    assert np.any(profiled != 0)
+    assert all(node.calls == 1 and node.peak_bytes is not None and node.peak_bytes >= 0 for node in profile.nodes.values())
+
+
+def test_merged_profiles_add_up(prices, strategy):
+    first, second = profile_strategy(prices, strategy), profile_strategy(prices, strategy)
+    merged = EvaluationProfile()
+    merged.merge(first)
+    merged.merge(second)
+    for label, node in merged.nodes.items():
+        assert node.calls == first.nodes[label].calls + second.nodes[label].calls
+        assert node.wall_time == pytest.approx(first.nodes[label].wall_time + second.nodes[label].wall_time)
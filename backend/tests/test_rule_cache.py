@@ -0,0 +1,54 @@
+# tests/test_rule_cache.py
+
+import numpy as np
+from app.services.strategy_module.expressions import parse_rule
+from app.services.strategy_module.rule_cache import COMPILED_PLANS, RuleCache, cached_compile_rules, normalize_rule
+from conftest import price_frame
+
+VARIANTS = [
+    "SMA(Close, 17) > EMA(Close, 33) and Close > 25000",
+    "SMA(Close,17) > EMA(Close,33) and Close > 25000",
+    "  SMA( Close , 17 )  >  EMA(Close,\t33)\nand Close > 25000 ",
+]
+
+
+def test_whitespace_variants_share_one_key():
+    keys = {normalize_rule(rule) for rule in VARIANTS}
+    assert keys == {"SMA(Close,17) > EMA(Close,33) and Close > 25000"}
+    df = price_frame()
+    expected = np.asarray(parse_rule(VARIANTS[0]).evaluate(df), dtype=bool)
+    assert expected.any() and not expected.all()
+    for rule in VARIANTS + list(keys):
+        np.testing.assert_array_equal(np.asarray(parse_rule(rule).evaluate(df), dtype=bool), expected)
+
+
+def test_repeated_compilation_is_a_hit():
+    rules = {'entry': "SMA(Close, 19) > SMA(Close, 41)", 'exit': "SMA(Close, 19) < SMA(Close, 41)"}
+    before = COMPILED_PLANS.stats()
+    first_rules, first_plan = cached_compile_rules(rules)
+    rules_again, plan_again = cached_compile_rules({'entry': "SMA(Close,19) > SMA(Close,41)",
+                                                    'exit': " SMA(Close, 19) < SMA(Close, 41)"})
+    after = COMPILED_PLANS.stats()
+    assert plan_again is first_plan
+    assert rules_again['entry'] is first_rules['entry']
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RuleCache(maxsize=2)
+    created = []
+
+    def factory(value):
+        return lambda: created.append(value) or value
+
+    assert cache.get_or_create('a', factory('a')) == 'a'
+    assert cache.get_or_create('b', factory('b')) == 'b'
+    assert cache.get_or_create('a', factory('a')) == 'a'  # 'b' is now the least recently used
+    assert cache.get_or_create('c', factory('c')) == 'c'
+    assert cache.get_or_create('a', factory('a')) == 'a'
+    assert cache.get_or_create('b', factory('b')) == 'b'
+    assert created == ['a', 'b', 'c', 'b']
+    assert cache.stats() == {'hits': 2, 'misses': 4, 'size': 2, 'maxsize': 2, 'hit_rate': 2 / 6}
+    cache.clear()
+    assert cache.stats()['size'] == 0 and cache.stats()['hits'] == 0
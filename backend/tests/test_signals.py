@@ -0,0 +1,88 @@
+# tests/test_signals.py
+
+import numpy as np
+import pandas as pd
+from app.services.strategy_module.signals import (
+    RegimeAlignment, _latch_loop, apply_regime_filters, generate_signals_old, latch_positions
+)
+
+
+class Mask:
+    """Stands in for a parsed rule that evaluates to a fixed mask."""
+
+    def __init__(self, mask: np.ndarray):
+        self.mask = mask
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        return self.mask
+
+
+def random_cases(n_cases: int = 2000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_cases):
+        length = int(rng.integers(0, 60))
+        entry = rng.random(length) < rng.random()
+        exit = rng.random(length) < rng.random()
+        yield entry, exit, int(rng.choice([1, -1]))
+
+
+def test_latch_matches_the_bar_by_bar_loop():
+    for entry, exit, position_type in random_cases():
+        np.testing.assert_array_equal(latch_positions(entry, exit, position_type), _latch_loop(entry, exit, position_type),
+                                      err_msg=f"entry={entry.astype(int)}, exit={exit.astype(int)}")
+
+
+def test_latch_matches_generate_signals_old():
+    # The old loop lets an entry win over a same-bar exit and opens on the first bar,
+    # so it agrees with the latch whenever neither case occurs
+    compared = 0
+    for entry, exit, position_type in random_cases():
+        if not len(entry) or entry[0] or (entry & exit).any():
+            continue
+        df = pd.DataFrame(index=pd.RangeIndex(len(entry)))
+        old = generate_signals_old(df, Mask(entry), Mask(exit), position_type).to_numpy()
+        np.testing.assert_array_equal(latch_positions(entry, exit, position_type), old)
+        compared += 1
+    assert compared > 100
+
+
+def test_latch_columns_match_one_at_a_time():
+    rng = np.random.default_rng(1)
+    entry, exit = rng.random((500, 40)) < 0.1, rng.random((500, 40)) < 0.1
+    positions = latch_positions(entry, exit, -1)
+    for k in range(entry.shape[1]):
+        np.testing.assert_array_equal(positions[:, k], _latch_loop(entry[:, k], exit[:, k], -1))
+
+
+def test_latch_edge_cases():
+    assert latch_positions(np.array([], dtype=bool), np.array([], dtype=bool)).shape == (0,)
+    # The first bar is flat; an entry and an exit on the same bar flip the position
+    np.testing.assert_array_equal(latch_positions(np.array([1, 0, 1, 1, 0], dtype=bool), np.array([0, 0, 0, 1, 1], dtype=bool)),
+                                  [0, 0, 1, 0, 0])
+
+
+def reindexed(signal: np.ndarray, regime_index: pd.Index, index: pd.Index) -> np.ndarray:
+    return pd.Series(signal, index=regime_index).reindex(index, method='ffill').fillna(False).to_numpy(dtype=bool)
+
+
+def test_regime_alignment_matches_reindex():
+    rng = np.random.default_rng(2)
+    # Hourly bars from before the first daily regime bar, some of them on the regime timestamps
+    index = pd.date_range('2021-01-01 00:30', periods=2000, freq='30min')
+    regime_index = pd.date_range('2021-01-02', periods=40, freq='D')
+    alignment = RegimeAlignment(regime_index, index)
+    for _ in range(20):
+        signal = rng.random(len(regime_index)) < 0.5
+        np.testing.assert_array_equal(alignment.align(signal), reindexed(signal, regime_index, index))
+    assert not alignment.align(np.array([], dtype=bool)).any()
+    assert alignment.matches(regime_index.copy(), index) and not alignment.matches(index, index)
+
+
+def test_regime_filters_mask_entries_and_force_exits():
+    index = pd.date_range('2021-01-01', periods=6, freq='12h')
+    regime_df = pd.DataFrame({'Close': [1.0, -1.0, 1.0]}, index=pd.date_range('2021-01-01', periods=3, freq='D'))
+    entry, exit = np.ones(6, dtype=bool), np.zeros(6, dtype=bool)
+    apply_regime_filters(entry, exit, index, regime_df, Mask(np.array([True, False, True])), Mask(np.array([False, True, False])),
+                         regime_entry_action='long', regime_exit_action='long')
+    np.testing.assert_array_equal(entry, [1, 1, 0, 0, 1, 1])
+    np.testing.assert_array_equal(exit, [0, 0, 1, 1, 0, 0])
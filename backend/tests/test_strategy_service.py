@@ -0,0 +1,44 @@
+# tests/test_strategy_service.py
+
+import asyncio
+import pandas as pd
+import pytest
+from app.models.backtest import StrategyInput
+from app.services.strategy_service.strategy import StrategyService
+from conftest import price_frame, sma
+
+
+def rule(fast: int, slow: int, operator: str) -> dict:
+    return {'leftIndicator': sma(fast), 'operator': operator, 'useRightIndicator': True, 'rightIndicator': sma(slow),
+            'logicalOperator': 'and'}
+
+
+def test_processing_leaves_the_input_frames_unchanged(prices):
+    # Enabled by importing app.services, so slices of the inputs are never written through
+    assert pd.get_option('mode.copy_on_write')
+    regime = price_frame(2000, seed=1)
+    data_dict = {'1h': prices, 'regime_ETH-USD': regime}
+    expected = {key: df.copy(deep=True) for key, df in data_dict.items()}
+    strategies = [
+        StrategyInput(name='Fixed', allocation=40, positionType='long', frequency='1h', position_size_method='fixed',
+                      fixed_position_size=1, entryRules=[rule(10, 50, '>')], exitRules=[rule(10, 50, '<')]),
+        StrategyInput(name='Short', allocation=30, positionType='short', frequency='1h', position_size_method='fixed',
+                      fixed_position_size=1, entryRules=[rule(20, 100, '<')], exitRules=[rule(20, 100, '>')]),
+        StrategyInput(name='Vol', allocation=30, positionType='long', frequency='1h',
+                      position_size_method='volatility_target', volatility_target=30, volatility_buffer=10,
+                      entryRules=[rule(5, 30, '>')], exitRules=[rule(5, 30, '<')],
+                      regimeAsset='ETH-USD', entryRegimeRules=[rule(10, 50, '>')], regimeEntryAction='long'),
+    ]
+    results, _, _ = asyncio.run(StrategyService(strategies, fees=0.1, slippage=0.05).process_strategies(data_dict))
+    assert len(results) == 3 and any(result.signal.any() for result in results)
+
+    assert list(data_dict) == list(expected)
+    for key, df in data_dict.items():
+        assert list(df.columns) == list(expected[key].columns)
+        pd.testing.assert_frame_equal(df, expected[key])
+    # Results share the input prices through read-only views
+    for result in results:
+        assert not result.close.flags.writeable
+        with pytest.raises(ValueError):
+            result.close[0] = 0.0
+    pd.testing.assert_frame_equal(prices, expected['1h'])
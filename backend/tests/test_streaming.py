@@ -0,0 +1,51 @@
+# tests/test_streaming.py
+
+import numpy as np
+import pytest
+from app.services.strategy_module.indicators import (
+    EMA, MA_trend, SMA, VWAP, average_move_from_open, rolling_high, rolling_low
+)
+from app.services.strategy_module.streaming import (
+    StreamingAverageMoveFromOpen, StreamingEMA, StreamingMATrend, StreamingRollingHigh, StreamingRollingLow,
+    StreamingSMA, StreamingVWAP
+)
+from conftest import price_frame
+
+
+@pytest.mark.parametrize('batch, streaming', [
+    (SMA, StreamingSMA),
+    (EMA, StreamingEMA),
+    (rolling_high, StreamingRollingHigh),
+    (rolling_low, StreamingRollingLow),
+])
+@pytest.mark.parametrize('window', [1, 7, 50])
+def test_window_indicators_match_batch(batch, streaming, window):
+    close = price_frame(3000)['Close']
+    indicator = streaming(window)
+    # Values fed in two calls continue from the first, like bars arriving live
+    values = np.concatenate([indicator.update_many(close.iloc[:-500]), indicator.update_many(close.iloc[-500:])])
+    np.testing.assert_array_equal(values, batch(close, window).to_numpy())
+
+
+def test_ma_trend_matches_batch():
+    close = price_frame(3000)['Close']
+    np.testing.assert_array_equal(StreamingMATrend(20, 5).update_many(close), MA_trend(close, 20, 5).to_numpy())
+
+
+@pytest.mark.parametrize('session_tz, session_start', [(None, '00:00'), ('America/New_York', '09:30')])
+def test_vwap_matches_batch(session_tz, session_start):
+    df = price_frame(3000, freq='15min')
+    np.testing.assert_array_equal(StreamingVWAP(session_tz, session_start).update_many(df),
+                                  VWAP(df, session_tz=session_tz, session_start=session_start).to_numpy())
+
+
+@pytest.mark.parametrize('rolling_window', [1, 3, 14])
+@pytest.mark.parametrize('session_tz, session_start', [('UTC', '00:00'), ('America/New_York', '09:30')])
+def test_average_move_from_open_matches_batch(rolling_window, session_tz, session_start):
+    df = price_frame(6000, freq='15min')
+    df.iloc[1000, df.columns.get_loc('Close')] = np.nan
+    values = StreamingAverageMoveFromOpen(rolling_window, session_tz, session_start).update_many(df)
+    expected = average_move_from_open(df, rolling_window, session_tz, session_start).to_numpy()
+    # Running sums and the batch sums round differently
+    np.testing.assert_array_equal(np.isnan(values), np.isnan(expected))
+    np.testing.assert_allclose(values, expected, rtol=1e-12)
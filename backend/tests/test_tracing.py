@@ -0,0 +1,115 @@
+# tests/test_tracing.py
+
+import asyncio
+import pytest
+from app.services.data.data_service import DataService
+from app.utils.tracing import METRICS, Histogram, MetricsRegistry, count, span, trace_request
+from conftest import price_frame, sma
+
+
+def test_histogram_buckets():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0, 3.0):
+        histogram.observe(value)
+    # Bounds are inclusive, and values above the last bound go to +Inf
+    assert histogram.counts == [2, 1, 2]
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(5.65)
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.observe('signals', 0.003)
+    registry.observe('signals', 0.2)
+    registry.increment('cache_hit')
+    registry.increment('cache_hit', 2)
+    lines = registry.render(prefix='test').splitlines()
+    assert '# TYPE test_stage_duration_seconds histogram' in lines
+    assert 'test_stage_duration_seconds_bucket{stage="signals",le="0.001"} 0' in lines
+    assert 'test_stage_duration_seconds_bucket{stage="signals",le="0.005"} 1' in lines
+    assert 'test_stage_duration_seconds_bucket{stage="signals",le="0.25"} 2' in lines
+    assert 'test_stage_duration_seconds_bucket{stage="signals",le="+Inf"} 2' in lines
+    assert 'test_stage_duration_seconds_sum{stage="signals"} 0.203' in lines
+    assert 'test_stage_duration_seconds_count{stage="signals"} 2' in lines
+    assert '# TYPE test_events_total counter' in lines
+    assert 'test_events_total{event="cache_hit"} 3' in lines
+
+
+def test_spans_nest_inside_a_trace():
+    with trace_request('request') as trace:
+        with span('outer'):
+            with span('inner'):
+                count('event')
+            with span('inner'):
+                count('event', 2)
+        with span('outer'):
+            pass
+    assert [(record.name, record.depth) for record in trace.spans] == [('outer', 0), ('inner', 1), ('inner', 1), ('outer', 0)]
+    outer, first, second, _ = trace.spans
+    assert outer.start <= first.start <= second.start
+    assert outer.duration >= first.duration + second.duration
+    timings = trace.to_dict()
+    assert timings['stages']['inner'] == pytest.approx(first.duration + second.duration)
+    assert timings['counters'] == {'event': 3}
+    assert timings['total_time'] >= timings['stages']['outer']
+
+
+def test_concurrent_traces_are_isolated():
+    async def request(name: str, n_spans: int):
+        with trace_request(name) as trace:
+            for _ in range(n_spans):
+                with span(name):
+                    count(name)
+                    await asyncio.sleep(0)
+        return trace
+
+    async def run():
+        return await asyncio.gather(request('a', 3), request('b', 5))
+
+    a, b = asyncio.run(run())
+    assert [record.name for record in a.spans] == ['a'] * 3 and a.counters == {'a': 3}
+    assert [record.name for record in b.spans] == ['b'] * 5 and b.counters == {'b': 5}
+    # Spans outside a trace are only observed process-wide
+    with span('untraced'):
+        pass
+    assert 'untraced' in METRICS.histograms
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+    # The app logs to app.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    from app.main import app
+    from app.api.auth import User, get_current_user
+
+    df = price_frame(1000, freq='D')
+
+    async def fetch_data(symbol, start, end, data_source, strategies):
+        return {'Daily': df.loc[start:end].copy()}
+
+    monkeypatch.setattr(DataService, 'fetch_data', staticmethod(fetch_data))
+    app.dependency_overrides[get_current_user] = lambda: User(username='test', email='test@example.com')
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_backtest_timings_and_metrics_endpoint(client):
+    rule = {'leftIndicator': sma(10), 'operator': '>', 'useRightIndicator': True, 'rightIndicator': sma(50), 'logicalOperator': 'and'}
+    payload = {'symbol': 'BTC-USD', 'data_source': 'Yahoo Finance', 'start': '2020-01-01', 'end': '2022-06-30',
+               'fees': 0.1, 'slippage': 0.05, 'timings': True,
+               'strategies': [{'name': 'Cross', 'allocation': 100, 'positionType': 'long', 'frequency': 'Daily',
+                               'position_size_method': 'fixed', 'fixed_position_size': 1,
+                               'entryRules': [rule], 'exitRules': [{**rule, 'operator': '<'}]}]}
+    response = client.post('/api/backtest', json=payload)
+    assert response.status_code == 200
+    timings = response.json()['timings']
+    for stage in ('data_fetch', 'signals', 'returns', 'aggregation', 'metrics'):
+        assert timings['stages'][stage] >= 0
+    assert timings['total_time'] >= timings['stages']['signals']
+    assert 'timings' not in client.post('/api/backtest', json={**payload, 'timings': False}).json()
+
+    metrics = client.get('/metrics')
+    assert metrics.status_code == 200
+    assert 'quantifi_stage_duration_seconds_count{stage="backtest"}' in metrics.text
+    assert 'quantifi_stage_duration_seconds_bucket{stage="signals",le="+Inf"}' in metrics.text
@@ -0,0 +1,56 @@
+# tests/test_transitions.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.strategy_module.transitions import Transitions
+
+
+def random_signals(n_cases: int = 500, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_cases):
+        length = int(rng.integers(0, 80))
+        # Long runs of -1, 0 and 1 with some missing bars, like signals and positions
+        values = np.repeat(rng.choice([-1.0, 0.0, 1.0, np.nan], size=length, p=[0.3, 0.3, 0.3, 0.1]),
+                           rng.integers(1, 6, size=length))[:length]
+        yield values
+
+
+def test_round_trip():
+    for values in random_signals():
+        transitions = Transitions.from_dense(values)
+        np.testing.assert_array_equal(transitions.to_dense(), values)
+        assert len(transitions.values) <= len(values)
+
+
+def test_series_round_trip_keeps_the_index():
+    series = pd.Series([0.0, 0.0, 1.0, 1.0, np.nan, np.nan, -1.0], index=pd.date_range('2020-01-01', periods=7))
+    transitions = Transitions.from_dense(series)
+    assert transitions.starts.tolist() == [0, 2, 4, 6]
+    pd.testing.assert_series_equal(transitions.to_series(), series)
+
+
+def test_counts_match_the_dense_computations():
+    for values in random_signals():
+        series = pd.Series(values)
+        transitions = Transitions.from_dense(series)
+        assert transitions.changes() == int(((series != series.shift()) & series.notna() & series.shift().notna()).sum())
+        assert transitions.run_count() == int((series != series.shift()).sum())
+        if len(values):
+            assert transitions.exposure() == pytest.approx((series != 0).mean())
+
+
+def test_trades_are_the_runs_of_held_bars():
+    values = np.array([0, 1, 1, 0, -1, 1, 0, 0, 1, 1])
+    assert Transitions.from_dense(values).trades().tolist() == [[1, 3], [4, 6], [8, 10]]
+
+
+def test_records_carry_extra_columns_at_each_change():
+    index = pd.date_range('2020-01-01', periods=5)
+    close = pd.Series([10.0, 11.0, 12.0, 13.0, 14.0], index=index)
+    records = Transitions.from_dense(pd.Series([0.0, 1.0, 1.0, 0.0, 0.0], index=index)).to_records('S_signal', Close=close)
+    assert records == [
+        {'Date': index[0], 'S_signal': 0.0, 'Close': 10.0},
+        {'Date': index[1], 'S_signal': 1.0, 'Close': 11.0},
+        {'Date': index[3], 'S_signal': 0.0, 'Close': 13.0},
+    ]
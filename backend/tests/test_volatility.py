@@ -0,0 +1,37 @@
+# tests/test_volatility.py
+
+import numpy as np
+import pytest
+from app.services.strategy_module.indicator_cache import IndicatorCache
+from app.services.strategy_module.streaming import StreamingVolatility
+from app.services.strategy_module.volatility import periods_per_year, volatility_estimate
+from conftest import price_frame
+
+
+def test_periods_per_year():
+    assert periods_per_year(None) == periods_per_year('Daily') == 365
+    assert periods_per_year('1h') == 365 * 24
+    assert periods_per_year('15m') == 365 * 96
+    with pytest.raises(ValueError):
+        periods_per_year('hourly')
+
+
+def test_cached_estimates_match_and_are_shared():
+    df = price_frame(3000)
+    cache = IndicatorCache()
+    expected = volatility_estimate(df, 30, '1h', cache=None)
+    cached = volatility_estimate(df, 30, '1h', cache=cache)
+    np.testing.assert_array_equal(cached, expected)
+    assert not cached.flags.writeable
+    # A copy of the same prices hits the cache; another lookback does not
+    assert volatility_estimate(df.copy(), 30, '1h', cache=cache) is cached
+    assert cache.stats()['hits'] == 1
+    assert volatility_estimate(df, 20, '1h', cache=cache) is not cached
+
+
+def test_streaming_volatility_matches_the_estimate():
+    df = price_frame(3000)
+    expected = volatility_estimate(df, 30, '1h', cache=None)
+    values = StreamingVolatility(30, periods_per_year('1h')).update_many(df['Close'])
+    np.testing.assert_array_equal(np.isnan(values), np.isnan(expected))
+    np.testing.assert_allclose(values, expected, rtol=1e-9)
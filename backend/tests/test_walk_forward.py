@@ -0,0 +1,69 @@
+# tests/test_walk_forward.py
+
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from app.models.backtest import StrategyInput
+from app.services.optimization.optimizer import ParameterOptimizer, candidate_strategies
+from app.services.optimization.walk_forward import walk_forward, walk_forward_folds
+from app.services.strategy_service.strategy import StrategyService
+from conftest import sma
+
+
+@pytest.fixture
+def template() -> StrategyInput:
+    return StrategyInput(name='SMA Cross', allocation=100, positionType='long', frequency='1h',
+                         position_size_method='fixed', fixed_position_size=1,
+                         entryRules=[{'leftIndicator': sma(10), 'operator': '>', 'rightIndicator': sma(50)}],
+                         exitRules=[{'leftIndicator': sma(10), 'operator': '<', 'rightIndicator': sma(50)}])
+
+
+def run(optimizer, candidates, sets, **kwargs):
+    return asyncio.run(walk_forward(optimizer, candidates, sets, **kwargs))
+
+
+def test_folds_cover_the_history_after_the_first_train_window(prices):
+    folds = walk_forward_folds(prices.index, n_folds=3, train_fraction=0.4)
+    assert folds[0].test_start == prices.index[800]
+    assert folds[-1].test_end == prices.index[-1]
+    for previous, fold in zip(folds, folds[1:]):
+        assert prices.index.get_loc(fold.test_start) == prices.index.get_loc(previous.test_end) + 1
+        assert fold.train_end == previous.test_end
+    anchored = walk_forward_folds(prices.index, n_folds=3, train_fraction=0.4, anchored=True)
+    assert all(fold.train_start == prices.index[0] for fold in anchored)
+
+
+def test_stitched_backtest_matches_a_single_parameter_set(prices, template):
+    sets = [{}]
+    candidates = candidate_strategies(template, sets)
+    optimizer = ParameterOptimizer({'1h': prices}, fees=0.1, slippage=0.05, max_workers=1)
+    analysis = run(optimizer, candidates, sets, n_folds=4)
+
+    full, _, _ = asyncio.run(StrategyService(candidates, 0.1, 0.05).process_strategies({'1h': prices}))
+    start = prices.index.get_loc(analysis.folds[0].test_start)
+    assert analysis.result.index.equals(prices.index[start:])
+    np.testing.assert_array_equal(analysis.result.signal, full[0].signal[start:])
+    # The stitched backtest starts flat, so returns match once its first position is held
+    np.testing.assert_allclose(analysis.result.returns[2:], full[0].returns[start + 2:], rtol=1e-12)
+
+
+def test_failed_candidates_are_never_chosen(prices, template):
+    sets = [{'entryRules.0.leftIndicator.params.window': window} for window in (0, 10)]
+    candidates = candidate_strategies(template, sets)
+    optimizer = ParameterOptimizer({'1h': prices}, fees=0.1, slippage=0.05, max_workers=1)
+    analysis = run(optimizer, candidates, sets, n_folds=3)
+    assert all(fold.params == sets[1] for fold in analysis.folds)
+
+
+def test_folds_without_a_scored_candidate_stay_flat(prices, template):
+    # The first candidate fails; the second never enters (SMA(10) < SMA(10)), so it has no Sortino ratio
+    sets = [{'entryRules.0.leftIndicator.params.window': 0},
+            {'entryRules.0.operator': '<', 'entryRules.0.rightIndicator.params.window': 10}]
+    candidates = candidate_strategies(template, sets)
+    optimizer = ParameterOptimizer({'1h': prices}, fees=0.1, slippage=0.05, max_workers=1)
+    analysis = run(optimizer, candidates, sets, n_folds=3, metric='Sortino Ratio')
+    assert all(fold.params is None and fold.train_metrics == {} for fold in analysis.folds)
+    assert not np.any(analysis.result.signal)
+    assert np.nansum(np.abs(analysis.result.returns)) == 0
+    assert analysis.metrics['Number of Trades'] == 0
@@ -46,6 +46,15 @@ const INDICATORS = [
   { name: 'MA_trend', params: ['series', 'ma_window', 'return_window'] },
   { name: 'VWAP', params: [] },
   { name: 'Average_Move_From_Open', params: ['window'] },
+  { name: 'RSI', params: ['series', 'window'] },
+  { name: 'ATR', params: ['window'] },
+  { name: 'Bollinger_Upper', params: ['series', 'window', 'num_std'] },
+  { name: 'Bollinger_Lower', params: ['series', 'window', 'num_std'] },
+  { name: 'MACD', params: ['series', 'fast', 'slow'] },
+  { name: 'MACD_Signal', params: ['series', 'fast', 'slow', 'signal'] },
+  { name: 'Donchian_High', params: ['window'] },
+  { name: 'Donchian_Low', params: ['window'] },
+  { name: 'ZScore', params: ['series', 'window'] },
 ];
 
 